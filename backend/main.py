@@ -1,7 +1,13 @@
-from fastapi import FastAPI, HTTPException
+from fastapi import FastAPI, HTTPException, Request, Response
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse, PlainTextResponse, StreamingResponse
 from pydantic import BaseModel
-from typing import List, Optional, Dict, Any
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, List, Optional, Dict, Any, Set
+from urllib.parse import quote
+import asyncio
+import hashlib
+import json
 import sys
 import os
 
@@ -9,9 +15,21 @@ import os
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
 from graph.workflow import create_game_graph
+from graph.archive import get_archive
+from graph.action_queue import IdempotencyConflict, ThreadBusy, cached_result, remember_result, thread_slot
+from graph.auto_advance import clamp_turns, clear_stop, request_stop
+from graph.jobs import Job, JobQueue, QueueFull
+from graph.metrics import collect_timings, render_prometheus, thread_summary
 from langgraph.types import Command
+from langchain_core.messages import AIMessageChunk, RemoveMessage
 
-app = FastAPI(title="Phantom Log API")
+@asynccontextmanager
+async def lifespan(_: FastAPI):
+    yield
+    # Stop background job workers on shutdown
+    await job_queue.close()
+
+app = FastAPI(title="Phantom Log API", lifespan=lifespan)
 
 # CORS Setup
 app.add_middleware(
@@ -34,6 +52,9 @@ class UserActionRequest(BaseModel):
     action_type: str  # "chat", "vote", "suspect", "next"
     content: Optional[str] = None
     target: Optional[str] = None
+    turns: Optional[int] = None  # "auto": number of free-discussion turns to run
+    idempotency_key: Optional[str] = None  # retries with the same key return the first result
+    background: bool = False  # run as a background job: 202 + job id (see /api/game/jobs)
 
 class GameStateResponse(BaseModel):
     messages: List[Dict[str, Any]]
@@ -49,17 +70,77 @@ class GameStateResponse(BaseModel):
     game_over: bool
     phantom_name: Optional[str] = None
 
+# State fields pushed as "phase" events on the streaming endpoint
+PHASE_FIELDS = ("phase", "day_night", "round_number")
+
 # Helper to format messages
-def format_messages(messages):
+def format_messages(messages, first_seq: Optional[int] = None):
     formatted = []
-    for msg in messages:
-        sender = getattr(msg, "name", "System")
+    for i, msg in enumerate(messages):
+        sender = getattr(msg, "name", None) or "System"
         content = msg.content
-        formatted.append({"sender": sender, "content": content})
+        item = {"sender": sender, "content": content}
+        if first_seq is not None:
+            item["seq"] = first_seq + i
+        formatted.append(item)
     return formatted
 
+def _public_characters(state: Dict[str, Any]) -> List[Dict[str, Any]]:
+    # Persona prompts are server-side only and make up most of the payload
+    return [
+        {key: value for key, value in char.items() if key != "prompt"}
+        for char in state.get("characters", [])
+    ]
+
+# Non-message fields of the state payload, built lazily so field selection
+# and delta responses only pay for what they return
+STATE_FIELDS = {
+    "characters": _public_characters,
+    "round_number": lambda state: state.get("round_number", 1),
+    "phase": lambda state: state.get("phase", "unknown"),
+    "day_night": lambda state: state.get("day_night", "day"),
+    "alive_status": lambda state: state.get("alive_status", {}),
+    "suspicion_counts": lambda state: state.get("suspicion_counts", {}),
+    "night_logs": lambda state: state.get("night_logs", []),
+    "clues": lambda state: state.get("clues", []),
+    "round_summaries": lambda state: state.get("round_summaries", {}),
+    "game_over": lambda state: state.get("phase") == "end",
+    "phantom_name": lambda state: state.get("phantom_name") if state.get("phase") == "end" else None,
+}
+
+def parse_cursor(since: Optional[str]):
+    """
+    Parse a state cursor: "<message seq>" or "<message seq>:<version>"
+    Returns (seq, version or None)
+    """
+    if not since:
+        return 0, None
+    seq, _, version = since.partition(":")
+    try:
+        return max(0, int(seq)), version or None
+    except ValueError:
+        raise HTTPException(status_code=400, detail=f"Invalid cursor: {since}")
+
+def set_server_timing(response: Response, timings) -> None:
+    """Per-node / per-LLM-call time spent on this request, visible in browser devtools"""
+    response.headers["Server-Timing"] = timings.header()
+    response.headers["Timing-Allow-Origin"] = "*"
+
+@app.get("/metrics", response_class=PlainTextResponse)
+async def metrics():
+    """Prometheus scrape endpoint: per-node latency, LLM time, tokens, cost, retries and errors"""
+    return PlainTextResponse(render_prometheus(), media_type="text/plain; version=0.0.4")
+
+@app.get("/api/game/metrics/{thread_id}")
+async def get_thread_metrics(thread_id: str):
+    """Accumulated node/LLM metrics for one game session"""
+    summary = thread_summary(thread_id)
+    if summary is None:
+        raise HTTPException(status_code=404, detail="No metrics for this session")
+    return {"thread_id": thread_id, **summary}
+
 @app.post("/api/game/start")
-async def start_game(request: GameStartRequest):
+async def start_game(request: GameStartRequest, response: Response):
     config = {"configurable": {"thread_id": request.thread_id}}
     
     # Initialize or reset game
@@ -68,45 +149,111 @@ async def start_game(request: GameStartRequest):
     # Here we just invoke with empty input to ensure setup.
     
     try:
-        # Check if state exists
-        current_state = graph_app.get_state(config)
-        if not current_state.next:
-             # Initial start
-            graph_app.invoke({}, config)
+        # Same per-thread queue as actions, so a double start runs setup once
+        async with thread_slot(request.thread_id):
+            # Check if state exists
+            current_state = await graph_app.aget_state(config)
+            if not current_state.next:
+                 # Initial start
+                with collect_timings() as timings:
+                    await graph_app.ainvoke({}, config)
+                set_server_timing(response, timings)
         
         return {"message": "Game session started", "thread_id": request.thread_id}
+    except ThreadBusy as e:
+        raise HTTPException(status_code=429, detail=str(e), headers={"Retry-After": "1"})
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 @app.get("/api/game/state/{thread_id}")
-async def get_game_state(thread_id: str):
+async def get_game_state(
+    thread_id: str,
+    request: Request,
+    since: Optional[str] = None,
+    fields: Optional[str] = None,
+):
+    """
+    Game state for the UI.
+    - since: cursor from a previous response; only newer messages and changed fields are returned
+    - fields: comma separated field names to include (e.g. "messages,phase")
+    Responses carry an ETag; a matching If-None-Match returns 304.
+    """
     config = {"configurable": {"thread_id": thread_id}}
-    current_state = graph_app.get_state(config)
+    current_state = await graph_app.aget_state(config)
     
     if not current_state.values:
         raise HTTPException(status_code=404, detail="Game session not found")
-    
-    state = current_state.values
-    
-    return {
-        "messages": format_messages(state.get("messages", [])),
-        "characters": state.get("characters", []),
-        "round_number": state.get("round_number", 1),  # Return round_number
-        "phase": state.get("phase", "unknown"),
-        "day_night": state.get("day_night", "day"),
-        "alive_status": state.get("alive_status", {}),
-        "suspicion_counts": state.get("suspicion_counts", {}),
-        "night_logs": state.get("night_logs", []),
-        "clues": state.get("clues", []),
-        "round_summaries": state.get("round_summaries", {}),
-        "game_over": state.get("phase") == "end",
-        "phantom_name": state.get("phantom_name") if state.get("phase") == "end" else None
+
+    version = current_state.config["configurable"].get("checkpoint_id", "")
+    etag = 'W/"' + hashlib.sha1(f"{version}|{since}|{fields}".encode()).hexdigest() + '"'
+    headers = {"ETag": etag, "Cache-Control": "no-cache"}
+    if request.headers.get("if-none-match") == etag:
+        return Response(status_code=304, headers=headers)
+
+    since_seq, since_version = parse_cursor(since)
+    previous = None
+    if since_version and since_version != version:
+        # Older checkpoints may have been pruned; then every field counts as changed
+        previous_state = await graph_app.aget_state(
+            {"configurable": {"thread_id": thread_id, "checkpoint_id": since_version}}
+        )
+        previous = previous_state.values or None
+    elif since_version:
+        previous = current_state.values
+
+    selected = set(fields.split(",")) if fields else None
+    payload = format_state(
+        current_state.values, version, since_seq=since_seq, previous=previous, fields=selected
+    )
+    return JSONResponse(payload, headers=headers)
+
+def format_state(
+    state: Dict[str, Any],
+    version: Optional[str] = None,
+    since_seq: int = 0,
+    previous: Optional[Dict[str, Any]] = None,
+    fields: Optional[set] = None,
+) -> Dict[str, Any]:
+    """
+    Build the state payload.
+    Messages carry a sequence number that survives round compaction
+    (message_offset counts messages already moved to the transcript archive).
+    With previous, fields equal to the previous state are left out.
+    """
+    messages = state.get("messages", [])
+    offset = state.get("message_offset", 0)
+    cursor_seq = offset + len(messages)
+    payload: Dict[str, Any] = {
+        "version": version,
+        "cursor": f"{cursor_seq}:{version}" if version else str(cursor_seq),
+        "message_offset": offset,
+        "delta": bool(since_seq or previous is not None),
     }
 
-@app.post("/api/game/action")
-async def perform_action(request: UserActionRequest):
-    config = {"configurable": {"thread_id": request.thread_id}}
-    
+    if fields is None or "messages" in fields:
+        start = max(0, since_seq - offset)
+        payload["messages"] = format_messages(messages[start:], first_seq=offset + start)
+        # Client cursor points at messages already compacted away -> use /transcript
+        payload["truncated"] = since_seq < offset and since_seq > 0
+
+    for name, build in STATE_FIELDS.items():
+        if fields is not None and name not in fields:
+            continue
+        value = build(state)
+        if previous is not None and build(previous) == value:
+            continue
+        payload[name] = value
+    return payload
+
+@app.get("/api/game/transcript/{thread_id}")
+async def get_transcript(thread_id: str):
+    """Messages archived by round compaction (no longer in the game state)"""
+    archive = get_archive()
+    archived = await asyncio.to_thread(archive.load, thread_id) if archive else []
+    return {"thread_id": thread_id, "archived": archived}
+
+def build_resume_data(request: UserActionRequest) -> Dict[str, Any]:
+    """Map an action request to the resume payload for the wait_user interrupt"""
     resume_data = {}
     
     if request.action_type == "chat":
@@ -148,18 +295,286 @@ async def perform_action(request: UserActionRequest):
             "user_input": f"[{request.target}에게] (대화 시작)"
         }
 
+    elif request.action_type == "auto":
+        # Run several select_next_speaker -> character_speak cycles in one request
+        resume_data = {
+            "phase": "free_discussion",
+            "action": "next",
+            "auto_turns": clamp_turns(request.turns)
+        }
+
+    return resume_data
+
+def run_options(request: UserActionRequest) -> Dict[str, Any]:
+    # Auto-advance only checkpoints when it stops at wait_user, not after every superstep
+    if request.action_type == "auto":
+        return {"durability": "exit"}
+    return {}
+
+# threads with a running auto-advance
+auto_runs: Set[str] = set()
+
+def action_fingerprint(request: UserActionRequest) -> str:
+    """Request body without the idempotency key (a reused key must carry the same action)"""
+    return json.dumps(request.model_dump(exclude={"idempotency_key"}), sort_keys=True, ensure_ascii=False)
+
+def replayed_result(request: UserActionRequest) -> Optional[Dict[str, Any]]:
+    """Result of an earlier request with the same idempotency key, if any"""
     try:
-        # Resume graph execution
-        graph_app.invoke(Command(resume=resume_data), config)
-        
-        # Fetch updated state
-        return await get_game_state(request.thread_id)
-        
+        return cached_result(request.thread_id, request.idempotency_key, action_fingerprint(request))
+    except IdempotencyConflict as e:
+        raise HTTPException(status_code=422, detail=str(e))
+
+@asynccontextmanager
+async def action_guard(request: UserActionRequest):
+    """
+    Runs one action at a time per thread (graph/action_queue.py).
+    A running auto-advance on the thread is asked to stop after the current
+    turn, so the waiting action resumes the graph back at wait_user.
+    Too many queued actions (or waiting too long) -> 429.
+    """
+    if request.thread_id in auto_runs:
+        request_stop(request.thread_id)
+
+    try:
+        async with thread_slot(request.thread_id):
+            if request.action_type != "auto":
+                yield
+                return
+
+            auto_runs.add(request.thread_id)
+            try:
+                yield
+            finally:
+                clear_stop(request.thread_id)
+                auto_runs.discard(request.thread_id)
+    except ThreadBusy as e:
+        raise HTTPException(status_code=429, detail=str(e), headers={"Retry-After": "1"})
+
+# Background job priority per action type (lower runs first): interactive turns
+# go ahead of multi-turn auto-advance and the night transition (clues, summaries)
+JOB_PRIORITIES = {
+    "chat": 0,
+    "start_one_on_one": 0,
+    "suspect": 1,
+    "next": 1,
+    "discuss": 1,
+    "end_discuss": 1,
+    "vote": 1,
+    "auto": 2,
+    "night_start": 3,
+}
+
+async def run_job(job: Job) -> AsyncIterator[str]:
+    """Job runner: same frames as the streaming endpoint, final state kept as the job result"""
+    request = job.payload
+    config = {"configurable": {"thread_id": request.thread_id}}
+
+    def done(state: Dict[str, Any]) -> None:
+        job.result = state
+
+    async with action_guard(request):
+        async for frame in _stream_graph(config, build_resume_data(request), run_options(request), done):
+            yield frame
+    if job.result is None:
+        raise RuntimeError("Game session not found")
+
+job_queue = JobQueue(run_job)
+
+def job_links(job: Job) -> Dict[str, str]:
+    # thread_id lets backend/router.py send job lookups to the worker that holds the job
+    query = f"?thread_id={quote(job.thread_id, safe='')}"
+    return {
+        "status_url": f"/api/game/jobs/{job.id}{query}",
+        "stream_url": f"/api/game/jobs/{job.id}/stream{query}",
+    }
+
+async def enqueue_action(request: UserActionRequest) -> JSONResponse:
+    """Queue the action as a background job and answer 202 right away"""
+    replay = replayed_result(request)
+    if replay is not None:
+        return JSONResponse(replay, status_code=202, headers={"Idempotent-Replayed": "true"})
+
+    current_state = await graph_app.aget_state({"configurable": {"thread_id": request.thread_id}})
+    if not current_state.values:
+        raise HTTPException(status_code=404, detail="Game session not found")
+
+    try:
+        job = job_queue.submit(
+            request.thread_id, request.action_type, JOB_PRIORITIES.get(request.action_type, 1), request
+        )
+    except QueueFull as e:
+        raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": "1"})
+
+    payload = {**job.as_dict(with_result=False), **job_links(job)}
+    remember_result(request.thread_id, request.idempotency_key, action_fingerprint(request), payload)
+    return JSONResponse(payload, status_code=202, headers={"Location": payload["status_url"]})
+
+@app.get("/api/game/jobs/{job_id}")
+async def get_job(job_id: str):
+    """Background job status; the final game state is in "result" once done"""
+    job = job_queue.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return {**job.as_dict(), **job_links(job)}
+
+async def job_events(job: Job) -> AsyncIterator[str]:
+    yield sse_event("job", job.as_dict(with_result=False))
+    streamed = False
+    async for frame in job.follow():
+        streamed = True
+        yield frame
+    # Frames of a finished job are released: send just its final state
+    if not streamed and job.result is not None:
+        yield sse_event("state", job.result)
+    yield sse_event("job", job.as_dict(with_result=False))
+
+@app.get("/api/game/jobs/{job_id}/stream")
+async def stream_job(job_id: str):
+    """
+    SSE for a background job: "job" status events around the same
+    token/message/phase/state frames as /api/game/action/stream
+    (frames produced before subscribing are replayed first; once the job
+    has finished only its final state frame is sent)
+    """
+    job = job_queue.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return StreamingResponse(
+        job_events(job),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+@app.post("/api/game/action")
+async def perform_action(request: UserActionRequest, response: Response):
+    if request.background:
+        return await enqueue_action(request)
+
+    config = {"configurable": {"thread_id": request.thread_id}}
+    resume_data = build_resume_data(request)
+
+    # A retry of a finished request returns its result without queueing
+    replay = replayed_result(request)
+    if replay is not None:
+        response.headers["Idempotent-Replayed"] = "true"
+        return replay
+
+    try:
+        # Resume graph execution (async so other sessions keep being served)
+        async with action_guard(request):
+            # The original may have finished while this retry was waiting
+            replay = replayed_result(request)
+            if replay is not None:
+                response.headers["Idempotent-Replayed"] = "true"
+                return replay
+
+            with collect_timings() as timings:
+                await graph_app.ainvoke(Command(resume=resume_data), config, **run_options(request))
+            set_server_timing(response, timings)
+
+            # Fetch updated state
+            current_state = await graph_app.aget_state(config)
+            result = format_state(
+                current_state.values, current_state.config["configurable"].get("checkpoint_id")
+            )
+            remember_result(request.thread_id, request.idempotency_key, action_fingerprint(request), result)
+            return result
+
+    except HTTPException:
+        raise
     except Exception as e:
         # If graph is not in a state to accept the command (e.g. not interrupted), 
         # it might raise an error.
         raise HTTPException(status_code=400, detail=f"Action failed: {str(e)}")
 
+def sse_event(event: str, data: Any) -> str:
+    """Encode one Server-Sent Events frame"""
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
+
+async def stream_action_events(request: UserActionRequest) -> AsyncIterator[str]:
+    """
+    Resume the graph and yield SSE frames as it runs:
+    - token: character_speak_node LLM tokens (provisional text of the current speaker)
+    - message: each message committed to state (system, user, final character line)
+    - phase: phase / day_night / round_number changes
+    - state: the full game state once the step finishes (no extra fetch needed)
+    A retry with the idempotency key of a finished request only gets the state frame.
+    """
+    config = {"configurable": {"thread_id": request.thread_id}}
+    resume_data = build_resume_data(request)
+    fingerprint = action_fingerprint(request)
+
+    def remember(state: Dict[str, Any]) -> None:
+        remember_result(request.thread_id, request.idempotency_key, fingerprint, state)
+
+    try:
+        replay = replayed_result(request)
+        if replay is None:
+            async with action_guard(request):
+                replay = replayed_result(request)
+                if replay is None:
+                    async for frame in _stream_graph(config, resume_data, run_options(request), remember):
+                        yield frame
+                    return
+        yield sse_event("state", replay)
+    except HTTPException as e:
+        yield sse_event("error", {"detail": e.detail, "status": e.status_code})
+    except Exception as e:
+        yield sse_event("error", {"detail": f"Action failed: {str(e)}"})
+
+async def _stream_graph(config, resume_data, options, on_done=None) -> AsyncIterator[str]:
+    """Yield SSE frames for one graph resume (see stream_action_events)"""
+    current_state = await graph_app.aget_state(config)
+    if not current_state.values:
+        yield sse_event("error", {"detail": "Game session not found"})
+        return
+    speaker = current_state.values.get("current_speaker")
+    phase_info = {key: current_state.values.get(key) for key in PHASE_FIELDS}
+
+    async for mode, payload in graph_app.astream(
+        Command(resume=resume_data), config, stream_mode=["messages", "updates"], **options
+    ):
+        if mode == "messages":
+            chunk, metadata = payload
+            is_token = isinstance(chunk, AIMessageChunk) and chunk.content
+            if is_token and metadata.get("langgraph_node") == "character_speak":
+                yield sse_event("token", {"sender": speaker, "content": chunk.content})
+            continue
+
+        for update in payload.values():
+            if not isinstance(update, dict):
+                continue
+            if update.get("current_speaker"):
+                speaker = update["current_speaker"]
+            new_messages = [
+                msg for msg in update.get("messages") or []
+                if not isinstance(msg, RemoveMessage)
+            ]
+            for msg in format_messages(new_messages):
+                yield sse_event("message", msg)
+            changed = {
+                key: update[key] for key in PHASE_FIELDS
+                if key in update and update[key] != phase_info[key]
+            }
+            if changed:
+                phase_info.update(changed)
+                yield sse_event("phase", changed)
+
+    final_state = await graph_app.aget_state(config)
+    result = format_state(final_state.values, final_state.config["configurable"].get("checkpoint_id"))
+    if on_done is not None:
+        on_done(result)
+    yield sse_event("state", result)
+
+@app.post("/api/game/action/stream")
+async def perform_action_stream(request: UserActionRequest):
+    return StreamingResponse(
+        stream_action_events(request),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
 if __name__ == "__main__":
     import uvicorn
     uvicorn.run(app, host="0.0.0.0", port=8000)
@@ -0,0 +1,177 @@
+"""
+Session-affinity router for running several backend workers.
+
+Every worker serves the same API against a shared checkpoint store
+(CHECKPOINT_DB on a shared volume, ACTION_LOCK_FILE for cross-process
+per-thread locking), so any worker can continue any game. The router
+consistent-hashes thread_id onto the workers (graph/routing.py) so a game
+keeps hitting the worker whose hot checkpoint cache, background jobs and
+idempotent results already hold it; if that worker is down the request goes
+to the next one on the ring.
+
+Each upstream address must be a single uvicorn process. Jobs, idempotent
+results and auto-advance stop requests live in process memory, and the router
+cannot choose among several processes sharing one port (--workers N), so
+scale by adding upstreams (compose replicas) instead.
+
+    ROUTER_UPSTREAMS=backend-worker:8000 uvicorn backend.router:app --port 8080
+
+ROUTER_UPSTREAMS is a comma-separated list of host:port. Each host is resolved
+to all of its addresses (docker compose replicas share one DNS name) and
+re-resolved every ROUTER_REFRESH seconds.
+"""
+
+from contextlib import asynccontextmanager
+from typing import Dict, Iterator, List, Optional
+import asyncio
+import itertools
+import json
+import os
+import re
+import socket
+import sys
+import time
+
+from fastapi import FastAPI, Request, Response
+from fastapi.responses import JSONResponse, StreamingResponse
+from starlette.background import BackgroundTask
+import httpx
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from graph.routing import DEFAULT_VNODES, HashRing
+
+UPSTREAMS = [u.strip() for u in os.getenv("ROUTER_UPSTREAMS", "localhost:8000").split(",") if u.strip()]
+REFRESH_SECONDS = float(os.getenv("ROUTER_REFRESH", "10"))
+VNODES = int(os.getenv("ROUTER_VNODES", str(DEFAULT_VNODES)))
+CONNECT_TIMEOUT = float(os.getenv("ROUTER_CONNECT_TIMEOUT", "2"))
+
+# Paths that carry the thread id as their last segment
+THREAD_PATH = re.compile(r"^/api/game/(?:state|transcript|metrics)/([^/]+)$")
+# Hop-by-hop headers are not forwarded
+HOP_HEADERS = {"connection", "keep-alive", "transfer-encoding", "upgrade", "te", "trailer", "proxy-connection", "host"}
+
+
+def resolve_upstreams(upstreams: List[str]) -> List[str]:
+    """Expand each host:port to every address the host resolves to (unresolvable hosts are kept as-is)"""
+    nodes = []
+    for upstream in upstreams:
+        host, _, port = upstream.rpartition(":")
+        try:
+            infos = socket.getaddrinfo(host, int(port), type=socket.SOCK_STREAM)
+        except socket.gaierror:
+            nodes.append(upstream)
+            continue
+        nodes.extend(f"{info[4][0]}:{port}" if ":" not in info[4][0] else f"[{info[4][0]}]:{port}" for info in infos)
+    return sorted(set(nodes))
+
+
+class Upstreams:
+    """Current worker set as a hash ring, refreshed from DNS"""
+
+    def __init__(self, upstreams: List[str]) -> None:
+        self.upstreams = upstreams
+        self.ring = HashRing(vnodes=VNODES)
+        self.refreshed_at = 0.0
+        self._round_robin = itertools.count()
+        self._lock = asyncio.Lock()
+
+    async def refresh(self, force: bool = False) -> None:
+        if not force and time.monotonic() - self.refreshed_at < REFRESH_SECONDS:
+            return
+        async with self._lock:
+            if not force and time.monotonic() - self.refreshed_at < REFRESH_SECONDS:
+                return
+            nodes = await asyncio.to_thread(resolve_upstreams, self.upstreams)
+            if nodes and tuple(nodes) != self.ring.nodes:
+                self.ring = HashRing(nodes, vnodes=VNODES)
+            self.refreshed_at = time.monotonic()
+
+    def candidates(self, thread_id: Optional[str]) -> Iterator[str]:
+        """Workers to try in order: the ring owner of the thread, else round-robin"""
+        if thread_id:
+            return self.ring.preference(thread_id)
+        nodes = self.ring.nodes
+        if not nodes:
+            raise LookupError("no upstream workers")
+        start = next(self._round_robin) % len(nodes)
+        return iter(nodes[start:] + nodes[:start])
+
+
+upstreams = Upstreams(UPSTREAMS)
+client: Optional[httpx.AsyncClient] = None
+
+
+@asynccontextmanager
+async def lifespan(_: FastAPI):
+    global client
+    client = httpx.AsyncClient(timeout=httpx.Timeout(None, connect=CONNECT_TIMEOUT))
+    await upstreams.refresh(force=True)
+    yield
+    await client.aclose()
+
+
+app = FastAPI(title="Phantom Log Router", lifespan=lifespan)
+
+
+def thread_id_of(request: Request, body: bytes) -> Optional[str]:
+    """Thread id from the path, the ?thread_id= query (job links) or the JSON body"""
+    match = THREAD_PATH.match(request.url.path)
+    if match:
+        return match.group(1)
+    if request.query_params.get("thread_id"):
+        return request.query_params["thread_id"]
+    if body and request.headers.get("content-type", "").startswith("application/json"):
+        try:
+            payload = json.loads(body)
+        except ValueError:
+            return None
+        if isinstance(payload, dict) and isinstance(payload.get("thread_id"), str):
+            return payload["thread_id"]
+    return None
+
+
+@app.get("/router/upstreams")
+async def router_upstreams():
+    """Workers currently on the ring"""
+    await upstreams.refresh()
+    return {"upstreams": list(upstreams.ring.nodes), "vnodes": VNODES}
+
+
+@app.api_route("/{path:path}", methods=["GET", "POST", "PUT", "PATCH", "DELETE", "OPTIONS", "HEAD"])
+async def proxy(request: Request, path: str):
+    await upstreams.refresh()
+    body = await request.body()
+    thread_id = thread_id_of(request, body)
+    headers = {k: v for k, v in request.headers.items() if k.lower() not in HOP_HEADERS}
+    # Forward the path exactly as received (still percent-encoded)
+    path_qs = (request.scope.get("raw_path") or request.url.path.encode()).decode("latin-1")
+    if request.url.query:
+        path_qs += f"?{request.url.query}"
+
+    try:
+        candidates = list(upstreams.candidates(thread_id))
+    except LookupError as e:
+        return JSONResponse({"detail": str(e)}, status_code=503)
+
+    for node in candidates:
+        upstream_request = client.build_request(request.method, f"http://{node}{path_qs}", headers=headers, content=body)
+        try:
+            upstream = await client.send(upstream_request, stream=True)
+        except (httpx.ConnectError, httpx.ConnectTimeout):
+            # Worker gone (scaled down / restarting): the shared store lets the next one take over
+            continue
+        response_headers: Dict[str, str] = {
+            k: v for k, v in upstream.headers.items() if k.lower() not in HOP_HEADERS
+        }
+        response_headers["X-Upstream"] = node
+        return StreamingResponse(
+            upstream.aiter_raw(),
+            status_code=upstream.status_code,
+            headers=response_headers,
+            background=BackgroundTask(upstream.aclose),
+        )
+
+    # Every worker refused the connection: re-resolve before the next request
+    upstreams.refreshed_at = 0.0
+    return Response("no upstream worker reachable", status_code=502)
@@ -0,0 +1,4 @@
+"""
+성능 측정 스크립트 모음
+실제 API 없이 로컬 대체 LLM(LLM_BACKEND=local / scripted)으로 실행한다.
+"""
@@ -0,0 +1,78 @@
+"""
+동기/비동기 그래프 실행 처리량 벤치마크
+이전 백엔드처럼 async 핸들러 안에서 graph_app.invoke()를 호출하는 경우(blocking)와
+graph_app.ainvoke()로 호출하는 경우(async)를, 같은 이벤트 루프에서 동시 세션 수별로 비교한다.
+
+실행: python -m benchmarks.async_throughput --sessions 50 --turns 3
+"""
+
+from typing import Awaitable, Callable
+import argparse
+import asyncio
+import os
+import time
+
+from langgraph.types import Command
+
+os.environ["LLM_BACKEND"] = "local"
+
+from graph.workflow import create_game_graph  # noqa: E402
+
+DISCUSS = {
+    "user_input": "[AI들끼리 자유롭게 대화를 시작합니다]",
+    "phase": "free_discussion",
+    "action": "next"
+}
+
+
+def _blocking(app) -> Callable[..., Awaitable]:
+    """이전 방식: 이벤트 루프 위에서 동기 invoke"""
+    async def run(payload, config):
+        return app.invoke(payload, config)
+    return run
+
+
+def _async(app) -> Callable[..., Awaitable]:
+    """새 방식: ainvoke"""
+    async def run(payload, config):
+        return await app.ainvoke(payload, config)
+    return run
+
+
+async def _session(run, thread_id: str, turns: int) -> int:
+    """게임 하나를 시작하고 turns번 자유 토론을 진행, 처리한 요청 수 반환"""
+    config = {"configurable": {"thread_id": thread_id}}
+    await run({}, config)
+    await run(Command(resume=DISCUSS), config)
+    for _ in range(turns - 1):
+        await run(Command(resume={"action": "next"}), config)
+    return turns + 1
+
+
+async def measure(label: str, runner_factory, sessions: int, turns: int) -> None:
+    app = create_game_graph()
+    run = runner_factory(app)
+    start = time.perf_counter()
+    handled = await asyncio.gather(*[
+        _session(run, f"{label}-{i}", turns) for i in range(sessions)
+    ])
+    elapsed = time.perf_counter() - start
+    requests = sum(handled)
+    print(f"{label:>8}: {requests} requests in {elapsed:6.2f}s -> {requests / elapsed:7.1f} req/s")
+
+
+async def main_async(sessions: int, turns: int) -> None:
+    await measure("blocking", _blocking, sessions, turns)
+    await measure("async", _async, sessions, turns)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="동기/비동기 그래프 실행 처리량 비교")
+    parser.add_argument("--sessions", type=int, default=50, help="동시 게임 세션 수")
+    parser.add_argument("--turns", type=int, default=3, help="세션당 자유 토론 턴 수")
+    args = parser.parse_args()
+    asyncio.run(main_async(args.sessions, args.turns))
+
+
+if __name__ == "__main__":
+    main()
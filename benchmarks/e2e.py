@@ -0,0 +1,308 @@
+"""
+엔드투엔드 벤치마크
+게임 한 판(세팅 → 자유 토론 → 1:1 대화 → 밤(AI 의심, 희생자/단서, 라운드 요약) → 투표)을
+동시 세션 수별로 실행하고 결과를 JSON으로 저장한다.
+
+- graph: create_game_graph()를 직접 실행 (노드별 실행 시간, 페이즈별 지연, 체크포인트 바이트)
+- http: FastAPI 앱을 in-process 클라이언트로 호출 (엔드포인트별 p50/p99, 요청/응답 바이트)
+  --base-url을 주면 실행 중인 서버(예: docker compose scaled 프로필의 라우터)로 보낸다. (부하 테스트)
+
+LLM은 결정적 대체 모델(LLM_BACKEND=scripted)을 사용하며, 체크포인트는 임시 SQLite 파일에 저장한다.
+
+실행: python -m benchmarks.e2e --sessions 1,10,100 --latency lognormal:300,0.5 --output e2e.json
+"""
+
+from collections import defaultdict
+from contextvars import ContextVar
+from typing import Any, Dict, List, Optional, Tuple
+import argparse
+import asyncio
+import json
+import os
+import platform
+import random
+import tempfile
+import time
+
+os.environ["LLM_BACKEND"] = "scripted"
+
+import httpx  # noqa: E402
+from langgraph.checkpoint.serde.jsonplus import JsonPlusSerializer  # noqa: E402
+from langgraph.types import Command  # noqa: E402
+
+# (action_type, content, target) - target/content의 "{target}"은 세션마다 생존자 이름으로 채운다
+SCENARIO: List[Tuple[str, Optional[str], Optional[str]]] = (
+    [("discuss", None, None)]
+    + [("next", None, None)] * 4
+    + [("end_discuss", None, None), ("start_one_on_one", None, "{target}")]
+    + [("chat", "[{target}에게] 어젯밤에 뭐 하셨어요?", None)] * 2
+    + [("end_discuss", None, None), ("night_start", None, None), ("vote", None, "{target}")]
+)
+
+# 현재 측정 중인 페이즈 (체크포인트 직렬화 바이트를 페이즈별로 나누는 데 사용)
+_phase: ContextVar[str] = ContextVar("benchmark_phase", default="other")
+
+
+def _percentile(values: List[float], pct: float) -> float:
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+def _summary(values: List[float]) -> Dict[str, float]:
+    """초 단위 측정값 → ms 단위 요약"""
+    if not values:
+        return {"count": 0}
+    return {
+        "count": len(values),
+        "mean_ms": round(sum(values) / len(values) * 1000, 2),
+        "p50_ms": round(_percentile(values, 50) * 1000, 2),
+        "p99_ms": round(_percentile(values, 99) * 1000, 2),
+        "total_ms": round(sum(values) * 1000, 2),
+    }
+
+
+class _CountingSerde:
+    """체크포인터가 직렬화하는 바이트 수를 현재 페이즈별로 집계하는 serde 래퍼"""
+
+    def __init__(self) -> None:
+        self.inner = JsonPlusSerializer()
+        self.bytes: Dict[str, int] = defaultdict(int)
+
+    def dumps_typed(self, obj: Any) -> Tuple[str, bytes]:
+        type_, data = self.inner.dumps_typed(obj)
+        self.bytes[_phase.get()] += len(data)
+        return type_, data
+
+    def loads_typed(self, data: Tuple[str, bytes]) -> Any:
+        return self.inner.loads_typed(data)
+
+
+def _resolve(value: Optional[str], target: str) -> Optional[str]:
+    return value.format(target=target) if value else value
+
+
+def _target(values: Dict[str, Any]) -> str:
+    """1:1 대화/투표 대상: 팬텀이 아닌 첫 번째 생존자 (세션마다 같은 흐름이 되도록)"""
+    alive = [name for name, alive in values["alive_status"].items() if alive]
+    return next((name for name in alive if name != values["phantom_name"]), alive[0])
+
+
+def _latest_checkpoint_bytes(saver, thread_id: str) -> int:
+    with saver._lock:
+        row = saver.conn.execute(
+            "SELECT length(checkpoint) + length(metadata) FROM checkpoints "
+            "WHERE thread_id = ? ORDER BY checkpoint_id DESC LIMIT 1",
+            (thread_id,),
+        ).fetchone()
+    return row[0] if row else 0
+
+
+# --- graph 드라이버 ---
+
+async def _graph_step(app, payload, config, node_times: Dict[str, List[float]]) -> None:
+    """그래프를 한 번 재개하고, tasks 스트림으로 노드별 실행 시간을 기록"""
+    started: Dict[str, float] = {}
+    async for event in app.astream(payload, config, stream_mode="tasks"):
+        now = time.perf_counter()
+        if "input" in event:
+            started[event["id"]] = now
+        elif event["id"] in started:
+            node_times[event["name"]].append(now - started.pop(event["id"]))
+
+
+async def _graph_session(app, build_resume_data, request_model, thread_id: str, stats) -> None:
+    config = {"configurable": {"thread_id": thread_id}}
+
+    _phase.set("setup")
+    start = time.perf_counter()
+    await _graph_step(app, {}, config, stats["nodes"])
+    stats["phases"]["setup"].append(time.perf_counter() - start)
+    target = _target((await app.aget_state(config)).values)
+
+    for action_type, content, action_target in SCENARIO:
+        _phase.set(action_type)
+        request = request_model(
+            thread_id=thread_id, action_type=action_type,
+            content=_resolve(content, target), target=_resolve(action_target, target),
+        )
+        start = time.perf_counter()
+        await _graph_step(app, Command(resume=build_resume_data(request)), config, stats["nodes"])
+        stats["phases"][action_type].append(time.perf_counter() - start)
+
+
+async def run_graph(sessions: int, workdir: str) -> Dict[str, Any]:
+    from backend.main import UserActionRequest, build_resume_data
+    from graph.checkpoint import SQLiteCheckpointSaver
+    from graph.workflow import create_game_graph
+
+    serde = _CountingSerde()
+    saver = SQLiteCheckpointSaver(os.path.join(workdir, f"graph-{sessions}.sqlite"), serde=serde)
+    app = create_game_graph(checkpointer=saver)
+    stats = {"nodes": defaultdict(list), "phases": defaultdict(list)}
+
+    start = time.perf_counter()
+    await asyncio.gather(*[
+        _graph_session(app, build_resume_data, UserActionRequest, f"graph-{sessions}-{i}", stats)
+        for i in range(sessions)
+    ])
+    wall = time.perf_counter() - start
+
+    state_bytes = [_latest_checkpoint_bytes(saver, f"graph-{sessions}-{i}") for i in range(sessions)]
+    return {
+        "driver": "graph",
+        "sessions": sessions,
+        "wall_s": round(wall, 3),
+        "nodes": {name: _summary(times) for name, times in sorted(stats["nodes"].items())},
+        "phases": {
+            phase: {**_summary(times), "checkpoint_bytes_per_session": serde.bytes[phase] // sessions}
+            for phase, times in stats["phases"].items()
+        },
+        "final_checkpoint_bytes": {
+            "mean": sum(state_bytes) // sessions,
+            "max": max(state_bytes),
+        },
+    }
+
+
+# --- http 드라이버 ---
+
+async def _call(client: httpx.AsyncClient, stats, label: str, method: str, url: str, body=None) -> Dict[str, Any]:
+    content = json.dumps(body).encode() if body is not None else None
+    start = time.perf_counter()
+    response = await client.request(
+        method, url, content=content, headers={"Content-Type": "application/json"} if content else None
+    )
+    elapsed = time.perf_counter() - start
+    response.raise_for_status()
+    stats["upstreams"][response.headers.get("X-Upstream", "local")] += 1
+    stats["latency"][label].append(elapsed)
+    stats["request_bytes"][label].append(len(content or b""))
+    stats["response_bytes"][label].append(len(response.content))
+    return response.json()
+
+
+async def _http_session(client: httpx.AsyncClient, thread_id: str, stats) -> None:
+    _phase.set("setup")
+    await _call(client, stats, "POST /api/game/start", "POST", "/api/game/start", {"thread_id": thread_id})
+    state = await _call(client, stats, "GET /api/game/state", "GET", f"/api/game/state/{thread_id}")
+    target = _target({**state, "phantom_name": None})
+    cursor = state["cursor"]
+
+    for action_type, content, action_target in SCENARIO:
+        _phase.set(action_type)
+        body = {
+            "thread_id": thread_id, "action_type": action_type,
+            "content": _resolve(content, target), "target": _resolve(action_target, target),
+        }
+        await _call(client, stats, f"POST /api/game/action [{action_type}]", "POST", "/api/game/action", body)
+        # 프론트엔드처럼 커서 기반 delta 상태 조회
+        state = await _call(client, stats, "GET /api/game/state?since", "GET", f"/api/game/state/{thread_id}?since={cursor}")
+        cursor = state["cursor"]
+
+
+async def run_http(sessions: int, backend, base_url: Optional[str] = None) -> Dict[str, Any]:
+    """backend: in-process로 호출할 backend.main 모듈 (base_url이 있으면 그 서버로 보내고 체크포인트 바이트는 재지 않음)"""
+    serde = _CountingSerde()
+    stats = {
+        "latency": defaultdict(list), "request_bytes": defaultdict(list), "response_bytes": defaultdict(list),
+        "upstreams": defaultdict(int),
+    }
+    if base_url:
+        client = httpx.AsyncClient(base_url=base_url, timeout=None)
+        # 공유 체크포인트 DB에 이전 실행의 세션이 남아 있으므로 실행마다 다른 세션 id
+        prefix = f"http-{int(time.time())}-{sessions}"
+    else:
+        backend.graph_app.checkpointer.serde = serde
+        client = httpx.AsyncClient(transport=httpx.ASGITransport(app=backend.app), base_url="http://benchmark", timeout=None)
+        prefix = f"http-{sessions}"
+
+    async with client:
+        start = time.perf_counter()
+        await asyncio.gather(*[_http_session(client, f"{prefix}-{i}", stats) for i in range(sessions)])
+        wall = time.perf_counter() - start
+
+    return {
+        "driver": "http",
+        "sessions": sessions,
+        "wall_s": round(wall, 3),
+        "endpoints": {
+            label: {
+                **_summary(times),
+                "request_bytes_mean": sum(stats["request_bytes"][label]) // len(times),
+                "response_bytes_mean": sum(stats["response_bytes"][label]) // len(times),
+            }
+            for label, times in stats["latency"].items()
+        },
+        "checkpoint_bytes_per_session": {phase: n // sessions for phase, n in serde.bytes.items()},
+        # 요청을 처리한 워커별 요청 수 (라우터의 X-Upstream 헤더, in-process면 "local")
+        "upstreams": dict(stats["upstreams"]),
+    }
+
+
+def _print(result: Dict[str, Any]) -> None:
+    print(f"\n[{result['driver']}] sessions={result['sessions']}  wall={result['wall_s']}s")
+    rows = result.get("nodes") or result.get("endpoints")
+    for label, summary in rows.items():
+        print(f"  {label:<40} n={summary['count']:<6} p50 {summary['p50_ms']:8.1f}ms  p99 {summary['p99_ms']:8.1f}ms")
+
+
+async def main_async(levels: List[int], drivers: List[str], output: str, args: argparse.Namespace) -> None:
+    workdir = tempfile.mkdtemp(prefix="phantom-bench-")
+    os.environ["CHECKPOINT_BACKEND"] = "sqlite"
+    os.environ["CHECKPOINT_DB"] = os.path.join(workdir, "http.sqlite")
+    os.environ["TRANSCRIPT_DB"] = os.path.join(workdir, "transcripts.sqlite")
+    random.seed(args.seed)
+
+    backend = None
+    if not args.base_url:
+        import backend.main as backend
+
+    results = []
+    for sessions in levels:
+        if "graph" in drivers:
+            results.append(await run_graph(sessions, workdir))
+            _print(results[-1])
+        if "http" in drivers:
+            results.append(await run_http(sessions, backend, args.base_url))
+            _print(results[-1])
+
+    report = {
+        "config": {
+            "latency": args.latency,
+            "error_rate": args.error_rate,
+            "base_url": args.base_url,
+            "seed": args.seed,
+            "turn_mode": os.getenv("DISCUSSION_TURN_MODE", "heuristic"),
+            "scenario": [action for action, _, _ in SCENARIO],
+            "python": platform.python_version(),
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        },
+        "results": results,
+    }
+    with open(output, "w", encoding="utf-8") as f:
+        json.dump(report, f, ensure_ascii=False, indent=2)
+    print(f"\n결과 저장: {output}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="게임 그래프 + HTTP API 엔드투엔드 벤치마크")
+    parser.add_argument("--sessions", default="1,10,100", help="동시 세션 수 목록 (쉼표 구분, 예: 1,10,100,500)")
+    parser.add_argument("--drivers", default="graph,http", help="실행할 드라이버 (graph, http)")
+    parser.add_argument("--latency", default="lognormal:300,0.5", help="대체 LLM 지연 분포 (LLM_FAKE_LATENCY 형식)")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="서버 에러로 실패하는 LLM 호출 비율 (재시도/대체 응답 확인용)")
+    parser.add_argument("--base-url", default=None, help="http 드라이버가 호출할 서버 주소 (예: http://localhost:8080, 없으면 in-process / LLM 지연·에러율은 서버 환경 변수를 따름)")
+    parser.add_argument("--seed", type=int, default=0, help="게임/LLM 무작위 시드")
+    parser.add_argument("--output", default="e2e_results.json", help="결과 JSON 파일 경로")
+    args = parser.parse_args()
+
+    os.environ["LLM_FAKE_LATENCY"] = args.latency
+    os.environ["LLM_FAKE_SEED"] = str(args.seed)
+    os.environ["LLM_FAKE_ERROR_RATE"] = str(args.error_rate)
+    levels = [int(n) for n in args.sessions.split(",")]
+    drivers = [d.strip() for d in args.drivers.split(",")]
+    asyncio.run(main_async(levels, drivers, args.output, args))
+
+
+if __name__ == "__main__":
+    main()
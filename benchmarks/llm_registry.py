@@ -0,0 +1,67 @@
+"""
+LLM 클라이언트 레지스트리 벤치마크
+매 턴마다 클라이언트를 새로 만드는 방식과 공유 레지스트리를 쓰는 방식의
+턴당 지연 시간을 동시 게임 수별로 비교한다.
+
+실행: python -m benchmarks.llm_registry --games 20 --turns 10
+"""
+
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, List
+import argparse
+import os
+import statistics
+import time
+
+from langchain_core.messages import HumanMessage
+
+os.environ["LLM_BACKEND"] = "local"
+
+from graph.llm import LocalChatModel, clear_llm_registry, get_llm  # noqa: E402
+
+
+def _percentile(values: List[float], pct: float) -> float:
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+def _fresh_client() -> LocalChatModel:
+    """기존 방식: 노드 호출마다 새 클라이언트"""
+    return LocalChatModel(response_latency=float(os.getenv("LLM_LOCAL_LATENCY_MS", "300")) / 1000)
+
+
+def _play(turns: int, client_factory: Callable) -> List[float]:
+    """한 게임에서 turns번 발언하고 턴별 지연 시간을 반환"""
+    latencies = []
+    for _ in range(turns):
+        start = time.perf_counter()
+        client_factory().invoke([HumanMessage(content="한마디 하세요.")])
+        latencies.append(time.perf_counter() - start)
+    return latencies
+
+
+def run(games: int, turns: int, client_factory: Callable) -> List[float]:
+    with ThreadPoolExecutor(max_workers=games) as pool:
+        results = pool.map(lambda _: _play(turns, client_factory), range(games))
+    return [latency for game in results for latency in game]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="LLM 클라이언트 레지스트리 벤치마크")
+    parser.add_argument("--games", type=int, default=20, help="동시 게임 수")
+    parser.add_argument("--turns", type=int, default=10, help="게임당 턴 수")
+    args = parser.parse_args()
+
+    clear_llm_registry()
+    for label, factory in [("per-call client", _fresh_client), ("shared registry", get_llm)]:
+        latencies = run(args.games, args.turns, factory)
+        print(
+            f"{label:>16}: mean {statistics.mean(latencies) * 1000:7.1f}ms"
+            f"  p50 {_percentile(latencies, 50) * 1000:7.1f}ms"
+            f"  p99 {_percentile(latencies, 99) * 1000:7.1f}ms"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,66 @@
+"""
+다음 화자 스케줄러 마이크로 벤치마크
+대화 길이별로 schedule_speaker() 한 번에 걸리는 시간을 잰다. (LLM 화자 선정은 호출당 네트워크 왕복 한 번)
+
+실행: python -m benchmarks.scheduler --messages 10,50,200 --iterations 2000
+"""
+
+import argparse
+import random
+import time
+
+from langchain_core.messages import AIMessage, HumanMessage
+
+from graph.scheduler import schedule_speaker, speaker_scores
+
+NAMES = ["한기옥", "박서준", "이하늘", "최민수", "정유진"]
+
+
+def synthetic_state(count: int, seed: int) -> dict:
+    """count개 메시지의 가짜 토론 상태 (일부 발언은 다른 캐릭터를 호명)"""
+    rng = random.Random(seed)
+    messages = []
+    for i in range(count):
+        speaker = rng.choice(NAMES)
+        target = rng.choice([name for name in NAMES if name != speaker])
+        if i % 7 == 0:
+            messages.append(HumanMessage(content=f"[{target}에게] 어젯밤에 뭐 하셨어요?", name="User"))
+        elif i % 3 == 0:
+            messages.append(AIMessage(content=f"{target[1:]} 씨, 아까 한 말이 좀 이상한데요.", name=speaker))
+        else:
+            messages.append(AIMessage(content="저는 그때 제 방에 있었어요. 다들 좀 진정하세요.", name=speaker))
+    return {
+        "messages": messages,
+        "current_speaker": messages[-1].name if messages else None,
+        "suspicion_counts": {name: rng.randint(0, 5) for name in NAMES},
+    }
+
+
+def measure(count: int, iterations: int, seed: int) -> float:
+    """호출당 평균 시간 (µs)"""
+    state = synthetic_state(count, seed)
+    rng = random.Random(seed)
+    start = time.perf_counter()
+    for _ in range(iterations):
+        schedule_speaker(state, NAMES, rng)
+    return (time.perf_counter() - start) / iterations * 1e6
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--messages", default="10,50,200", help="대화 길이 목록 (쉼표 구분)")
+    parser.add_argument("--iterations", type=int, default=2000)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    print(f"{'messages':>10} {'us/call':>10}  scores (마지막 상태)")
+    for count in [int(c) for c in args.messages.split(",") if c.strip()]:
+        per_call = measure(count, args.iterations, args.seed)
+        state = synthetic_state(count, args.seed)
+        scores = speaker_scores(state, [n for n in NAMES if n != state["current_speaker"]])
+        summary = ", ".join(f"{name}={score:.2f}" for name, score in scores.items())
+        print(f"{count:>10} {per_call:>10.1f}  {summary}")
+
+
+if __name__ == "__main__":
+    main()
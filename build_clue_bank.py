@@ -0,0 +1,31 @@
+"""
+단서 뱅크 생성 스크립트
+캐릭터(팬텀) × 희생자 × 라운드 조합별 단서를 미리 LLM으로 만들어 파일에 저장한다.
+게임 서버는 CLUE_BANK 경로(기본 clue_bank.sqlite)에 파일이 있으면 밤 페이즈에서 이 단서를 먼저 사용한다.
+
+실행: python build_clue_bank.py --variants 3 --rounds 4
+"""
+
+import argparse
+import asyncio
+import os
+
+from graph.clue_bank import build
+
+
+def main():
+    parser = argparse.ArgumentParser(description="캐릭터별 단서 뱅크 생성")
+    parser.add_argument("--variants", type=int, default=3, help="조합별로 만들 단서 수")
+    parser.add_argument("--rounds", type=int, default=4, help="생성할 밤(라운드) 수")
+    parser.add_argument("--concurrency", type=int, default=8, help="동시 LLM 호출 수")
+    parser.add_argument("--output", default=os.getenv("CLUE_BANK") or "clue_bank.sqlite", help="저장할 파일")
+    args = parser.parse_args()
+
+    count, failed = asyncio.run(build(args.output, args.variants, args.rounds, args.concurrency))
+    print(f"{count}개 단서를 {args.output}에 저장했습니다.")
+    if failed:
+        print(f"단서를 만들지 못한 조합 {failed}개 (다시 실행하면 기존 단서는 두고 추가합니다)")
+
+
+if __name__ == "__main__":
+    main()
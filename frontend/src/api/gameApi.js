@@ -15,19 +15,70 @@ export const gameApi = {
     return await client.post('/api/game/start', { thread_id: threadId });
   },
 
-  // 상태 조회
-  getState: async (threadId) => {
-    const response = await client.get(`/api/game/state/${threadId}`);
+  // 상태 조회 (cursor를 주면 이후 변경분만 반환)
+  getState: async (threadId, cursor = null) => {
+    const response = await client.get(`/api/game/state/${threadId}`, {
+      params: cursor ? { since: cursor } : {}
+    });
     return response.data;
   },
 
-  // 액션 전송
-  sendAction: async (threadId, actionType, content = null, target = null) => {
+  // 라운드 요약으로 정리된 지난 대화 원문 조회
+  getTranscript: async (threadId) => {
+    const response = await client.get(`/api/game/transcript/${threadId}`);
+    return response.data;
+  },
+
+  // 액션 전송 (재시도할 때 같은 idempotencyKey를 넘기면 서버가 처음 결과를 돌려줌, 키는 호출하는 쪽에서 액션마다 생성)
+  sendAction: async (threadId, actionType, content = null, target = null, idempotencyKey = null) => {
     return await client.post('/api/game/action', {
       thread_id: threadId,
       action_type: actionType,
       content: content,
-      target: target
+      target: target,
+      idempotency_key: idempotencyKey
+    });
+  },
+
+  // 액션 스트리밍 (SSE) - onEvent(eventName, data)로 토큰/메시지/페이즈/최종 상태 전달
+  streamAction: async (threadId, actionType, onEvent, content = null, target = null, turns = null, idempotencyKey = null) => {
+    const response = await fetch(`${API_BASE_URL}/api/game/action/stream`, {
+      method: 'POST',
+      headers: { 'Content-Type': 'application/json' },
+      body: JSON.stringify({
+        thread_id: threadId,
+        action_type: actionType,
+        content: content,
+        target: target,
+        turns: turns,
+        idempotency_key: idempotencyKey
+      })
     });
+    if (!response.ok || !response.body) {
+      throw new Error(`Stream failed: ${response.status}`);
+    }
+
+    const reader = response.body.getReader();
+    const decoder = new TextDecoder();
+    let buffer = '';
+
+    while (true) {
+      const { value, done } = await reader.read();
+      if (done) break;
+      buffer += decoder.decode(value, { stream: true });
+
+      // SSE 프레임은 빈 줄로 구분
+      const frames = buffer.split('\n\n');
+      buffer = frames.pop();
+      for (const frame of frames) {
+        let eventName = 'message';
+        let data = '';
+        for (const line of frame.split('\n')) {
+          if (line.startsWith('event: ')) eventName = line.slice(7);
+          else if (line.startsWith('data: ')) data += line.slice(6);
+        }
+        if (data) onEvent(eventName, JSON.parse(data));
+      }
+    }
   }
 };
\ No newline at end of file
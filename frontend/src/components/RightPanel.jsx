@@ -1,7 +1,7 @@
 import React from 'react';
-import { Sun, Moon, Search, Play, FolderOpen } from 'lucide-react';
+import { Sun, Moon, Search, Play, FolderOpen, FastForward } from 'lucide-react';
 
-const RightPanel = ({ phase, survivorCount, onNightStart, onDiscuss, onEndDiscuss, onContinue, onShowSummary, onShowClues }) => {
+const RightPanel = ({ phase, survivorCount, onNightStart, onDiscuss, onEndDiscuss, onContinue, onAutoAdvance, onShowSummary, onShowClues }) => {
    const isFreeDiscussion = phase === 'free_discussion';
 
    return (
@@ -66,6 +66,14 @@ const RightPanel = ({ phase, survivorCount, onNightStart, onDiscuss, onEndDiscus
                      대화 이어가기
                   </button>
 
+                  <button
+                     onClick={onAutoAdvance}
+                     className="w-full py-3 bg-noir-800 border border-green-500/50 rounded-lg text-green-400 hover:bg-green-500/10 hover:text-green-300 hover:border-green-400 transition-colors flex items-center justify-center gap-2 text-sm cursor-pointer"
+                  >
+                     <FastForward className="w-4 h-4" />
+                     자동 진행 (5턴)
+                  </button>
+
                   <button
                      onClick={onEndDiscuss}
                      className="w-full py-3 bg-noir-800 border border-red-500/50 rounded-lg text-red-400 hover:bg-red-500/10 hover:text-red-300 hover:border-red-400 transition-colors flex items-center justify-center gap-2 text-sm cursor-pointer"
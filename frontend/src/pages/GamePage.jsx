@@ -1,10 +1,10 @@
-import React, { useState, useEffect } from 'react';
+import React, { useState, useEffect, useRef } from 'react';
 import { useNavigate } from 'react-router-dom';
 import ChatLog from '../components/ChatLog';
 import CharacterCard from '../components/CharacterCard';
 import RightPanel from '../components/RightPanel';
 import { gameApi } from '../api/gameApi';
-import { generateSessionId } from '../utils/session';
+import { generateIdempotencyKey, generateSessionId } from '../utils/session';
 import { Loader2, RotateCcw, Trophy, Skull, Search } from 'lucide-react';
 
 const GamePage = () => {
@@ -16,6 +16,13 @@ const GamePage = () => {
   const [characters, setCharacters] = useState([]);
   const [phase, setPhase] = useState('Initializing...');
   const [loading, setLoading] = useState(false);
+  const [streaming, setStreaming] = useState(false); // 액션 스트리밍 중 (전체 화면 로딩 없이 입력만 잠금)
+  const [draft, setDraft] = useState(null); // 스트리밍 중인 캐릭터 발언
+  const [autoAdvancing, setAutoAdvancing] = useState(false); // 자동 진행 중 (입력하면 서버가 자동 진행을 멈춤)
+  const [history, setHistory] = useState([]); // 지난 라운드 대화 (서버 상태에서는 요약으로 정리됨)
+  const roundRef = useRef(null);
+  const serverStateRef = useRef(null); // 마지막으로 받은 서버 상태 (변경분 병합용)
+  const pendingActionRef = useRef(null); // 아직 끝나지 않은 액션 { fingerprint, key } (중복 클릭/재시도는 같은 키)
   const [userInput, setUserInput] = useState('');
   const [gameOverInfo, setGameOverInfo] = useState(null); // 게임 종료 정보
 
@@ -43,6 +50,9 @@ const GamePage = () => {
     setUserInput('');
     setRoundSummaries({});
     setClues([]);
+    setHistory([]);
+    roundRef.current = null;
+    serverStateRef.current = null;
     setLoading(true);
 
     try {
@@ -64,56 +74,145 @@ const GamePage = () => {
       const targetId = currentId || threadId;
       if (!targetId) return;
 
-      const data = await gameApi.getState(targetId);
-
-      // 데이터 매핑
-      const rawCharacters = Array.isArray(data.characters) ? data.characters : [];
-      const mappedCharacters = rawCharacters.map(char => ({
-        ...char,
-        suspicion: data.suspicion_counts?.[char.name] ?? 0,
-        status: data.alive_status?.[char.name] === false ? 'dead' : 'alive'
-      }));
-      setCharacters(mappedCharacters);
-
-      const rawMessages = Array.isArray(data.messages) ? data.messages : [];
-      const formattedMessages = rawMessages.map(msg => {
-        const safeSender = msg.sender || msg.name || 'Unknown';
-        const speaker = mappedCharacters.find(c => c.name === safeSender);
-        return {
-          sender: safeSender,
-          text: msg.content || msg.text || '...',
-          type: (safeSender === 'System' || msg.type === 'system') ? 'system' : 'agent',
-          job: speaker?.job || 'Unknown'
-        };
+      const data = await gameApi.getState(targetId, serverStateRef.current?.cursor);
+      applyGameState(data);
+    } catch (error) {
+      console.error("Fetch error:", error);
+    }
+  };
+
+  // 서버 상태를 화면 상태로 반영
+  const applyGameState = (response) => {
+    // 변경분 응답이면 이전 상태에 병합
+    // (요약으로 정리된 메시지는 빼고, 새 메시지는 뒤에 이어 붙임)
+    const prev = serverStateRef.current;
+    const offset = response.message_offset ?? 0;
+    const data = (response.delta && prev && !response.truncated)
+      ? {
+          ...prev,
+          ...response,
+          messages: [
+            ...prev.messages.filter(msg => msg.seq === undefined || msg.seq >= offset),
+            ...(response.messages || [])
+          ]
+        }
+      : response;
+    serverStateRef.current = data;
+
+    // 데이터 매핑
+    const rawCharacters = Array.isArray(data.characters) ? data.characters : [];
+    const mappedCharacters = rawCharacters.map(char => ({
+      ...char,
+      suspicion: data.suspicion_counts?.[char.name] ?? 0,
+      status: data.alive_status?.[char.name] === false ? 'dead' : 'alive'
+    }));
+    setCharacters(mappedCharacters);
+
+    const rawMessages = Array.isArray(data.messages) ? data.messages : [];
+    const formattedMessages = rawMessages.map(msg => {
+      const safeSender = msg.sender || msg.name || 'Unknown';
+      const speaker = mappedCharacters.find(c => c.name === safeSender);
+      return {
+        sender: safeSender,
+        text: msg.content || msg.text || '...',
+        type: (safeSender === 'System' || msg.type === 'system') ? 'system' : 'agent',
+        job: speaker?.job || 'Unknown'
+      };
+    });
+    setMessages(formattedMessages);
+    setPhase(data.phase || 'Unknown');
+
+    // 라운드가 바뀌면 정리된 지난 대화를 아카이브에서 불러옴
+    if (roundRef.current !== null && roundRef.current !== data.round_number) {
+      loadHistory(mappedCharacters);
+    }
+    roundRef.current = data.round_number;
+    setRoundSummaries(data.round_summaries || {});
+    setClues(data.clues || []);
+
+    // 게임 종료 체크 (Backend에서 game_over 플래그나 phase가 'end'일 때)
+    if (data.game_over || data.phase === 'end') {
+      setGameOverInfo({
+        phantom: data.phantom_name || 'Unknown',
+        result: 'Mission Complete' // 승패 로직에 따라 변경 가능
       });
-      setMessages(formattedMessages);
-      setPhase(data.phase || 'Unknown');
-      setRoundSummaries(data.round_summaries || {});
-      setClues(data.clues || []);
-
-      // 게임 종료 체크 (Backend에서 game_over 플래그나 phase가 'end'일 때)
-      if (data.game_over || data.phase === 'end') {
-        setGameOverInfo({
-          phantom: data.phantom_name || 'Unknown',
-          result: 'Mission Complete' // 승패 로직에 따라 변경 가능
-        });
-      }
+    }
+  };
 
+  const loadHistory = async (mappedCharacters) => {
+    try {
+      const data = await gameApi.getTranscript(threadId);
+      setHistory((data.archived || []).map(msg => ({
+        sender: msg.sender,
+        text: msg.content,
+        type: msg.sender === 'System' ? 'system' : 'agent',
+        job: mappedCharacters.find(c => c.name === msg.sender)?.job || 'Unknown'
+      })));
     } catch (error) {
-      console.error("Fetch error:", error);
+      console.error("Transcript error:", error);
+    }
+  };
+
+  // 스트리밍 중 메시지를 화면 형식으로 변환
+  const toChatMessage = (sender, text) => {
+    const speaker = characters.find(c => c.name === sender);
+    return {
+      sender,
+      text,
+      type: sender === 'System' ? 'system' : 'agent',
+      job: speaker?.job || 'Unknown'
+    };
+  };
+
+  // 같은 액션이 끝나기 전에 다시 오면(두 번 클릭, 실패 후 재시도) 같은 키를 써서 서버가 한 번만 실행하게 함
+  const actionKey = (fingerprint) => {
+    if (pendingActionRef.current?.fingerprint !== fingerprint) {
+      pendingActionRef.current = { fingerprint, key: generateIdempotencyKey() };
     }
+    return pendingActionRef.current.key;
   };
 
-  const handleAction = async (actionType, content = null, target = null) => {
+  const handleAction = async (actionType, content = null, target = null, turns = null) => {
     if (!threadId) return;
+    const isAuto = actionType === 'auto';
+    const fingerprint = JSON.stringify([threadId, actionType, content, target, turns]);
+    const idempotencyKey = actionKey(fingerprint);
+    let completed = false;
+    const onEvent = (event, data) => {
+      if (event === 'token') {
+        // 발언 중인 캐릭터의 텍스트를 토큰 단위로 이어 붙임
+        setDraft(prev => toChatMessage(data.sender, (prev?.sender === data.sender ? prev.text : '') + data.content));
+      } else if (event === 'message') {
+        setDraft(null);
+        setMessages(prev => [...prev, toChatMessage(data.sender, data.content)]);
+      } else if (event === 'phase') {
+        if (data.phase) setPhase(data.phase);
+      } else if (event === 'state') {
+        completed = true;
+        applyGameState(data);
+      } else if (event === 'error') {
+        console.error("Action error:", data.detail);
+      }
+    };
     try {
-      setLoading(true);
-      await gameApi.sendAction(threadId, actionType, content, target);
-      await fetchGameState(threadId);
+      setStreaming(true);
+      if (isAuto) setAutoAdvancing(true);
+      try {
+        await gameApi.streamAction(threadId, actionType, onEvent, content, target, turns, idempotencyKey);
+      } catch (error) {
+        // 연결이 끊긴 경우(fetch TypeError) 한 번 더: 이미 끝났다면 서버가 결과만 다시 보냄
+        if (completed || !(error instanceof TypeError)) throw error;
+        await gameApi.streamAction(threadId, actionType, onEvent, content, target, turns, idempotencyKey);
+      }
     } catch (error) {
       console.error("Action error:", error);
     } finally {
-      setLoading(false);
+      if (completed && pendingActionRef.current?.key === idempotencyKey) {
+        pendingActionRef.current = null;
+      }
+      setDraft(null);
+      setStreaming(false);
+      if (isAuto) setAutoAdvancing(false);
     }
   };
 
@@ -253,7 +352,7 @@ const GamePage = () => {
       <div className="flex-1 flex flex-col min-w-0 bg-noir-900/30 relative">
         {/* Chat Log */}
         <div className="flex-1 relative overflow-hidden">
-          <ChatLog messages={messages} />
+          <ChatLog messages={[...history, ...messages, ...(draft ? [draft] : [])]} />
         </div>
 
         {/* Input */}
@@ -265,9 +364,9 @@ const GamePage = () => {
               onChange={(e) => setUserInput(e.target.value)}
               placeholder="Type your deduction..."
               className="w-full bg-noir-900/90 border border-noir-600 rounded-xl p-4 pl-6 pr-14 text-gray-100 placeholder-gray-600 focus:border-neon-cyan focus:ring-1 focus:ring-neon-cyan focus:outline-none transition-all shadow-lg"
-              disabled={loading || !!gameOverInfo}
+              disabled={loading || (streaming && !autoAdvancing) || !!gameOverInfo}
             />
-            <button type="submit" disabled={loading} className="absolute right-3 top-1/2 -translate-y-1/2 p-2 text-gray-400 hover:text-neon-cyan transition-colors disabled:opacity-50">
+            <button type="submit" disabled={loading || (streaming && !autoAdvancing)} className="absolute right-3 top-1/2 -translate-y-1/2 p-2 text-gray-400 hover:text-neon-cyan transition-colors disabled:opacity-50">
               <span className="text-xl">↵</span>
             </button>
           </form>
@@ -284,6 +383,7 @@ const GamePage = () => {
           onDiscuss={() => handleAction('discuss')}
           onEndDiscuss={() => handleAction('end_discuss')}
           onContinue={() => handleAction('next')}
+          onAutoAdvance={() => handleAction('auto', null, null, 5)}
           onShowSummary={() => setShowSummaryModal(true)}
           onShowClues={() => setShowClueModal(true)}
         />
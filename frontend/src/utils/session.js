@@ -1,4 +1,11 @@
 // 간단한 UUID 생성기 (라이브러리 없이 사용)
 export const generateSessionId = () => {
   return 'session-' + Math.random().toString(36).substr(2, 9) + '-' + Date.now();
-};
\ No newline at end of file
+};
+// 액션 idempotency key (crypto.randomUUID는 HTTPS/localhost에서만 있으므로 없으면 직접 생성)
+export const generateIdempotencyKey = () => {
+  if (typeof crypto !== 'undefined' && typeof crypto.randomUUID === 'function') {
+    return crypto.randomUUID();
+  }
+  return 'action-' + Date.now().toString(36) + '-' + Math.random().toString(36).slice(2, 12) + Math.random().toString(36).slice(2, 12);
+};
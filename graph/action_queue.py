@@ -0,0 +1,175 @@
+"""
+세션별 액션 직렬화와 멱등 재시도
+같은 게임 세션(thread_id)의 액션은 한 번에 하나씩만 그래프를 재개한다.
+"다음" 버튼을 두 번 누르거나 타임아웃 뒤 클라이언트가 다시 보내도 중단된 그래프가 두 번 재개되지 않는다.
+
+- thread_slot(): 세션별 asyncio 락, 대기 중인 요청이 ACTION_QUEUE_SIZE개를 넘거나
+  ACTION_WAIT_TIMEOUT초 안에 차례가 오지 않으면 ThreadBusy
+- idempotency key: 같은 키로 다시 온 요청은 그래프를 다시 실행하지 않고 처음 결과를 돌려준다.
+- ACTION_LOCK_FILE: 여러 프로세스(워커/컨테이너)가 체크포인트 DB를 공유할 때
+  공유 볼륨의 이 파일에 세션별 바이트 범위 락(fcntl)을 잡아 프로세스 사이에서도 직렬화한다.
+  (멱등 결과는 프로세스별로 보관하므로 재시도가 같은 워커로 가도록 라우팅해야 재생된다)
+"""
+
+from collections import OrderedDict
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Dict, Optional, Tuple
+import asyncio
+import os
+import time
+import zlib
+
+# 실행 중인 요청 외에 세션별로 기다릴 수 있는 요청 수
+MAX_QUEUED = int(os.getenv("ACTION_QUEUE_SIZE", "2"))
+# 차례를 기다리는 최대 시간 (초)
+WAIT_TIMEOUT = float(os.getenv("ACTION_WAIT_TIMEOUT", "60"))
+# 멱등 결과 보관 수 / 시간 (초)
+IDEMPOTENCY_MAX_ENTRIES = int(os.getenv("IDEMPOTENCY_MAX_ENTRIES", "10000"))
+IDEMPOTENCY_TTL = float(os.getenv("IDEMPOTENCY_TTL", "600"))
+# 프로세스 간 세션 락 파일 (비어 있으면 프로세스 안에서만 직렬화)
+LOCK_FILE = os.getenv("ACTION_LOCK_FILE", "")
+# 세션을 나눠 담을 바이트 범위 수 (해시가 겹친 세션끼리는 서로 기다림)
+LOCK_SLOTS = 1 << 20
+# 다른 프로세스가 락을 쥐고 있을 때 다시 시도하는 간격 (초, 최대)
+LOCK_POLL_MAX = 0.05
+
+
+class ThreadBusy(Exception):
+    """세션의 대기열이 가득 찼거나 기다리다 시간 초과"""
+
+
+class IdempotencyConflict(Exception):
+    """같은 idempotency key로 다른 내용의 요청이 들어옴"""
+
+
+class _Slot:
+    __slots__ = ("lock", "users")
+
+    def __init__(self) -> None:
+        self.lock = asyncio.Lock()
+        self.users = 0  # 실행 중 + 대기 중인 요청 수
+
+
+class _FileLocks:
+    """
+    공유 파일의 세션별 바이트 범위 락
+    fcntl 락은 프로세스 단위라 같은 프로세스에서 같은 범위를 두 번 잡아도 막히지 않고,
+    한 번 풀면 모두 풀린다. 그래서 범위별 보유 수를 세어 처음 잡을 때만 잡고 마지막에만 푼다.
+    """
+
+    def __init__(self, path: str) -> None:
+        import fcntl
+
+        self._fcntl = fcntl
+        self.fd = os.open(path, os.O_RDWR | os.O_CREAT, 0o644)
+        self._held: Dict[int, int] = {}
+
+    @staticmethod
+    def offset(thread_id: str) -> int:
+        return zlib.crc32(thread_id.encode()) % LOCK_SLOTS
+
+    def _try_lock(self, offset: int) -> bool:
+        try:
+            self._fcntl.lockf(self.fd, self._fcntl.LOCK_EX | self._fcntl.LOCK_NB, 1, offset)
+            return True
+        except OSError:
+            return False
+
+    async def acquire(self, thread_id: str, deadline: float) -> None:
+        """deadline(time.monotonic 기준)까지 락을 못 잡으면 ThreadBusy"""
+        offset = self.offset(thread_id)
+        if offset not in self._held:
+            delay = 0.001
+            while not self._try_lock(offset):
+                if time.monotonic() + delay > deadline:
+                    raise ThreadBusy(f"{WAIT_TIMEOUT:g}초 동안 다른 워커의 이전 요청이 끝나지 않았습니다")
+                await asyncio.sleep(delay)
+                delay = min(delay * 2, LOCK_POLL_MAX)
+        self._held[offset] = self._held.get(offset, 0) + 1
+
+    def release(self, thread_id: str) -> None:
+        offset = self.offset(thread_id)
+        self._held[offset] -= 1
+        if self._held[offset] == 0:
+            del self._held[offset]
+            self._fcntl.lockf(self.fd, self._fcntl.LOCK_UN, 1, offset)
+
+
+# 이벤트 루프 안에서만 접근하므로 별도 락이 필요 없다
+_slots: Dict[str, _Slot] = {}
+_results: "OrderedDict[Tuple[str, str], Tuple[str, float, Any]]" = OrderedDict()
+_file_locks: Optional[_FileLocks] = None
+
+
+def _get_file_locks() -> Optional[_FileLocks]:
+    global _file_locks
+    if LOCK_FILE and _file_locks is None:
+        _file_locks = _FileLocks(LOCK_FILE)
+    return _file_locks
+
+
+@asynccontextmanager
+async def thread_slot(thread_id: str) -> AsyncIterator[None]:
+    """
+    세션의 차례가 올 때까지 기다렸다가 with 블록을 단독으로 실행
+    (ACTION_LOCK_FILE이 있으면 같은 파일을 쓰는 다른 프로세스와도 단독)
+    """
+    slot = _slots.get(thread_id)
+    if slot is None:
+        slot = _slots[thread_id] = _Slot()
+    if slot.users > MAX_QUEUED:
+        raise ThreadBusy(f"이 세션에 처리 대기 중인 요청이 너무 많습니다 ({slot.users}개)")
+
+    slot.users += 1
+    try:
+        deadline = time.monotonic() + WAIT_TIMEOUT
+        try:
+            await asyncio.wait_for(slot.lock.acquire(), WAIT_TIMEOUT)
+        except asyncio.TimeoutError:
+            raise ThreadBusy(f"{WAIT_TIMEOUT:g}초 동안 이전 요청이 끝나지 않았습니다") from None
+        try:
+            file_locks = _get_file_locks()
+            if file_locks is None:
+                yield
+                return
+            await file_locks.acquire(thread_id, deadline)
+            try:
+                yield
+            finally:
+                file_locks.release(thread_id)
+        finally:
+            slot.lock.release()
+    finally:
+        slot.users -= 1
+        if slot.users == 0 and _slots.get(thread_id) is slot:
+            del _slots[thread_id]
+
+
+def cached_result(thread_id: str, key: Optional[str], fingerprint: str) -> Optional[Any]:
+    """
+    같은 idempotency key로 이미 끝난 요청의 결과 (없거나 만료되었으면 None)
+    키가 같은데 요청 내용(fingerprint)이 다르면 IdempotencyConflict
+    """
+    if not key:
+        return None
+    entry = _results.get((thread_id, key))
+    if entry is None:
+        return None
+    stored_fingerprint, expires_at, result = entry
+    if expires_at <= time.monotonic():
+        del _results[(thread_id, key)]
+        return None
+    if stored_fingerprint != fingerprint:
+        raise IdempotencyConflict(f"idempotency key '{key}'가 다른 요청에 이미 사용되었습니다")
+    _results.move_to_end((thread_id, key))
+    return result
+
+
+def remember_result(thread_id: str, key: Optional[str], fingerprint: str, result: Any) -> None:
+    """성공한 요청의 결과를 idempotency key로 보관 (실패한 요청은 보관하지 않아 재시도하면 다시 실행)"""
+    if not key:
+        return
+    _results[(thread_id, key)] = (fingerprint, time.monotonic() + IDEMPOTENCY_TTL, result)
+    _results.move_to_end((thread_id, key))
+    while len(_results) > IDEMPOTENCY_MAX_ENTRIES:
+        _results.popitem(last=False)
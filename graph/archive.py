@@ -0,0 +1,103 @@
+"""
+대화 원본 아카이브
+라운드 요약 때 게임 상태(messages)에서 제거되는 메시지 원문을 체크포인트 밖의
+SQLite 파일에 보관한다. 상태와 체크포인트에는 요약본만 남으므로 크기가 라운드마다 늘지 않는다.
+"""
+
+from typing import Any, Dict, List, Optional
+import os
+import sqlite3
+import threading
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS transcripts (
+    thread_id TEXT NOT NULL,
+    seq INTEGER NOT NULL,
+    round_number INTEGER NOT NULL,
+    message_id TEXT,
+    role TEXT NOT NULL,
+    sender TEXT NOT NULL,
+    content TEXT NOT NULL,
+    PRIMARY KEY (thread_id, seq)
+);
+"""
+
+
+class TranscriptArchive:
+    """스레드별 대화 원문 저장소 (추가 전용)"""
+
+    def __init__(self, path: str = "transcripts.sqlite") -> None:
+        self.path = path
+        self._lock = threading.Lock()
+        self.conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.execute("PRAGMA busy_timeout=5000")
+        self.conn.executescript(_SCHEMA)
+
+    def append(self, thread_id: str, round_number: int, messages: List[Any]) -> None:
+        """메시지 목록을 아카이브 끝에 추가 (이미 저장된 message_id는 건너뜀)"""
+        if not messages:
+            return
+        with self._lock:
+            self.conn.execute("BEGIN")
+            try:
+                start, = self.conn.execute(
+                    "SELECT COALESCE(MAX(seq), -1) + 1 FROM transcripts WHERE thread_id = ?", (thread_id,)
+                ).fetchone()
+                known = {
+                    row[0] for row in self.conn.execute(
+                        "SELECT message_id FROM transcripts WHERE thread_id = ? AND message_id IS NOT NULL",
+                        (thread_id,),
+                    )
+                }
+                rows = []
+                for msg in messages:
+                    if msg.id and msg.id in known:
+                        continue
+                    rows.append((
+                        thread_id, start + len(rows), round_number, msg.id, msg.type,
+                        getattr(msg, "name", None) or "System", str(msg.content),
+                    ))
+                self.conn.executemany(
+                    "INSERT INTO transcripts (thread_id, seq, round_number, message_id, role, sender, content) "
+                    "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                    rows,
+                )
+                self.conn.execute("COMMIT")
+            except Exception:
+                self.conn.execute("ROLLBACK")
+                raise
+
+    def load(self, thread_id: str) -> List[Dict[str, Any]]:
+        """보관된 메시지 전체를 저장 순서대로 반환"""
+        with self._lock:
+            rows = self.conn.execute(
+                "SELECT round_number, sender, content FROM transcripts WHERE thread_id = ? ORDER BY seq",
+                (thread_id,),
+            ).fetchall()
+        return [{"round": r, "sender": sender, "content": content} for r, sender, content in rows]
+
+    def delete_thread(self, thread_id: str) -> None:
+        with self._lock:
+            self.conn.execute("DELETE FROM transcripts WHERE thread_id = ?", (thread_id,))
+
+
+_archive: Optional[TranscriptArchive] = None
+_archive_lock = threading.Lock()
+
+
+def get_archive() -> Optional[TranscriptArchive]:
+    """
+    프로세스 공용 아카이브 (TRANSCRIPT_DB 환경 변수, 기본 transcripts.sqlite)
+    TRANSCRIPT_DB를 빈 값으로 두면 아카이브하지 않는다.
+    """
+    global _archive
+    path = os.getenv("TRANSCRIPT_DB", "transcripts.sqlite")
+    if not path:
+        return None
+    if _archive is None:
+        with _archive_lock:
+            if _archive is None:
+                _archive = TranscriptArchive(path)
+    return _archive
@@ -0,0 +1,45 @@
+"""
+자유 토론 자동 진행 (auto-advance)
+한 번의 요청 안에서 select_next_speaker → character_speak 를 여러 턴 반복한다.
+진행 중에 유저가 끼어들면(다른 요청) 스레드별 중단 플래그로 다음 턴부터 멈춘다.
+"""
+
+from typing import Optional, Set
+import os
+import threading
+
+# 한 번에 진행할 수 있는 최대 턴 수 (턴 예산)
+MAX_AUTO_TURNS = int(os.getenv("AUTO_ADVANCE_MAX_TURNS", "10"))
+DEFAULT_AUTO_TURNS = int(os.getenv("AUTO_ADVANCE_DEFAULT_TURNS", "5"))
+
+_stop_requests: Set[str] = set()
+_lock = threading.Lock()
+
+
+def clamp_turns(turns: Optional[int]) -> int:
+    """요청한 턴 수를 1 ~ MAX_AUTO_TURNS 범위로 제한"""
+    if not turns:
+        turns = DEFAULT_AUTO_TURNS
+    return max(1, min(turns, MAX_AUTO_TURNS))
+
+
+def request_stop(thread_id: str) -> None:
+    """진행 중인 자동 진행을 현재 턴이 끝나면 멈추도록 요청"""
+    with _lock:
+        _stop_requests.add(thread_id)
+
+
+def consume_stop(thread_id: Optional[str]) -> bool:
+    """중단 요청이 있었는지 확인하고 플래그를 지움"""
+    if not thread_id:
+        return False
+    with _lock:
+        if thread_id in _stop_requests:
+            _stop_requests.discard(thread_id)
+            return True
+    return False
+
+
+def clear_stop(thread_id: str) -> None:
+    with _lock:
+        _stop_requests.discard(thread_id)
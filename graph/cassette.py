@@ -0,0 +1,160 @@
+"""
+LLM 응답 녹화/재생 (cassette)
+실제 모델의 응답을 (모델, 설정, 프롬프트) 해시를 키로 JSONL 파일에 녹화하고,
+이후에는 API 호출 없이 같은 응답을 재생한다. 실제 응답으로 그래프를 재현 가능하게 돌릴 때 사용한다.
+
+모드 (LLM_CASSETTE_MODE)
+- replay: 녹화된 응답만 사용 (없으면 CassetteMiss 에러)
+- record: 항상 실제 모델을 호출하고 응답을 덮어써 녹화
+- auto: 녹화된 응답이 있으면 재생, 없으면 실제 모델을 호출해 녹화
+"""
+
+from typing import Any, Dict, List, Optional, Tuple
+import asyncio
+import hashlib
+import json
+import os
+import threading
+import time
+
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import AIMessage, BaseMessage
+from langchain_core.outputs import ChatGeneration, ChatResult
+
+CASSETTE_MODES = ("replay", "record", "auto")
+
+
+class CassetteMiss(KeyError):
+    """replay 모드에서 녹화되지 않은 프롬프트가 들어옴"""
+
+
+def prompt_key(model: str, settings: Tuple, messages: List[BaseMessage]) -> str:
+    """모델, 생성 설정, 메시지 내용으로 만든 프롬프트 해시"""
+    payload = json.dumps(
+        {
+            "model": model,
+            "settings": [list(item) for item in settings],
+            "messages": [[msg.type, getattr(msg, "name", None), msg.content] for msg in messages],
+        },
+        ensure_ascii=False,
+        sort_keys=True,
+        default=str,
+    )
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+
+class Cassette:
+    """프롬프트 해시 → 응답 저장소 (JSONL, 추가 전용이며 같은 키는 나중 기록이 우선)"""
+
+    def __init__(self, path: str) -> None:
+        self.path = path
+        self._lock = threading.Lock()
+        self._entries: Dict[str, Dict[str, Any]] = {}
+        if os.path.exists(path):
+            with open(path, encoding="utf-8") as f:
+                for line in f:
+                    if line.strip():
+                        entry = json.loads(line)
+                        self._entries[entry["key"]] = entry
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        return self._entries.get(key)
+
+    def put(self, key: str, model: str, content: str, latency_ms: float) -> None:
+        entry = {"key": key, "model": model, "content": content, "latency_ms": round(latency_ms, 1)}
+        with self._lock:
+            self._entries[key] = entry
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            with open(self.path, "a", encoding="utf-8") as f:
+                f.write(json.dumps(entry, ensure_ascii=False) + "\n")
+
+
+_cassettes: Dict[str, Cassette] = {}
+_cassettes_lock = threading.Lock()
+
+
+def get_cassette(path: str) -> Cassette:
+    """경로별로 하나의 Cassette만 열어 프로세스 전체에서 공유"""
+    with _cassettes_lock:
+        if path not in _cassettes:
+            _cassettes[path] = Cassette(path)
+        return _cassettes[path]
+
+
+class CassetteChatModel(BaseChatModel):
+    """
+    다른 챗 모델 앞에서 응답을 녹화/재생하는 래퍼
+    replay_latency를 켜면 재생할 때 녹화 당시의 응답 지연만큼 기다린다.
+    """
+
+    model: str
+    inner: Optional[BaseChatModel] = None
+    cassette: Cassette
+    mode: str = "replay"
+    replay_latency: bool = False
+    settings: Tuple = ()
+
+    model_config = {"arbitrary_types_allowed": True}
+
+    def model_post_init(self, __context: Any) -> None:
+        if self.mode not in CASSETTE_MODES:
+            raise ValueError(f"알 수 없는 cassette 모드: {self.mode}")
+        if self.mode != "replay" and self.inner is None:
+            raise ValueError(f"{self.mode} 모드에는 녹화할 실제 모델이 필요합니다")
+
+    @property
+    def _llm_type(self) -> str:
+        return "cassette"
+
+    def _lookup(self, messages: List[BaseMessage]) -> Tuple[str, Optional[Dict[str, Any]]]:
+        key = prompt_key(self.model, self.settings, messages)
+        entry = None if self.mode == "record" else self.cassette.get(key)
+        if entry is None and self.mode == "replay":
+            raise CassetteMiss(f"녹화되지 않은 프롬프트입니다 (key={key[:12]}, cassette={self.cassette.path})")
+        return key, entry
+
+    @staticmethod
+    def _result(content: str) -> ChatResult:
+        return ChatResult(generations=[ChatGeneration(message=AIMessage(content=content))])
+
+    def _generate(
+        self,
+        messages: List[BaseMessage],
+        stop: Optional[List[str]] = None,
+        run_manager: Any = None,
+        **kwargs: Any,
+    ) -> ChatResult:
+        key, entry = self._lookup(messages)
+        if entry is not None:
+            if self.replay_latency:
+                time.sleep(entry["latency_ms"] / 1000)
+            return self._result(entry["content"])
+
+        start = time.perf_counter()
+        response = self.inner.invoke(messages, stop=stop, **kwargs)
+        self.cassette.put(key, self.model, str(response.content), (time.perf_counter() - start) * 1000)
+        return self._result(str(response.content))
+
+    async def _agenerate(
+        self,
+        messages: List[BaseMessage],
+        stop: Optional[List[str]] = None,
+        run_manager: Any = None,
+        **kwargs: Any,
+    ) -> ChatResult:
+        key, entry = self._lookup(messages)
+        if entry is not None:
+            if self.replay_latency:
+                await asyncio.sleep(entry["latency_ms"] / 1000)
+            return self._result(entry["content"])
+
+        start = time.perf_counter()
+        response = await self.inner.ainvoke(messages, stop=stop, **kwargs)
+        latency_ms = (time.perf_counter() - start) * 1000
+        await asyncio.to_thread(self.cassette.put, key, self.model, str(response.content), latency_ms)
+        return self._result(str(response.content))
@@ -0,0 +1,526 @@
+"""
+게임 체크포인터
+MemorySaver 대신 SQLite(WAL) 파일에 체크포인트를 저장해 재시작 후에도 세션이 유지되고,
+프로세스 메모리가 게임 수/진행 길이에 비례해 늘어나지 않도록 한다.
+- 스레드별 최근 N개 체크포인트만 보관 (pruning)
+- 활성 스레드의 최신 체크포인트는 LRU 핫 캐시에 보관
+- 일정 시간 입력이 없는 세션은 캐시/디스크에서 제거 (TTL eviction)
+- 여러 프로세스(uvicorn 워커/컨테이너)가 공유 볼륨의 같은 DB 파일을 함께 쓸 수 있다.
+  다른 프로세스가 커밋하면(PRAGMA data_version) 캐시된 체크포인트가 최신인지 확인하고 다시 읽는다.
+"""
+
+from collections import OrderedDict
+from typing import Any, AsyncIterator, Dict, Iterator, List, Optional, Sequence, Tuple
+import asyncio
+import os
+import random
+import sqlite3
+import threading
+import time
+
+from langchain_core.runnables import RunnableConfig
+from langgraph.checkpoint.base import (
+    WRITES_IDX_MAP,
+    BaseCheckpointSaver,
+    ChannelVersions,
+    Checkpoint,
+    CheckpointMetadata,
+    CheckpointTuple,
+    SerializerProtocol,
+    get_checkpoint_id,
+    get_checkpoint_metadata,
+)
+from langgraph.checkpoint.memory import MemorySaver
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS checkpoints (
+    thread_id TEXT NOT NULL,
+    checkpoint_ns TEXT NOT NULL DEFAULT '',
+    checkpoint_id TEXT NOT NULL,
+    parent_checkpoint_id TEXT,
+    type TEXT,
+    checkpoint BLOB,
+    metadata_type TEXT,
+    metadata BLOB,
+    PRIMARY KEY (thread_id, checkpoint_ns, checkpoint_id)
+);
+CREATE TABLE IF NOT EXISTS writes (
+    thread_id TEXT NOT NULL,
+    checkpoint_ns TEXT NOT NULL DEFAULT '',
+    checkpoint_id TEXT NOT NULL,
+    task_id TEXT NOT NULL,
+    idx INTEGER NOT NULL,
+    channel TEXT NOT NULL,
+    type TEXT,
+    value BLOB,
+    task_path TEXT NOT NULL DEFAULT '',
+    PRIMARY KEY (thread_id, checkpoint_ns, checkpoint_id, task_id, idx)
+);
+CREATE TABLE IF NOT EXISTS threads (
+    thread_id TEXT PRIMARY KEY,
+    last_access REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS threads_last_access ON threads (last_access);
+"""
+
+# 캐시/DB에 보관하는 직렬화된 체크포인트 행
+# (checkpoint_id, parent_id, (type, checkpoint), (type, metadata), [(task_id, channel, (type, value), task_path)])
+_Row = Tuple[str, Optional[str], Tuple[str, bytes], Tuple[str, bytes], List[Tuple[str, str, Tuple[str, bytes], str]]]
+
+
+class SQLiteCheckpointSaver(BaseCheckpointSaver[str]):
+    """
+    SQLite 기반 체크포인트 저장소 (동기/비동기 그래프 실행 모두 지원)
+
+    Args:
+        path: DB 파일 경로 (":memory:" 가능)
+        keep_last: 스레드(네임스페이스)별로 보관할 최근 체크포인트 수
+        hot_threads: 최신 체크포인트를 메모리에 캐시할 최대 스레드 수 (LRU)
+        idle_ttl: 이 시간(초) 동안 접근이 없으면 핫 캐시에서 제거
+        session_ttl: 이 시간(초) 동안 접근(읽기/쓰기)이 없으면 디스크에서도 세션 삭제 (None이면 보관)
+        sweep_interval: TTL 정리 작업의 최소 실행 간격(초)
+        touch_interval: 읽기만 하는 세션의 마지막 접근 시각을 DB에 기록하는 최소 간격(초)
+    """
+
+    def __init__(
+        self,
+        path: str = "checkpoints.sqlite",
+        *,
+        keep_last: int = 20,
+        hot_threads: int = 256,
+        idle_ttl: float = 15 * 60,
+        session_ttl: Optional[float] = 7 * 24 * 3600,
+        sweep_interval: float = 60,
+        touch_interval: float = 60,
+        serde: Optional[SerializerProtocol] = None,
+    ) -> None:
+        super().__init__(serde=serde)
+        self.path = path
+        self.keep_last = keep_last
+        self.hot_threads = hot_threads
+        self.idle_ttl = idle_ttl
+        self.session_ttl = session_ttl
+        self.sweep_interval = sweep_interval
+        self.touch_interval = touch_interval
+
+        self._lock = threading.RLock()
+        # thread_id → last_access를 마지막으로 기록한 시각 (읽기마다 쓰지 않도록)
+        self._touched: Dict[str, float] = {}
+        # (thread_id, ns) → (마지막 사용 시각, 행, 행을 확인한 시점의 data_version)
+        self._hot: "OrderedDict[Tuple[str, str], Tuple[float, _Row, int]]" = OrderedDict()
+        self._last_sweep = time.monotonic()
+
+        self.conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.execute("PRAGMA busy_timeout=5000")
+        self.conn.executescript(_SCHEMA)
+
+    # --- 핫 캐시 ---
+
+    def _data_version(self) -> int:
+        """다른 연결(프로세스)이 커밋할 때마다 바뀌는 값 (이 연결의 커밋으로는 바뀌지 않음)"""
+        return self.conn.execute("PRAGMA data_version").fetchone()[0]
+
+    def _cache_get(self, key: Tuple[str, str]) -> Optional[_Row]:
+        """
+        캐시된 최신 체크포인트
+        다른 프로세스가 DB를 바꿨다면 최신 체크포인트 id를 확인해 달라졌으면 None(다시 읽기),
+        같으면 pending writes만 다시 읽는다.
+        """
+        entry = self._hot.get(key)
+        if entry is None:
+            return None
+        _, row, version = entry
+        current = self._data_version()
+        if current != version:
+            latest = self.conn.execute(
+                "SELECT MAX(checkpoint_id) FROM checkpoints WHERE thread_id = ? AND checkpoint_ns = ?", key
+            ).fetchone()[0]
+            if latest != row[0]:
+                del self._hot[key]
+                return None
+            row = (*row[:4], self._load_writes(key[0], key[1], row[0]))
+        self._hot.move_to_end(key)
+        self._hot[key] = (time.monotonic(), row, current)
+        return row
+
+    def _cache_put(self, key: Tuple[str, str], row: _Row) -> None:
+        self._hot[key] = (time.monotonic(), row, self._data_version())
+        self._hot.move_to_end(key)
+        while len(self._hot) > self.hot_threads:
+            self._hot.popitem(last=False)
+
+    def _cache_drop_thread(self, thread_id: str) -> None:
+        for key in [k for k in self._hot if k[0] == thread_id]:
+            del self._hot[key]
+
+    def cached_threads(self) -> int:
+        """핫 캐시에 올라가 있는 스레드 수"""
+        return len({key[0] for key in self._hot})
+
+    # --- 내부 조회 ---
+
+    def _touch(self, thread_id: str) -> None:
+        self.conn.execute(
+            "INSERT INTO threads (thread_id, last_access) VALUES (?, ?) "
+            "ON CONFLICT(thread_id) DO UPDATE SET last_access = excluded.last_access",
+            (thread_id, time.time()),
+        )
+        self._touched[thread_id] = time.monotonic()
+
+    def _touch_read(self, thread_id: str) -> None:
+        """읽기만 하는 세션(상태 조회 폴링 등)도 TTL 삭제되지 않도록 touch_interval마다 접근 시각 기록"""
+        touched = self._touched.get(thread_id)
+        if touched is None or time.monotonic() - touched >= self.touch_interval:
+            self._touch(thread_id)
+
+    def _load_writes(self, thread_id: str, checkpoint_ns: str, checkpoint_id: str):
+        cursor = self.conn.execute(
+            "SELECT task_id, channel, type, value, task_path FROM writes "
+            "WHERE thread_id = ? AND checkpoint_ns = ? AND checkpoint_id = ? "
+            "ORDER BY task_path, task_id, idx",
+            (thread_id, checkpoint_ns, checkpoint_id),
+        )
+        return [(task_id, channel, (type_, value), path) for task_id, channel, type_, value, path in cursor]
+
+    def _load_row(self, thread_id: str, checkpoint_ns: str, checkpoint_id: Optional[str]) -> Optional[_Row]:
+        if checkpoint_id:
+            cursor = self.conn.execute(
+                "SELECT checkpoint_id, parent_checkpoint_id, type, checkpoint, metadata_type, metadata "
+                "FROM checkpoints WHERE thread_id = ? AND checkpoint_ns = ? AND checkpoint_id = ?",
+                (thread_id, checkpoint_ns, checkpoint_id),
+            )
+        else:
+            cursor = self.conn.execute(
+                "SELECT checkpoint_id, parent_checkpoint_id, type, checkpoint, metadata_type, metadata "
+                "FROM checkpoints WHERE thread_id = ? AND checkpoint_ns = ? "
+                "ORDER BY checkpoint_id DESC LIMIT 1",
+                (thread_id, checkpoint_ns),
+            )
+        found = cursor.fetchone()
+        if found is None:
+            return None
+        cid, parent_id, type_, checkpoint, metadata_type, metadata = found
+        writes = self._load_writes(thread_id, checkpoint_ns, cid)
+        return (cid, parent_id, (type_, checkpoint), (metadata_type, metadata), writes)
+
+    def _to_tuple(self, thread_id: str, checkpoint_ns: str, row: _Row) -> CheckpointTuple:
+        checkpoint_id, parent_id, checkpoint, metadata, writes = row
+        return CheckpointTuple(
+            config={
+                "configurable": {
+                    "thread_id": thread_id,
+                    "checkpoint_ns": checkpoint_ns,
+                    "checkpoint_id": checkpoint_id,
+                }
+            },
+            checkpoint=self.serde.loads_typed(checkpoint),
+            metadata=self.serde.loads_typed(metadata),
+            parent_config=(
+                {
+                    "configurable": {
+                        "thread_id": thread_id,
+                        "checkpoint_ns": checkpoint_ns,
+                        "checkpoint_id": parent_id,
+                    }
+                }
+                if parent_id
+                else None
+            ),
+            pending_writes=[(task_id, channel, self.serde.loads_typed(value)) for task_id, channel, value, _ in writes],
+        )
+
+    # --- BaseCheckpointSaver 구현 ---
+
+    def get_tuple(self, config: RunnableConfig) -> Optional[CheckpointTuple]:
+        thread_id = config["configurable"]["thread_id"]
+        checkpoint_ns = config["configurable"].get("checkpoint_ns", "")
+        checkpoint_id = get_checkpoint_id(config)
+
+        with self._lock:
+            row = self._cache_get((thread_id, checkpoint_ns))
+            if row is None or (checkpoint_id and row[0] != checkpoint_id):
+                row = self._load_row(thread_id, checkpoint_ns, checkpoint_id)
+                if row is None:
+                    return None
+                if not checkpoint_id:
+                    self._cache_put((thread_id, checkpoint_ns), row)
+            self._touch_read(thread_id)
+        return self._to_tuple(thread_id, checkpoint_ns, row)
+
+    def list(
+        self,
+        config: Optional[RunnableConfig],
+        *,
+        filter: Optional[Dict[str, Any]] = None,
+        before: Optional[RunnableConfig] = None,
+        limit: Optional[int] = None,
+    ) -> Iterator[CheckpointTuple]:
+        query = (
+            "SELECT thread_id, checkpoint_ns, checkpoint_id, parent_checkpoint_id, "
+            "type, checkpoint, metadata_type, metadata FROM checkpoints"
+        )
+        where, params = [], []
+        if config:
+            where.append("thread_id = ?")
+            params.append(config["configurable"]["thread_id"])
+            checkpoint_ns = config["configurable"].get("checkpoint_ns")
+            if checkpoint_ns is not None:
+                where.append("checkpoint_ns = ?")
+                params.append(checkpoint_ns)
+            if checkpoint_id := get_checkpoint_id(config):
+                where.append("checkpoint_id = ?")
+                params.append(checkpoint_id)
+        if before and (before_id := get_checkpoint_id(before)):
+            where.append("checkpoint_id < ?")
+            params.append(before_id)
+        if where:
+            query += " WHERE " + " AND ".join(where)
+        query += " ORDER BY checkpoint_id DESC"
+
+        with self._lock:
+            rows = self.conn.execute(query, params).fetchall()
+
+        for thread_id, checkpoint_ns, cid, parent_id, type_, checkpoint, metadata_type, metadata in rows:
+            metadata_value = self.serde.loads_typed((metadata_type, metadata))
+            if filter and not all(metadata_value.get(k) == v for k, v in filter.items()):
+                continue
+            if limit is not None:
+                if limit <= 0:
+                    break
+                limit -= 1
+            with self._lock:
+                writes = self._load_writes(thread_id, checkpoint_ns, cid)
+            row = (cid, parent_id, (type_, checkpoint), (metadata_type, metadata), writes)
+            yield self._to_tuple(thread_id, checkpoint_ns, row)
+
+    def put(
+        self,
+        config: RunnableConfig,
+        checkpoint: Checkpoint,
+        metadata: CheckpointMetadata,
+        new_versions: ChannelVersions,
+    ) -> RunnableConfig:
+        thread_id = config["configurable"]["thread_id"]
+        checkpoint_ns = config["configurable"].get("checkpoint_ns", "")
+        parent_id = config["configurable"].get("checkpoint_id")
+        serialized = self.serde.dumps_typed(checkpoint)
+        serialized_metadata = self.serde.dumps_typed(get_checkpoint_metadata(config, metadata))
+
+        with self._lock:
+            self.conn.execute("BEGIN")
+            try:
+                self.conn.execute(
+                    "INSERT OR REPLACE INTO checkpoints "
+                    "(thread_id, checkpoint_ns, checkpoint_id, parent_checkpoint_id, "
+                    "type, checkpoint, metadata_type, metadata) VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                    (
+                        thread_id, checkpoint_ns, checkpoint["id"], parent_id,
+                        serialized[0], serialized[1], serialized_metadata[0], serialized_metadata[1],
+                    ),
+                )
+                self._prune_thread(thread_id, checkpoint_ns, self.keep_last)
+                self._touch(thread_id)
+                self.conn.execute("COMMIT")
+            except Exception:
+                self.conn.execute("ROLLBACK")
+                raise
+            self._cache_put(
+                (thread_id, checkpoint_ns),
+                (checkpoint["id"], parent_id, serialized, serialized_metadata, []),
+            )
+            self._maybe_sweep()
+
+        return {
+            "configurable": {
+                "thread_id": thread_id,
+                "checkpoint_ns": checkpoint_ns,
+                "checkpoint_id": checkpoint["id"],
+            }
+        }
+
+    def put_writes(
+        self,
+        config: RunnableConfig,
+        writes: Sequence[Tuple[str, Any]],
+        task_id: str,
+        task_path: str = "",
+    ) -> None:
+        thread_id = config["configurable"]["thread_id"]
+        checkpoint_ns = config["configurable"].get("checkpoint_ns", "")
+        checkpoint_id = config["configurable"]["checkpoint_id"]
+        # 특수 채널(에러/인터럽트 등)은 덮어쓰고, 일반 채널은 중복 저장하지 않음
+        verb = "INSERT OR REPLACE" if all(c in WRITES_IDX_MAP for c, _ in writes) else "INSERT OR IGNORE"
+        rows = []
+        for idx, (channel, value) in enumerate(writes):
+            type_, blob = self.serde.dumps_typed(value)
+            rows.append((
+                thread_id, checkpoint_ns, checkpoint_id, task_id,
+                WRITES_IDX_MAP.get(channel, idx), channel, type_, blob, task_path,
+            ))
+
+        with self._lock:
+            self.conn.executemany(
+                f"{verb} INTO writes (thread_id, checkpoint_ns, checkpoint_id, task_id, "
+                "idx, channel, type, value, task_path) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                rows,
+            )
+            # 캐시된 최신 체크포인트라면 pending writes를 DB 기준으로 다시 읽음
+            key = (thread_id, checkpoint_ns)
+            entry = self._hot.get(key)
+            if entry is not None and entry[1][0] == checkpoint_id:
+                cid, parent_id, checkpoint, metadata, _ = entry[1]
+                writes_ = self._load_writes(thread_id, checkpoint_ns, checkpoint_id)
+                self._hot[key] = (entry[0], (cid, parent_id, checkpoint, metadata, writes_), entry[2])
+
+    def delete_thread(self, thread_id: str) -> None:
+        with self._lock:
+            self.conn.execute("BEGIN")
+            self.conn.execute("DELETE FROM checkpoints WHERE thread_id = ?", (thread_id,))
+            self.conn.execute("DELETE FROM writes WHERE thread_id = ?", (thread_id,))
+            self.conn.execute("DELETE FROM threads WHERE thread_id = ?", (thread_id,))
+            self.conn.execute("COMMIT")
+            self._cache_drop_thread(thread_id)
+            self._touched.pop(thread_id, None)
+
+    def prune(self, thread_ids: Sequence[str], *, strategy: str = "keep_latest") -> None:
+        with self._lock:
+            for thread_id in thread_ids:
+                if strategy == "delete":
+                    self.delete_thread(thread_id)
+                    continue
+                namespaces = self.conn.execute(
+                    "SELECT DISTINCT checkpoint_ns FROM checkpoints WHERE thread_id = ?", (thread_id,)
+                ).fetchall()
+                for (checkpoint_ns,) in namespaces:
+                    self._prune_thread(thread_id, checkpoint_ns, 1)
+
+    # --- 정리 정책 ---
+
+    def _prune_thread(self, thread_id: str, checkpoint_ns: str, keep: int) -> None:
+        """최근 keep개를 제외한 체크포인트와 그 writes 삭제"""
+        stale = self.conn.execute(
+            "SELECT checkpoint_id FROM checkpoints WHERE thread_id = ? AND checkpoint_ns = ? "
+            "ORDER BY checkpoint_id DESC LIMIT -1 OFFSET ?",
+            (thread_id, checkpoint_ns, keep),
+        ).fetchall()
+        if not stale:
+            return
+        params = [(thread_id, checkpoint_ns, cid) for (cid,) in stale]
+        self.conn.executemany(
+            "DELETE FROM checkpoints WHERE thread_id = ? AND checkpoint_ns = ? AND checkpoint_id = ?", params
+        )
+        self.conn.executemany(
+            "DELETE FROM writes WHERE thread_id = ? AND checkpoint_ns = ? AND checkpoint_id = ?", params
+        )
+
+    def _maybe_sweep(self) -> None:
+        if time.monotonic() - self._last_sweep >= self.sweep_interval:
+            self.evict_idle()
+
+    def evict_idle(self) -> List[str]:
+        """
+        유휴 세션 정리
+        - idle_ttl 초과: 핫 캐시에서 제거
+        - session_ttl 초과: 디스크에서도 삭제
+        삭제된 스레드 ID 목록을 반환한다.
+        """
+        with self._lock:
+            self._last_sweep = now = time.monotonic()
+            for key, (last_used, _, _) in list(self._hot.items()):
+                if now - last_used > self.idle_ttl:
+                    del self._hot[key]
+            for thread_id, touched in list(self._touched.items()):
+                if now - touched >= self.touch_interval:
+                    del self._touched[thread_id]
+
+            if self.session_ttl is None:
+                return []
+            expired = [
+                thread_id for (thread_id,) in self.conn.execute(
+                    "SELECT thread_id FROM threads WHERE last_access < ?", (time.time() - self.session_ttl,)
+                ).fetchall()
+            ]
+            for thread_id in expired:
+                self.delete_thread(thread_id)
+            return expired
+
+    def close(self) -> None:
+        with self._lock:
+            self.conn.close()
+
+    def get_next_version(self, current: Optional[str], channel: None) -> str:
+        if current is None:
+            current_v = 0
+        elif isinstance(current, int):
+            current_v = current
+        else:
+            current_v = int(current.split(".")[0])
+        return f"{current_v + 1:032}.{random.random():016}"
+
+    # --- 비동기 버전 (SQLite 호출은 스레드 풀에서 실행) ---
+
+    async def aget_tuple(self, config: RunnableConfig) -> Optional[CheckpointTuple]:
+        return await asyncio.to_thread(self.get_tuple, config)
+
+    async def alist(
+        self,
+        config: Optional[RunnableConfig],
+        *,
+        filter: Optional[Dict[str, Any]] = None,
+        before: Optional[RunnableConfig] = None,
+        limit: Optional[int] = None,
+    ) -> AsyncIterator[CheckpointTuple]:
+        items = await asyncio.to_thread(
+            lambda: list(self.list(config, filter=filter, before=before, limit=limit))
+        )
+        for item in items:
+            yield item
+
+    async def aput(
+        self,
+        config: RunnableConfig,
+        checkpoint: Checkpoint,
+        metadata: CheckpointMetadata,
+        new_versions: ChannelVersions,
+    ) -> RunnableConfig:
+        return await asyncio.to_thread(self.put, config, checkpoint, metadata, new_versions)
+
+    async def aput_writes(
+        self,
+        config: RunnableConfig,
+        writes: Sequence[Tuple[str, Any]],
+        task_id: str,
+        task_path: str = "",
+    ) -> None:
+        return await asyncio.to_thread(self.put_writes, config, writes, task_id, task_path)
+
+    async def adelete_thread(self, thread_id: str) -> None:
+        return await asyncio.to_thread(self.delete_thread, thread_id)
+
+    async def aprune(self, thread_ids: Sequence[str], *, strategy: str = "keep_latest") -> None:
+        return await asyncio.to_thread(self.prune, thread_ids, strategy=strategy)
+
+
+def create_checkpointer() -> BaseCheckpointSaver:
+    """
+    환경 변수 설정에 맞는 체크포인터 생성
+    - CHECKPOINT_BACKEND: sqlite (기본) | memory
+    - CHECKPOINT_DB: SQLite 파일 경로
+    - CHECKPOINT_KEEP_LAST / CHECKPOINT_HOT_THREADS / CHECKPOINT_IDLE_TTL / CHECKPOINT_SESSION_TTL
+    """
+    backend = os.getenv("CHECKPOINT_BACKEND", "sqlite")
+    if backend == "memory":
+        return MemorySaver()
+    if backend != "sqlite":
+        raise ValueError(f"알 수 없는 체크포인트 백엔드: {backend}")
+
+    session_ttl = os.getenv("CHECKPOINT_SESSION_TTL", str(7 * 24 * 3600))
+    return SQLiteCheckpointSaver(
+        os.getenv("CHECKPOINT_DB", "checkpoints.sqlite"),
+        keep_last=int(os.getenv("CHECKPOINT_KEEP_LAST", "20")),
+        hot_threads=int(os.getenv("CHECKPOINT_HOT_THREADS", "256")),
+        idle_ttl=float(os.getenv("CHECKPOINT_IDLE_TTL", str(15 * 60))),
+        session_ttl=float(session_ttl) if session_ttl else None,
+    )
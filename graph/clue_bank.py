@@ -0,0 +1,165 @@
+"""
+단서 뱅크 (precomputed clue bank)
+밤마다 LLM으로 단서를 새로 만드는 대신, 캐릭터(팬텀) × 희생자 × 라운드 조합별 단서를
+미리 생성해 SQLite 파일에 저장해 두고 밤 페이즈에서 바로 꺼내 쓴다.
+뱅크에 없거나 이번 게임에서 모두 써 버린 경우에만 LLM으로 실시간 생성한다.
+
+생성: python build_clue_bank.py --variants 3 --rounds 4 --output clue_bank.sqlite
+"""
+
+from collections import defaultdict
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+import asyncio
+import logging
+import os
+import random
+import sqlite3
+import threading
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS clues (
+    phantom TEXT NOT NULL,
+    victim TEXT NOT NULL,
+    round_number INTEGER NOT NULL,
+    text TEXT NOT NULL,
+    PRIMARY KEY (phantom, victim, round_number, text)
+) WITHOUT ROWID;
+"""
+
+logger = logging.getLogger(__name__)
+
+# 같은 프롬프트로 여러 번 만들 때 매번 다른 단서가 나오도록 붙이는 지시
+_VARIANT_HINT = "\n(변형 {n}: 앞서 만든 단서들과 다른 감각이나 물건을 사용하세요. 밤 {round}번째 사건입니다.)"
+
+
+class ClueBank:
+    """
+    (팬텀, 희생자, 라운드)별 단서 목록
+    파일 전체를 메모리의 dict로 올려 두므로 조회는 O(1)이다.
+    """
+
+    def __init__(self, path: str) -> None:
+        self.path = path
+        self._pools: Dict[Tuple[str, str, int], List[str]] = defaultdict(list)
+        self._by_pair: Dict[Tuple[str, str], List[str]] = defaultdict(list)
+        conn = sqlite3.connect(path)
+        try:
+            rows = conn.execute("SELECT phantom, victim, round_number, text FROM clues").fetchall()
+        finally:
+            conn.close()
+        for phantom, victim, round_number, text in rows:
+            self._pools[(phantom, victim, round_number)].append(text)
+            self._by_pair[(phantom, victim)].append(text)
+
+    def __len__(self) -> int:
+        return sum(len(pool) for pool in self._pools.values())
+
+    def draw(self, phantom: str, victim: str, round_number: int, used: Iterable[str] = ()) -> Optional[str]:
+        """
+        아직 쓰지 않은 단서를 하나 꺼냄
+        해당 라운드 단서가 없으면 같은 (팬텀, 희생자)의 다른 라운드 단서를 쓰고, 그마저 없으면 None.
+        """
+        used = set(used)
+        for pool in (self._pools.get((phantom, victim, round_number)), self._by_pair.get((phantom, victim))):
+            if pool:
+                fresh = [text for text in pool if text not in used]
+                if fresh:
+                    return random.choice(fresh)
+        return None
+
+
+_bank: Optional[ClueBank] = None
+_bank_lock = threading.Lock()
+
+
+def get_clue_bank() -> Optional[ClueBank]:
+    """
+    프로세스 공용 단서 뱅크 (CLUE_BANK 환경 변수, 기본 clue_bank.sqlite)
+    파일이 없거나 CLUE_BANK를 빈 값으로 두면 None (항상 실시간 생성)
+    """
+    global _bank
+    path = os.getenv("CLUE_BANK", "clue_bank.sqlite")
+    if not path or not os.path.exists(path):
+        return None
+    if _bank is None or _bank.path != path:
+        with _bank_lock:
+            if _bank is None or _bank.path != path:
+                _bank = ClueBank(path)
+    return _bank
+
+
+def used_clues(state: Dict[str, Any]) -> List[str]:
+    """이번 게임에서 이미 공개된 단서 본문 ("[Day N 아침 발견] " 접두어 제외)"""
+    return [clue.split("] ", 1)[-1] for clue in state.get("clues", [])]
+
+
+# --- 생성기 ---
+
+def _characters() -> List[Dict[str, Any]]:
+    from characters import student, office_worker, artist, chef, teacher
+
+    return [module.get_character_info() for module in (student, office_worker, artist, chef, teacher)]
+
+
+async def _generate(
+    characters: List[Dict[str, Any]],
+    phantom: str,
+    victim: str,
+    round_number: int,
+    variants: int,
+    semaphore: asyncio.Semaphore,
+) -> List[Tuple[str, str, int, str]]:
+    """
+    조합 하나의 단서 variants개 (LLM 호출마다 semaphore를 잡음)
+    실패한 호출은 로그만 남기고 건너뛰어 성공한 단서만 돌려준다.
+    """
+    from langchain_core.messages import HumanMessage
+    from graph.llm import get_llm
+    from graph.nodes import _clue_messages
+
+    state = {"characters": characters, "phantom_name": phantom}
+    prompt = _clue_messages(state, victim)[0].content
+
+    async def call(n: int):
+        async with semaphore:
+            return await get_llm().ainvoke(
+                [HumanMessage(content=prompt + _VARIANT_HINT.format(n=n + 1, round=round_number))]
+            )
+
+    responses = await asyncio.gather(*[call(n) for n in range(variants)], return_exceptions=True)
+    texts = set()
+    for response in responses:
+        if isinstance(response, BaseException):
+            logger.warning("Clue bank generation failed (%s → %s, round %d): %s", phantom, victim, round_number, response)
+            continue
+        texts.add(response.content.strip().strip('"'))
+    return [(phantom, victim, round_number, text) for text in texts if text]
+
+
+async def build(path: str, variants: int, rounds: int, concurrency: int) -> Tuple[int, int]:
+    """
+    모든 (팬텀, 희생자, 라운드) 조합의 단서를 생성해 path에 저장
+    동시 LLM 호출은 concurrency개까지, 일부 호출이 실패해도 성공한 단서는 저장한다.
+    (저장한 단서 수, 단서를 하나도 만들지 못한 조합 수) 반환
+    """
+    characters = _characters()
+    jobs = [
+        (phantom["name"], victim["name"], round_number)
+        for phantom in characters
+        for victim in characters
+        if victim["name"] != phantom["name"]
+        for round_number in range(1, rounds + 1)
+    ]
+    semaphore = asyncio.Semaphore(concurrency)
+    results = await asyncio.gather(*[_generate(characters, *job, variants, semaphore) for job in jobs])
+    rows = [row for result in results for row in result]
+    failed = sum(1 for result in results if not result)
+
+    conn = sqlite3.connect(path)
+    try:
+        with conn:
+            conn.executescript(_SCHEMA)
+            conn.executemany("INSERT OR IGNORE INTO clues VALUES (?, ?, ?, ?)", rows)
+    finally:
+        conn.close()
+    return len(rows), failed
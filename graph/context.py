@@ -0,0 +1,125 @@
+"""
+프롬프트 대화 맥락 구성
+노드별 토큰 예산 안에서 프롬프트에 넣을 메시지를 우선순위로 고른다.
+고정 개수(최근 5개 등) 대신 토큰 수로 자르므로 메시지 길이와 관계없이 프롬프트 크기가 일정하다.
+
+우선순위: 최근 메시지 > 나에게 한 말 > 나에 대한 말 / 현장 단서 > 나머지 (같은 우선순위는 최근 것부터)
+"""
+
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional
+import os
+import threading
+
+from langchain_core.messages import BaseMessage, SystemMessage
+from graph.llm import estimate_tokens
+
+# 노드별 대화 맥락 토큰 예산 (CONTEXT_BUDGET_<노드 이름> 환경 변수로 변경, 예: CONTEXT_BUDGET_CHARACTER_SPEAK=800)
+DEFAULT_BUDGETS = {
+    "character_speak": 600,
+    "select_next_speaker": 400,
+    "fused_turn": 700,
+    "ai_suspicion": 2000,
+    "ai_suspect": 600,
+}
+DEFAULT_BUDGET = 600
+
+# 예산과 관계없이 항상 넣는 최근 메시지 수
+KEEP_RECENT = 1
+
+PRIORITY_RECENT = 4
+PRIORITY_ADDRESSED = 3
+PRIORITY_ABOUT_ME = 2
+PRIORITY_CLUE = 2
+PRIORITY_DEFAULT = 1
+
+# 메시지별 토큰 수 캐시 (message id → 토큰 수), 매 턴 같은 메시지를 다시 세지 않도록
+_TOKEN_CACHE_SIZE = int(os.getenv("CONTEXT_TOKEN_CACHE_SIZE", "20000"))
+_token_cache: "OrderedDict[str, int]" = OrderedDict()
+_lock = threading.Lock()
+
+
+def context_budget(node: str) -> int:
+    value = os.getenv(f"CONTEXT_BUDGET_{node.upper()}")
+    return int(value) if value else DEFAULT_BUDGETS.get(node, DEFAULT_BUDGET)
+
+
+def name_aliases(name: str) -> List[str]:
+    """대화에서 캐릭터를 부르는 이름 (성 없이 부르는 경우 포함, 예: 한기옥 → 기옥)"""
+    return [name, name[1:]] if len(name) == 3 else [name]
+
+
+def message_tokens(msg: BaseMessage) -> int:
+    """메시지의 추정 토큰 수 ("- 보낸사람: " 접두어 포함, id가 있으면 캐시)"""
+    key = msg.id
+    if key:
+        with _lock:
+            cached = _token_cache.get(key)
+            if cached is not None:
+                _token_cache.move_to_end(key)
+                return cached
+
+    tokens = estimate_tokens(f"- {getattr(msg, 'name', None)}: {msg.content}\n")
+    if key:
+        with _lock:
+            _token_cache[key] = tokens
+            while len(_token_cache) > _TOKEN_CACHE_SIZE:
+                _token_cache.popitem(last=False)
+    return tokens
+
+
+def _priority(msg: BaseMessage, aliases: List[str]) -> int:
+    if not aliases or getattr(msg, "name", None) == aliases[0]:
+        return PRIORITY_DEFAULT
+    content = str(msg.content)
+    if f"[{aliases[0]}에게]" in content or any(alias + suffix in content for alias in aliases for suffix in ("씨", "님", "에게")):
+        return PRIORITY_ADDRESSED
+    if any(alias in content for alias in aliases):
+        return PRIORITY_ABOUT_ME
+    return PRIORITY_DEFAULT
+
+
+def _priorities(messages: List[BaseMessage], speaker: Optional[str]) -> List[int]:
+    aliases = name_aliases(speaker) if speaker else []
+    count = len(messages)
+    return [
+        PRIORITY_RECENT if i >= count - KEEP_RECENT else _priority(msg, aliases)
+        for i, msg in enumerate(messages)
+    ]
+
+
+def _select(items: List[BaseMessage], priorities: List[int], budget: int) -> List[BaseMessage]:
+    """우선순위가 높은 것부터 (같으면 최근 것부터) 예산이 허락하는 만큼 골라 원래 순서대로 반환"""
+    count = len(items)
+    chosen, used = [], 0
+    for i in sorted(range(count), key=lambda i: (priorities[i], i), reverse=True):
+        tokens = message_tokens(items[i])
+        if used + tokens > budget and i < count - KEEP_RECENT:
+            continue
+        chosen.append(i)
+        used += tokens
+    return [items[i] for i in sorted(chosen)]
+
+
+def select_messages(messages: List[BaseMessage], budget: int, speaker: Optional[str] = None) -> List[BaseMessage]:
+    """
+    토큰 예산 안에서 우선순위가 높은 메시지를 골라 원래 순서대로 반환
+    speaker를 주면 그 캐릭터에게 한 말 / 그 캐릭터에 대한 말을 우선한다.
+    """
+    return _select(messages, _priorities(messages, speaker), budget)
+
+
+def build_context(
+    state: Dict[str, Any], node: str, speaker: Optional[str] = None, clues: bool = False
+) -> List[BaseMessage]:
+    """
+    노드의 토큰 예산에 맞춘 대화 맥락
+    clues=True면 공개된 현장 단서를 시스템 메시지 하나로 맨 앞 후보에 넣는다. (예산이 남을 때만 포함)
+    """
+    budget = context_budget(node)
+    messages = state.get("messages", [])
+    if not (clues and state.get("clues")):
+        return select_messages(messages, budget, speaker)
+
+    clue_message = SystemMessage(content="[현장 단서]\n" + "\n".join(state["clues"]))
+    return _select([clue_message] + messages, [PRIORITY_CLUE] + _priorities(messages, speaker), budget)
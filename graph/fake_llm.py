@@ -0,0 +1,211 @@
+"""
+결정적(deterministic) 대체 LLM
+API 키와 네트워크 없이 그래프 전체를 돌릴 수 있도록, 각 노드 프롬프트에 맞는 형식의
+응답(화자 이름, 의심 JSON, 단서, 요약, 대사)을 돌려준다.
+같은 프롬프트와 시드면 항상 같은 응답과 같은 지연이 나오므로 성능 측정을 재현할 수 있다.
+
+지연 분포 (LLM_FAKE_LATENCY, 단위 ms)
+- "300"                  : 고정
+- "uniform:100,500"      : 균등 분포
+- "normal:300,50"        : 정규 분포 (평균, 표준편차)
+- "lognormal:300,0.5"    : 로그 정규 분포 (중앙값, sigma) - 긴 꼬리 지연 흉내
+
+LLM_FAKE_ERROR_RATE(0~1)를 지정하면 그 비율의 호출이 응답 전에 서버 에러(5xx)로 실패한다. (재시도/회로 차단기 확인용)
+"""
+
+from functools import lru_cache
+from typing import Any, Callable, List, Optional, Tuple
+import hashlib
+import json
+import math
+import random
+import re
+
+from langchain_core.exceptions import ModelAPIError
+from langchain_core.messages import BaseMessage
+from pydantic import PrivateAttr
+
+from graph.llm import LocalChatModel
+
+_LINES = [
+    "어젯밤엔 일찍 잤어요. 다들 뭐 하셨어요?",
+    "솔직히 {name} 씨 말이 좀 이상하게 들려요.",
+    "{name} 씨, 아까 그 얘기 다시 해주실래요?",
+    "저는 아무것도 못 봤어요. 정말이에요.",
+    "증거도 없이 누굴 의심하는 건 좀 아닌 것 같아요.",
+    "{name} 씨는 어제 어디 계셨어요?",
+    "다들 너무 조용한 거 아니에요? 뭔가 숨기는 것 같은데.",
+    "일단 단서부터 차근차근 정리해봐요.",
+]
+
+_CLUES = [
+    "피해자의 소매에 정체를 알 수 없는 가루가 묻어 있다.",
+    "현장 바닥에 반쯤 지워진 발자국이 남아 있다.",
+    "창가에서 희미하게 낯선 향이 풍긴다.",
+    "책상 위에 누군가 급하게 찢어 간 메모지의 흔적이 있다.",
+]
+
+
+@lru_cache(maxsize=None)
+def parse_latency(spec: str) -> Callable[[random.Random], float]:
+    """지연 분포 문자열을 (rng -> 초) 샘플러로 변환"""
+    kind, _, args = spec.partition(":") if ":" in spec else ("fixed", "", spec)
+    values = [float(v) for v in args.split(",") if v.strip()]
+
+    if kind == "fixed":
+        return lambda rng: values[0] / 1000
+    if kind == "uniform":
+        low, high = values
+        return lambda rng: rng.uniform(low, high) / 1000
+    if kind == "normal":
+        mean, std = values
+        return lambda rng: max(0.0, rng.gauss(mean, std)) / 1000
+    if kind == "lognormal":
+        median, sigma = values
+        return lambda rng: rng.lognormvariate(math.log(median), sigma) / 1000
+    raise ValueError(f"알 수 없는 지연 분포: {spec}")
+
+
+def _names_after(prompt: str, label: str) -> List[str]:
+    """'현재 생존자: a, b' 형식의 줄에서 이름 목록 추출"""
+    match = re.search(rf"{label}\s*(.+)", prompt)
+    if not match:
+        return []
+    return [name.strip() for name in match.group(1).split(",") if name.strip()]
+
+
+def _previous_speaker(prompt: str) -> Optional[str]:
+    match = re.search(r"직전 발언자:\s*(\S+)", prompt)
+    return match.group(1) if match else None
+
+
+def _line(rng: random.Random, names: List[str]) -> str:
+    line = rng.choice(_LINES)
+    return line.format(name=rng.choice(names)) if "{name}" in line else line
+
+
+def _speaker(prompt: str, rng: random.Random) -> str:
+    names = _names_after(prompt, "현재 생존자:")
+    previous = _previous_speaker(prompt)
+    candidates = [n for n in names if n != previous] or names
+    return rng.choice(candidates) if candidates else ""
+
+
+def _fused(prompt: str, rng: random.Random) -> str:
+    names = re.findall(r"^- (\S+): .*의심 수치", prompt, re.MULTILINE)
+    previous = _previous_speaker(prompt)
+    candidates = [n for n in names if n != previous] or names
+    speaker = rng.choice(candidates) if candidates else ""
+    others = [n for n in names if n != speaker] or names
+    return json.dumps({"speaker": speaker, "content": _line(rng, others)}, ensure_ascii=False)
+
+
+def _suspicion(prompt: str, rng: random.Random) -> str:
+    names = _names_after(prompt, "현재 생존자:")
+    accusations = []
+    for suspect in names:
+        others = [n for n in names if n != suspect]
+        if others and rng.random() < 0.6:
+            accusations.append({"suspect": suspect, "target": rng.choice(others), "reason": "말이 앞뒤가 안 맞음"})
+    return "```json\n" + json.dumps({"의심행동": accusations}, ensure_ascii=False) + "\n```"
+
+
+def _suspect_one(prompt: str, rng: random.Random) -> str:
+    me = re.search(r"당신은 (\S+)입니다", prompt)
+    names = [n for n in _names_after(prompt, "현재 생존자:") if not me or n != me.group(1)]
+    if not names or rng.random() < 0.3:
+        return json.dumps({"target": None, "reason": "아직 잘 모르겠다"}, ensure_ascii=False)
+    return json.dumps({"target": rng.choice(names), "reason": "말이 앞뒤가 안 맞음"}, ensure_ascii=False)
+
+
+def _clue(prompt: str, rng: random.Random) -> str:
+    return rng.choice(_CLUES)
+
+
+def _summary(prompt: str, rng: random.Random) -> str:
+    round_match = re.search(r"\[Round (\d+) 요약 요청\]", prompt)
+    speakers = sorted(set(re.findall(r"^- (\S+): ", prompt, re.MULTILINE)) - {"System", "None", "유저"})
+    return (
+        f"Round {round_match.group(1) if round_match else '?'}: "
+        f"{', '.join(speakers) or '참가자들'}이(가) 서로의 알리바이를 확인하며 의심을 주고받았다."
+    )
+
+
+def _memory(prompt: str, rng: random.Random) -> str:
+    rounds = sorted({int(r) for r in re.findall(r"Round (\d+)", prompt)})
+    deaths = sorted(set(re.findall(r"(\S+)이\(가\) (?:습격|살해)", prompt)))
+    return (
+        f"Round {rounds[0] if rounds else '?'}~{rounds[-1] if rounds else '?'}: 참가자들이 알리바이를 두고 의심을 주고받았다."
+        + (f" 사망자: {', '.join(deaths)}." if deaths else "")
+    )
+
+
+def _speech(messages: List[BaseMessage], rng: random.Random) -> str:
+    """캐릭터 대사 (대화 맥락에 등장한 다른 캐릭터를 부르기도 함)"""
+    names = sorted({msg.name for msg in messages if getattr(msg, "name", None) and msg.name != "유저"})
+    if not names:
+        return rng.choice([line for line in _LINES if "{name}" not in line])
+    return _line(rng, names)
+
+
+# (프롬프트에 들어 있는 표식, 응답 생성기) - 위에서부터 먼저 맞는 것을 사용
+SCRIPTS: List[Tuple[str, Callable[[str, random.Random], str]]] = [
+    ('"speaker"', _fused),
+    ("의심행동", _suspicion),
+    ("입장에서 가장 의심스러운", _suspect_one),
+    ("현장 증거", _clue),
+    ("장기 기억 압축", _memory),
+    ("요약 요청", _summary),
+    ("다음으로 말하기에", _speaker),
+]
+
+
+def scripted_reply(messages: List[BaseMessage], rng: random.Random) -> str:
+    """프롬프트 종류에 맞는 형식의 응답 (회로 차단기가 열렸을 때의 대체 응답으로도 쓰인다)"""
+    prompt = str(messages[-1].content) if messages else ""
+    for marker, script in SCRIPTS:
+        if marker in prompt:
+            return script(prompt, rng)
+    return _speech(messages, rng)
+
+
+class ScriptedChatModel(LocalChatModel):
+    """
+    프롬프트 종류별 스크립트 응답을 돌려주는 결정적 대체 모델
+    응답과 지연은 (시드, 프롬프트 해시)로 정해진다.
+    """
+
+    latency: str = "300"
+    seed: int = 0
+    error_rate: float = 0.0  # 서버 에러로 실패하는 호출 비율
+    construct_latency: float = 0.0
+    connect_latency: float = 0.0
+
+    # 실패 여부는 프롬프트가 아니라 호출 순서로 정한다 (같은 프롬프트를 재시도하면 성공할 수 있도록)
+    _errors: random.Random = PrivateAttr(default_factory=random.Random)
+
+    def model_post_init(self, __context: Any) -> None:
+        parse_latency(self.latency)  # 잘못된 분포 설정은 생성 시점에 에러
+        self._errors.seed(self.seed)
+        super().model_post_init(__context)
+
+    @property
+    def _llm_type(self) -> str:
+        return "scripted-stand-in"
+
+    def _rng(self, messages: List[BaseMessage], salt: str) -> random.Random:
+        digest = hashlib.sha256(salt.encode())
+        digest.update(str(self.seed).encode())
+        for msg in messages:
+            digest.update(f"{msg.type}:{getattr(msg, 'name', None)}:{msg.content}\n".encode())
+        return random.Random(int.from_bytes(digest.digest()[:8], "big"))
+
+    def _reply(self, messages: List[BaseMessage]) -> str:
+        return scripted_reply(messages, self._rng(messages, "reply"))
+
+    def _response_delay(self, messages: List[BaseMessage]) -> float:
+        # 모든 호출 경로가 응답 전에 지연을 구하므로 여기서 실패를 흉내 낸다
+        if self.error_rate and self._errors.random() < self.error_rate:
+            raise ModelAPIError("scripted stand-in: 503 UNAVAILABLE")
+        return parse_latency(self.latency)(self._rng(messages, "latency"))
+
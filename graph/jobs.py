@@ -0,0 +1,207 @@
+"""
+백그라운드 작업 큐
+밤 전환처럼 LLM 호출이 여러 번 이어지는 액션을 HTTP 요청 밖에서 실행한다.
+요청은 작업 id만 받고 바로 끝나며(202), 진행 상황과 결과는 작업 상태 조회나 SSE 스트림으로 받는다.
+
+- 워커 JOB_WORKERS개가 우선순위(숫자가 작을수록 먼저) 순서로 작업을 꺼내 실행한다.
+- 같은 세션의 작업은 들어온 순서대로 실행된다. (세션마다 맨 앞 작업만 우선순위 큐에 올린다)
+- 대기 중인 작업이 JOB_QUEUE_SIZE개면 새 작업은 QueueFull
+"""
+
+from collections import OrderedDict, deque
+from typing import Any, AsyncIterator, Callable, Deque, Dict, List, Optional
+import asyncio
+import itertools
+import os
+import time
+import uuid
+
+JOB_WORKERS = int(os.getenv("JOB_WORKERS", "4"))
+JOB_QUEUE_SIZE = int(os.getenv("JOB_QUEUE_SIZE", "256"))
+# 끝난 작업을 조회할 수 있도록 보관하는 수
+JOB_HISTORY = int(os.getenv("JOB_HISTORY", "1000"))
+
+JOB_STATUSES = ("queued", "running", "done", "failed")
+
+
+class QueueFull(Exception):
+    """대기 중인 작업이 너무 많음"""
+
+
+class Job:
+    """
+    작업 하나
+    실행 중 나온 SSE 프레임을 보관하므로 실행 중에 늦게 구독해도 처음부터 받을 수 있다.
+    작업이 끝나고 구독자가 모두 떠나면 프레임은 버린다. (끝난 작업은 상태와 result만 남음)
+    """
+
+    def __init__(self, thread_id: str, kind: str, priority: int, payload: Any) -> None:
+        self.id = uuid.uuid4().hex
+        self.thread_id = thread_id
+        self.kind = kind
+        self.priority = priority
+        self.payload = payload
+        self.status = "queued"
+        self.result: Any = None
+        self.error: Optional[str] = None
+        self.created_at = time.time()
+        self.started_at: Optional[float] = None
+        self.finished_at: Optional[float] = None
+        self.frames: List[str] = []
+        self._followers = 0
+        self._changed = asyncio.Condition()
+
+    @property
+    def finished(self) -> bool:
+        return self.status in ("done", "failed")
+
+    def as_dict(self, with_result: bool = True) -> Dict[str, Any]:
+        info = {
+            "job_id": self.id,
+            "thread_id": self.thread_id,
+            "action_type": self.kind,
+            "priority": self.priority,
+            "status": self.status,
+            "created_at": self.created_at,
+            "wait_ms": round(((self.started_at or time.time()) - self.created_at) * 1000, 1),
+        }
+        if self.started_at is not None:
+            info["run_ms"] = round(((self.finished_at or time.time()) - self.started_at) * 1000, 1)
+        if self.error is not None:
+            info["error"] = self.error
+        if with_result and self.result is not None:
+            info["result"] = self.result
+        return info
+
+    async def _notify(self) -> None:
+        async with self._changed:
+            self._changed.notify_all()
+
+    async def emit(self, frame: str) -> None:
+        self.frames.append(frame)
+        await self._notify()
+
+    def release_frames(self) -> None:
+        """끝난 작업을 따라가는 구독자가 없으면 프레임을 버림 (끝난 작업이 메모리에 쌓이지 않도록)"""
+        if self.finished and self._followers == 0:
+            self.frames = []
+
+    async def follow(self) -> AsyncIterator[str]:
+        """지금까지의 프레임부터 작업이 끝날 때까지 나오는 프레임을 차례로 전달 (이미 버린 프레임은 없음)"""
+        sent = 0
+        self._followers += 1
+        try:
+            while True:
+                async with self._changed:
+                    await self._changed.wait_for(lambda: len(self.frames) > sent or self.finished)
+                    frames = self.frames[sent:]
+                    finished = self.finished
+                for frame in frames:
+                    yield frame
+                sent += len(frames)
+                if finished and sent == len(self.frames):
+                    return
+        finally:
+            self._followers -= 1
+            self.release_frames()
+
+
+# 작업 실행 함수: 실행하면서 SSE 프레임을 내보내고, 결과는 job.result에 넣는다
+JobRunner = Callable[[Job], AsyncIterator[str]]
+
+
+class JobQueue:
+    def __init__(
+        self,
+        runner: JobRunner,
+        workers: int = JOB_WORKERS,
+        max_queued: int = JOB_QUEUE_SIZE,
+        history: int = JOB_HISTORY,
+    ) -> None:
+        self.runner = runner
+        self.workers = workers
+        self.max_queued = max_queued
+        self.history = history
+        self._jobs: "OrderedDict[str, Job]" = OrderedDict()
+        self._threads: Dict[str, Deque[Job]] = {}  # 세션별 아직 끝나지 않은 작업 (맨 앞이 실행 대상)
+        self._ready: Optional[asyncio.PriorityQueue] = None
+        self._seq = itertools.count()
+        self._queued = 0
+        self._tasks: List[asyncio.Task] = []
+
+    def _start(self) -> None:
+        """첫 작업이 들어올 때 실행 중인 이벤트 루프에서 워커 시작"""
+        if self._ready is None:
+            self._ready = asyncio.PriorityQueue()
+            self._tasks = [asyncio.get_running_loop().create_task(self._work()) for _ in range(self.workers)]
+
+    def _schedule(self, job: Job) -> None:
+        self._ready.put_nowait((job.priority, next(self._seq), job))
+
+    def submit(self, thread_id: str, kind: str, priority: int, payload: Any) -> Job:
+        """작업 등록 (이벤트 루프 안에서 호출)"""
+        if self._queued >= self.max_queued:
+            raise QueueFull(f"대기 중인 작업이 너무 많습니다 ({self._queued}개)")
+        self._start()
+
+        job = Job(thread_id, kind, priority, payload)
+        self._jobs[job.id] = job
+        self._queued += 1
+        pending = self._threads.setdefault(thread_id, deque())
+        pending.append(job)
+        if len(pending) == 1:
+            self._schedule(job)
+        self._trim()
+        return job
+
+    def get(self, job_id: str) -> Optional[Job]:
+        return self._jobs.get(job_id)
+
+    def stats(self) -> Dict[str, int]:
+        running = sum(1 for pending in self._threads.values() if pending and pending[0].status == "running")
+        return {"workers": self.workers, "queued": self._queued, "running": running}
+
+    def _trim(self) -> None:
+        """보관 수를 넘은 끝난 작업을 오래된 것부터 삭제"""
+        excess = len(self._jobs) - self.history
+        for job_id in [job_id for job_id, job in self._jobs.items() if job.finished][:max(0, excess)]:
+            del self._jobs[job_id]
+
+    async def _work(self) -> None:
+        while True:
+            _, _, job = await self._ready.get()
+            self._queued -= 1
+            job.status = "running"
+            job.started_at = time.time()
+            await job._notify()
+            try:
+                async for frame in self.runner(job):
+                    await job.emit(frame)
+                job.status = "done"
+            except asyncio.CancelledError:
+                job.status, job.error = "failed", "cancelled"
+                raise
+            except Exception as e:
+                job.status, job.error = "failed", str(getattr(e, "detail", None) or e)
+            finally:
+                job.finished_at = time.time()
+                await job._notify()
+                job.release_frames()
+                self._advance(job)
+
+    def _advance(self, job: Job) -> None:
+        """세션의 다음 작업을 우선순위 큐에 올림"""
+        pending = self._threads.get(job.thread_id)
+        if pending and pending[0] is job:
+            pending.popleft()
+        if pending:
+            self._schedule(pending[0])
+        else:
+            self._threads.pop(job.thread_id, None)
+
+    async def close(self) -> None:
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+        self._ready = None
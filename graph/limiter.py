@@ -0,0 +1,362 @@
+"""
+프로세스 전체 LLM 호출 스케줄러
+동시에 진행되는 게임들의 LLM 호출을 한곳에서 조율해, 할당량 근처에서도 429 폭주 없이 일정한 처리량을 유지한다.
+
+- 동시 호출 수 상한 (LLM_MAX_IN_FLIGHT)
+- 분당 요청 수 / 분당 토큰 수 토큰 버킷 (LLM_RPM, LLM_TPM)
+- 노드 종류별 우선순위: 차례를 기다리는 호출 중 사용자에게 보이는 발언을 먼저, 요약/압축을 나중에
+- 호출마다 기다린 시간을 노드별로 집계 (phantom_llm_queue_wait_seconds, Server-Timing llmwait.*)
+
+응답 캐시에 적중한 호출은 API를 부르지 않으므로 스케줄러를 거치지 않는다.
+세 설정이 모두 0(기본)이면 꺼진다.
+"""
+
+from contextlib import asynccontextmanager, contextmanager
+from typing import Any, AsyncIterator, Dict, Iterator, List, Optional, Tuple
+import asyncio
+import heapq
+import itertools
+import os
+import threading
+import time
+
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import BaseMessage
+from langchain_core.outputs import ChatGeneration, ChatGenerationChunk, ChatResult
+from langchain_core.runnables import Runnable
+
+from graph.metrics import current_caller, record_llm_wait
+
+# 노드별 우선순위 (숫자가 작을수록 먼저, LLM_NODE_PRIORITY 환경 변수로 변경, 예: "ai_suspect=1,summary_fold=5")
+NODE_PRIORITIES: Dict[str, int] = {
+    "character_speak": 0,
+    "fused_turn": 0,
+    "select_next_speaker": 1,
+    "night_clue": 2,
+    "ai_suspicion": 2,
+    "ai_suspect": 2,
+    "night_prefetch": 3,
+    "summary_fold": 4,
+    "summarize_round": 4,
+    "compress_memory": 4,
+}
+DEFAULT_PRIORITY = 2
+
+# 분당 토큰 버킷에서 미리 떼어 둘 응답 토큰 수 (호출이 끝나면 실제 사용량으로 정산)
+EXPECTED_OUTPUT_TOKENS = int(os.getenv("LLM_EXPECTED_OUTPUT_TOKENS", "300"))
+
+
+def _parse_priorities(spec: str) -> Dict[str, int]:
+    priorities = {}
+    for item in spec.split(","):
+        if item.strip():
+            node, _, value = item.partition("=")
+            priorities[node.strip()] = int(value)
+    return priorities
+
+
+NODE_PRIORITIES.update(_parse_priorities(os.getenv("LLM_NODE_PRIORITY", "")))
+
+
+class _Bucket:
+    """분당 amount만큼 채워지는 토큰 버킷 (처음에는 가득 참)"""
+
+    def __init__(self, per_minute: int) -> None:
+        self.capacity = float(per_minute)
+        self.level = float(per_minute)
+        self.rate = per_minute / 60.0
+        self.updated = time.monotonic()
+
+    def refill(self, now: float) -> None:
+        self.level = min(self.capacity, self.level + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def delay(self, amount: float) -> float:
+        """amount만큼 쌓일 때까지 남은 시간 (초)"""
+        return max(0.0, (min(amount, self.capacity) - self.level) / self.rate)
+
+    def take(self, amount: float) -> None:
+        self.level -= min(amount, self.capacity)
+
+    def give_back(self, amount: float) -> None:
+        self.level = min(self.capacity, self.level + amount)
+
+
+class _Waiter:
+    __slots__ = ("priority", "seq", "tokens", "cancelled", "wake")
+
+    def __init__(self, priority: int, seq: int, tokens: int, wake: Any) -> None:
+        self.priority = priority
+        self.seq = seq
+        self.tokens = tokens
+        self.cancelled = False
+        self.wake = wake  # 차례가 바뀌었을 때 부르는 함수
+
+    def __lt__(self, other: "_Waiter") -> bool:
+        return (self.priority, self.seq) < (other.priority, other.seq)
+
+
+class Lease:
+    """받은 호출 차례 (끝나면 used에 실제 토큰 사용량을 넣으면 분당 토큰 버킷을 정산)"""
+
+    __slots__ = ("tokens", "waited", "used")
+
+    def __init__(self, tokens: int, waited: float) -> None:
+        self.tokens = tokens
+        self.waited = waited
+        self.used: Optional[int] = None
+
+
+class LLMLimiter:
+    """
+    우선순위 대기열 + 동시 호출 상한 + 분당 요청/토큰 버킷
+    이벤트 루프(ainvoke)와 스레드(invoke)에서 함께 쓸 수 있다.
+    """
+
+    def __init__(self, max_in_flight: int = 0, rpm: int = 0, tpm: int = 0) -> None:
+        self.max_in_flight = max_in_flight
+        self._requests = _Bucket(rpm) if rpm else None
+        self._tokens = _Bucket(tpm) if tpm else None
+        self._lock = threading.Lock()
+        self._heap: List[_Waiter] = []
+        self._seq = itertools.count()
+        self._in_flight = 0
+
+    def _buckets(self) -> List[Tuple[_Bucket, str]]:
+        return [(bucket, kind) for bucket, kind in ((self._requests, "requests"), (self._tokens, "tokens")) if bucket]
+
+    def _enqueue(self, priority: int, tokens: int, wake: Any) -> _Waiter:
+        with self._lock:
+            waiter = _Waiter(priority, next(self._seq), tokens, wake)
+            heapq.heappush(self._heap, waiter)
+        self._notify()
+        return waiter
+
+    def _cancel(self, waiter: _Waiter) -> None:
+        with self._lock:
+            waiter.cancelled = True
+        self._notify()
+
+    def _notify(self) -> None:
+        """대기 중인 호출을 모두 깨워 자기 차례인지 다시 확인하게 함"""
+        with self._lock:
+            waiters = list(self._heap)
+        for waiter in waiters:
+            waiter.wake()
+
+    def _try(self, waiter: _Waiter) -> Tuple[bool, Optional[float]]:
+        """
+        차례를 받을 수 있으면 (True, None)
+        아니면 (False, 다시 확인할 때까지 기다릴 시간 또는 None(다른 호출이 끝날 때까지))
+        """
+        with self._lock:
+            while self._heap and self._heap[0].cancelled:
+                heapq.heappop(self._heap)
+            if not self._heap or self._heap[0] is not waiter:
+                return False, None
+            if self.max_in_flight and self._in_flight >= self.max_in_flight:
+                return False, None
+
+            now = time.monotonic()
+            delay = 0.0
+            for bucket, kind in self._buckets():
+                bucket.refill(now)
+                delay = max(delay, bucket.delay(1 if kind == "requests" else waiter.tokens))
+            if delay > 0:
+                return False, delay
+
+            for bucket, kind in self._buckets():
+                bucket.take(1 if kind == "requests" else waiter.tokens)
+            self._in_flight += 1
+            heapq.heappop(self._heap)
+        self._notify()  # 다음 호출이 바로 차례를 받을 수 있는지 확인
+        return True, None
+
+    def _release(self, lease: Lease) -> None:
+        with self._lock:
+            self._in_flight -= 1
+            if self._tokens is not None and lease.used is not None:
+                self._tokens.refill(time.monotonic())
+                self._tokens.give_back(lease.tokens - lease.used)
+        self._notify()
+
+    @asynccontextmanager
+    async def aslot(self, priority: int, tokens: int) -> AsyncIterator[Lease]:
+        """차례가 올 때까지 기다린 뒤 with 블록 동안 호출 한 자리를 차지"""
+        loop = asyncio.get_running_loop()
+        event = asyncio.Event()
+        start = time.perf_counter()
+        waiter = self._enqueue(priority, tokens, lambda: loop.call_soon_threadsafe(event.set))
+        try:
+            while True:
+                event.clear()
+                granted, delay = self._try(waiter)
+                if granted:
+                    break
+                try:
+                    await asyncio.wait_for(event.wait(), delay)
+                except asyncio.TimeoutError:
+                    pass
+        except BaseException:
+            self._cancel(waiter)
+            raise
+
+        lease = Lease(tokens, time.perf_counter() - start)
+        try:
+            yield lease
+        finally:
+            self._release(lease)
+
+    @contextmanager
+    def slot(self, priority: int, tokens: int) -> Iterator[Lease]:
+        """동기 호출용 aslot"""
+        event = threading.Event()
+        start = time.perf_counter()
+        waiter = self._enqueue(priority, tokens, event.set)
+        try:
+            while True:
+                event.clear()
+                granted, delay = self._try(waiter)
+                if granted:
+                    break
+                event.wait(delay)
+        except BaseException:
+            self._cancel(waiter)
+            raise
+
+        lease = Lease(tokens, time.perf_counter() - start)
+        try:
+            yield lease
+        finally:
+            self._release(lease)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            waiting = sum(1 for waiter in self._heap if not waiter.cancelled)
+            return {"in_flight": self._in_flight, "waiting": waiting, "max_in_flight": self.max_in_flight}
+
+
+_limiter: Optional[LLMLimiter] = None
+_limiter_lock = threading.Lock()
+
+
+def get_limiter() -> Optional[LLMLimiter]:
+    """
+    프로세스 공용 스케줄러 (LLM_MAX_IN_FLIGHT, LLM_RPM, LLM_TPM 환경 변수)
+    모두 0이면 None (호출을 조율하지 않음)
+    """
+    global _limiter
+    max_in_flight = int(os.getenv("LLM_MAX_IN_FLIGHT", "0"))
+    rpm = int(os.getenv("LLM_RPM", "0"))
+    tpm = int(os.getenv("LLM_TPM", "0"))
+    if not (max_in_flight or rpm or tpm):
+        return None
+    if _limiter is None:
+        with _limiter_lock:
+            if _limiter is None:
+                _limiter = LLMLimiter(max_in_flight, rpm, tpm)
+    return _limiter
+
+
+# 감싼 모델 호출에는 콜백을 넘기지 않는다 (토큰 스트리밍과 계측은 래퍼의 실행에서 한 번만)
+_INNER_CONFIG = {"callbacks": []}
+
+
+def _used_tokens(message: BaseMessage) -> Optional[int]:
+    usage = getattr(message, "usage_metadata", None)
+    return usage.get("total_tokens") if usage else None
+
+
+class LimitedChatModel(BaseChatModel):
+    """
+    다른 챗 모델의 호출을 스케줄러를 거쳐 실행하는 래퍼
+    호출한 노드는 콜백 메타데이터(langgraph_node)로 알아내고, 기다린 시간은 LLM 시간에서 빼서 따로 집계한다.
+    """
+
+    inner: Runnable
+    limiter: LLMLimiter
+
+    model_config = {"arbitrary_types_allowed": True}
+
+    @property
+    def _llm_type(self) -> str:
+        return getattr(self.inner, "_llm_type", "limited")
+
+    @property
+    def _identifying_params(self) -> Dict[str, Any]:
+        # 응답 캐시 키와 정책(temperature)이 감싼 모델의 설정을 따르도록
+        return dict(getattr(self.inner, "_identifying_params", {}))
+
+    def bind_tools(self, tools: Any, **kwargs: Any) -> Runnable:
+        """구조화 출력(tool calling)도 감싼 모델의 구현을 그대로 쓰되 스케줄러를 거친다"""
+        return self.model_copy(update={"inner": self.inner.bind_tools(tools, **kwargs)})
+
+    def _reserve(self, messages: List[BaseMessage], run_manager: Any) -> Tuple[str, Optional[str], int, int]:
+        node, thread_id = current_caller(run_manager)
+        from graph.llm import estimate_tokens
+
+        tokens = sum(estimate_tokens(str(msg.content)) for msg in messages) + EXPECTED_OUTPUT_TOKENS
+        return node, thread_id, NODE_PRIORITIES.get(node, DEFAULT_PRIORITY), tokens
+
+    @staticmethod
+    def _started(lease: Lease, node: str, thread_id: Optional[str], run_manager: Any) -> None:
+        # 복원력 계층이 감싸고 있으면 기다린 시간을 뺄 대상은 바깥(노드가 부른) 호출
+        metadata = getattr(run_manager, "metadata", None) or {}
+        run_id = metadata.get("llm_run_id") or getattr(run_manager, "run_id", None)
+        record_llm_wait(node, thread_id, lease.waited, run_id)
+
+    def _generate(
+        self,
+        messages: List[BaseMessage],
+        stop: Optional[List[str]] = None,
+        run_manager: Any = None,
+        **kwargs: Any,
+    ) -> ChatResult:
+        node, thread_id, priority, tokens = self._reserve(messages, run_manager)
+        with self.limiter.slot(priority, tokens) as lease:
+            self._started(lease, node, thread_id, run_manager)
+            message = self.inner.invoke(messages, config=_INNER_CONFIG, stop=stop, **kwargs)
+            lease.used = _used_tokens(message)
+        return ChatResult(generations=[ChatGeneration(message=message)])
+
+    async def _agenerate(
+        self,
+        messages: List[BaseMessage],
+        stop: Optional[List[str]] = None,
+        run_manager: Any = None,
+        **kwargs: Any,
+    ) -> ChatResult:
+        node, thread_id, priority, tokens = self._reserve(messages, run_manager)
+        async with self.limiter.aslot(priority, tokens) as lease:
+            self._started(lease, node, thread_id, run_manager)
+            message = await self.inner.ainvoke(messages, config=_INNER_CONFIG, stop=stop, **kwargs)
+            lease.used = _used_tokens(message)
+        return ChatResult(generations=[ChatGeneration(message=message)])
+
+    def _stream(
+        self,
+        messages: List[BaseMessage],
+        stop: Optional[List[str]] = None,
+        run_manager: Any = None,
+        **kwargs: Any,
+    ) -> Iterator[ChatGenerationChunk]:
+        node, thread_id, priority, tokens = self._reserve(messages, run_manager)
+        with self.limiter.slot(priority, tokens) as lease:
+            self._started(lease, node, thread_id, run_manager)
+            for chunk in self.inner.stream(messages, config=_INNER_CONFIG, stop=stop, **kwargs):
+                lease.used = _used_tokens(chunk) or lease.used
+                yield ChatGenerationChunk(message=chunk)
+
+    async def _astream(
+        self,
+        messages: List[BaseMessage],
+        stop: Optional[List[str]] = None,
+        run_manager: Any = None,
+        **kwargs: Any,
+    ) -> AsyncIterator[ChatGenerationChunk]:
+        node, thread_id, priority, tokens = self._reserve(messages, run_manager)
+        async with self.limiter.aslot(priority, tokens) as lease:
+            self._started(lease, node, thread_id, run_manager)
+            async for chunk in self.inner.astream(messages, config=_INNER_CONFIG, stop=stop, **kwargs):
+                lease.used = _used_tokens(chunk) or lease.used
+                yield ChatGenerationChunk(message=chunk)
@@ -0,0 +1,300 @@
+"""
+LLM 클라이언트 레지스트리
+(백엔드, 모델, 생성 설정) 조합별로 챗 모델을 한 번만 만들어 프로세스 전체에서 재사용한다.
+- gemini: ChatGoogleGenerativeAI + keep-alive HTTP 커넥션 풀
+- local: 네트워크 없이 지연만 흉내 내는 로컬 대체 모델 (벤치마크용)
+- scripted: 노드별 프롬프트에 맞는 결정적 응답 + 지연 분포를 흉내 내는 대체 모델 (graph/fake_llm.py)
+- cassette: 실제 응답을 프롬프트 해시로 녹화/재생 (graph/cassette.py)
+LLM_CACHE_DB를 지정하면 어느 백엔드든 디스크 응답 캐시(graph/response_cache.py)를 거친다.
+LLM_MAX_IN_FLIGHT / LLM_RPM / LLM_TPM을 지정하면 캐시에 없는 호출은 프로세스 전체 스케줄러(graph/limiter.py)를 거친다.
+모든 호출에는 노드별 마감 시간, 재시도, 회로 차단기(graph/resilience.py)가 적용된다. (LLM_RESILIENCE=0이면 끔)
+"""
+
+from typing import Any, AsyncIterator, Callable, Dict, Iterator, List, Optional, Tuple, Type
+import asyncio
+import os
+import threading
+import time
+
+import httpx
+from dotenv import load_dotenv
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import AIMessage, AIMessageChunk, BaseMessage
+from langchain_core.output_parsers import PydanticOutputParser
+from langchain_core.outputs import ChatGeneration, ChatGenerationChunk, ChatResult
+from langchain_core.runnables import Runnable
+from pydantic import BaseModel, PrivateAttr
+
+from graph.limiter import LimitedChatModel, get_limiter
+from graph.metrics import llm_metrics_handler
+from graph.resilience import resilience_enabled, resilient
+from graph.response_cache import get_response_cache
+
+load_dotenv()
+
+DEFAULT_MODEL = "gemini-2.5-flash"
+
+_registry: Dict[Tuple, BaseChatModel] = {}
+_structured: Dict[Tuple, Runnable] = {}
+_registry_lock = threading.Lock()
+
+
+def estimate_tokens(text: str) -> int:
+    """
+    토크나이저 없이 대략적인 토큰 수 추정
+    한글은 음절당 약 1토큰, 그 외(영문, 숫자, 공백, 기호)는 4글자당 약 1토큰으로 센다.
+    """
+    hangul = sum(1 for ch in text if "\uac00" <= ch <= "\ud7a3")
+    return hangul + (len(text) - hangul + 3) // 4
+
+
+def _usage(messages: List[BaseMessage], text: str) -> Dict[str, int]:
+    """대체 모델 응답에 붙일 추정 토큰 사용량 (실제 모델의 usage_metadata와 같은 형식)"""
+    input_tokens = sum(estimate_tokens(str(msg.content)) for msg in messages)
+    output_tokens = estimate_tokens(text)
+    return {"input_tokens": input_tokens, "output_tokens": output_tokens, "total_tokens": input_tokens + output_tokens}
+
+
+class LocalChatModel(BaseChatModel):
+    """
+    로컬 대체 LLM
+    실제 API 대신 고정 응답을 돌려주며, 클라이언트 생성 비용과
+    콜드 커넥션(핸드셰이크) 비용, 응답 지연을 sleep으로 흉내 낸다.
+    """
+
+    model: str = DEFAULT_MODEL
+    response_text: str = "음... 잘 모르겠어요. 다들 어젯밤에 뭐 하셨어요?"
+    construct_latency: float = 0.05  # 클라이언트 생성 + 인증 설정
+    connect_latency: float = 0.1  # 새 커넥션(TCP + TLS) 수립
+    response_latency: float = 0.3  # 응답 생성
+    keepalive_expiry: float = 30.0  # 유휴 커넥션 유지 시간
+
+    _last_used: Optional[float] = PrivateAttr(default=None)
+    _lock: threading.Lock = PrivateAttr(default_factory=threading.Lock)
+
+    def model_post_init(self, __context: Any) -> None:
+        time.sleep(self.construct_latency)
+
+    @property
+    def _llm_type(self) -> str:
+        return "local-stand-in"
+
+    def _connection_cost(self) -> float:
+        """커넥션이 없거나 만료되었으면 새로 연결하는 비용을 반환"""
+        now = time.monotonic()
+        with self._lock:
+            cold = self._last_used is None or now - self._last_used > self.keepalive_expiry
+            self._last_used = now
+        return self.connect_latency if cold else 0.0
+
+    def _reply(self, messages: List[BaseMessage]) -> str:
+        """응답 본문 (하위 클래스에서 프롬프트에 맞게 바꿀 수 있음)"""
+        return self.response_text
+
+    def _response_delay(self, messages: List[BaseMessage]) -> float:
+        """응답 생성 지연(초)"""
+        return self.response_latency
+
+    def _generate(
+        self,
+        messages: List[BaseMessage],
+        stop: Optional[List[str]] = None,
+        run_manager: Any = None,
+        **kwargs: Any,
+    ) -> ChatResult:
+        time.sleep(self._connection_cost() + self._response_delay(messages))
+        text = self._reply(messages)
+        message = AIMessage(content=text, usage_metadata=_usage(messages, text))
+        return ChatResult(generations=[ChatGeneration(message=message)])
+
+    async def _agenerate(
+        self,
+        messages: List[BaseMessage],
+        stop: Optional[List[str]] = None,
+        run_manager: Any = None,
+        **kwargs: Any,
+    ) -> ChatResult:
+        await asyncio.sleep(self._connection_cost() + self._response_delay(messages))
+        text = self._reply(messages)
+        message = AIMessage(content=text, usage_metadata=_usage(messages, text))
+        return ChatResult(generations=[ChatGeneration(message=message)])
+
+    @staticmethod
+    def _tokens(text: str) -> List[str]:
+        """응답을 공백 단위 토큰으로 분할 (스트리밍 흉내)"""
+        words = text.split(" ")
+        return [word if i == 0 else " " + word for i, word in enumerate(words)]
+
+    def _stream(
+        self,
+        messages: List[BaseMessage],
+        stop: Optional[List[str]] = None,
+        run_manager: Any = None,
+        **kwargs: Any,
+    ) -> Iterator[ChatGenerationChunk]:
+        text = self._reply(messages)
+        tokens = self._tokens(text)
+        delay = self._response_delay(messages)
+        time.sleep(self._connection_cost())
+        for i, token in enumerate(tokens):
+            time.sleep(delay / len(tokens))
+            usage = _usage(messages, text) if i == len(tokens) - 1 else None
+            chunk = ChatGenerationChunk(message=AIMessageChunk(content=token, usage_metadata=usage))
+            if run_manager:
+                run_manager.on_llm_new_token(token, chunk=chunk)
+            yield chunk
+
+    async def _astream(
+        self,
+        messages: List[BaseMessage],
+        stop: Optional[List[str]] = None,
+        run_manager: Any = None,
+        **kwargs: Any,
+    ) -> AsyncIterator[ChatGenerationChunk]:
+        text = self._reply(messages)
+        tokens = self._tokens(text)
+        delay = self._response_delay(messages)
+        await asyncio.sleep(self._connection_cost())
+        for i, token in enumerate(tokens):
+            await asyncio.sleep(delay / len(tokens))
+            usage = _usage(messages, text) if i == len(tokens) - 1 else None
+            chunk = ChatGenerationChunk(message=AIMessageChunk(content=token, usage_metadata=usage))
+            if run_manager:
+                await run_manager.on_llm_new_token(token, chunk=chunk)
+            yield chunk
+
+
+def _pool_client_args() -> Dict[str, Any]:
+    """google-genai SDK 내부 httpx 클라이언트에 넘길 커넥션 풀 설정"""
+    return {
+        "limits": httpx.Limits(
+            max_connections=int(os.getenv("LLM_POOL_SIZE", "100")),
+            max_keepalive_connections=int(os.getenv("LLM_POOL_KEEPALIVE", "20")),
+            keepalive_expiry=float(os.getenv("LLM_KEEPALIVE_SECONDS", "60")),
+        )
+    }
+
+
+def _build_gemini(model: str, settings: Dict[str, Any]) -> BaseChatModel:
+    from langchain_google_genai import ChatGoogleGenerativeAI
+
+    if resilience_enabled():
+        settings = {"max_retries": 0, **settings}  # 재시도는 복원력 계층에서 (SDK 기본 6회와 겹치지 않도록)
+    return ChatGoogleGenerativeAI(
+        model=model,
+        google_api_key=os.getenv("GOOGLE_API_KEY"),
+        client_args=_pool_client_args(),
+        **settings,
+    )
+
+
+def _build_local(model: str, settings: Dict[str, Any]) -> BaseChatModel:
+    latency_ms = float(os.getenv("LLM_LOCAL_LATENCY_MS", "300"))
+    return LocalChatModel(model=model, response_latency=latency_ms / 1000, **settings)
+
+
+def _build_scripted(model: str, settings: Dict[str, Any]) -> BaseChatModel:
+    from graph.fake_llm import ScriptedChatModel
+
+    return ScriptedChatModel(
+        model=model,
+        latency=os.getenv("LLM_FAKE_LATENCY", "300"),
+        seed=int(os.getenv("LLM_FAKE_SEED", "0")),
+        error_rate=float(os.getenv("LLM_FAKE_ERROR_RATE", "0")),
+        **settings,
+    )
+
+
+def _build_cassette(model: str, settings: Dict[str, Any]) -> BaseChatModel:
+    from graph.cassette import CassetteChatModel, get_cassette
+
+    inner_backend = os.getenv("LLM_CASSETTE_BACKEND", "gemini")
+    mode = os.getenv("LLM_CASSETTE_MODE", "replay")
+    # replay 전용이면 실제 모델(과 API 키)이 필요 없다
+    inner = None if mode == "replay" else _BACKENDS[inner_backend](model, settings)
+    return CassetteChatModel(
+        model=model,
+        inner=inner,
+        cassette=get_cassette(os.getenv("LLM_CASSETTE", "cassettes/llm.jsonl")),
+        mode=mode,
+        replay_latency=os.getenv("LLM_CASSETTE_REPLAY_LATENCY", "0") == "1",
+        settings=tuple(sorted(settings.items())),
+    )
+
+
+_BACKENDS: Dict[str, Callable[[str, Dict[str, Any]], BaseChatModel]] = {
+    "gemini": _build_gemini,
+    "local": _build_local,
+    "scripted": _build_scripted,
+    "cassette": _build_cassette,
+}
+
+
+def register_backend(name: str, builder: Callable[[str, Dict[str, Any]], BaseChatModel]) -> None:
+    """
+    LLM 백엔드 추가
+    builder(model, settings)는 LangChain 챗 모델을 반환해야 하며, LLM_BACKEND=name으로 선택한다.
+    """
+    _BACKENDS[name] = builder
+    clear_llm_registry()
+
+
+def get_backend_name() -> str:
+    """사용할 LLM 백엔드 이름 (LLM_BACKEND 환경 변수, 기본 gemini)"""
+    return os.getenv("LLM_BACKEND", "gemini")
+
+
+def get_llm(model: str = DEFAULT_MODEL, **settings: Any) -> BaseChatModel:
+    """
+    공유 LLM 클라이언트 반환
+    같은 (백엔드, 모델, 설정) 조합이면 이미 만들어 둔 인스턴스를 그대로 돌려준다.
+    """
+    backend = get_backend_name()
+    if backend not in _BACKENDS:
+        raise ValueError(f"알 수 없는 LLM 백엔드: {backend}")
+
+    key = (backend, model, tuple(sorted(settings.items())))
+    llm = _registry.get(key)
+    if llm is not None:
+        return llm
+
+    with _registry_lock:
+        llm = _registry.get(key)
+        if llm is None:
+            llm = _BACKENDS[backend](model, settings)
+            limiter = get_limiter()
+            if limiter is not None:
+                llm = LimitedChatModel(inner=llm, limiter=limiter)  # 프로세스 전체 호출 스케줄러
+            if resilience_enabled():
+                llm = resilient(llm, backend)  # 마감 시간, 재시도, 복제 요청, 회로 차단기 (시도마다 스케줄러를 거침)
+            llm.callbacks = [llm_metrics_handler]  # 노드별 LLM 시간/토큰 계측
+            cache = get_response_cache()
+            if cache is not None:
+                llm.cache = cache  # 디스크 응답 캐시 (LLM_CACHE_DB를 지정했을 때만)
+            _registry[key] = llm
+    return llm
+
+
+def get_structured_llm(schema: Type[BaseModel], model: str = DEFAULT_MODEL, **settings: Any) -> Runnable:
+    """
+    schema(pydantic 모델) 인스턴스를 돌려주는 LLM
+    모델이 구조화 출력(tool calling / JSON 스키마)을 지원하면 그것을 쓰고,
+    지원하지 않는 대체 모델은 응답의 JSON(코드 블록 포함)을 파싱한다.
+    """
+    llm = get_llm(model, **settings)
+    key = (id(llm), schema)
+    runnable = _structured.get(key)
+    if runnable is None:
+        try:
+            runnable = llm.with_structured_output(schema)
+        except NotImplementedError:
+            runnable = llm | PydanticOutputParser(pydantic_object=schema)
+        _structured[key] = runnable
+    return runnable
+
+
+def clear_llm_registry() -> None:
+    """레지스트리 초기화 (설정 변경 후 재생성이 필요할 때)"""
+    with _registry_lock:
+        _registry.clear()
+        _structured.clear()
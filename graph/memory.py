@@ -0,0 +1,164 @@
+"""
+캐릭터 기억 (롤링 요약 + 장기 기억)
+- 롤링 요약: 낮 동안 새 메시지가 SUMMARY_WINDOW개 쌓일 때마다 지금까지의 요약에 새 메시지만 합쳐 갱신한다.
+  밤의 라운드 요약은 롤링 요약 + 아직 합치지 않은 메시지만 보므로 프롬프트 크기가 하루 길이와 무관하다.
+- 장기 기억: 최근 RECENT_ROUND_SUMMARIES개 라운드 요약만 그대로 두고, 그 이전 라운드 요약들은
+  LONG_TERM_MEMORY_TOKENS 토큰 이내의 장기 기억 한 덩어리로 합친다.
+  발언 프롬프트에는 장기 기억 + 최근 라운드 요약만 들어가므로 라운드가 늘어도 크기가 일정하다.
+"""
+
+from typing import Any, Dict, List, Optional
+import json
+import os
+
+from langchain_core.messages import BaseMessage, HumanMessage
+from graph.llm import estimate_tokens
+
+# 롤링 요약을 갱신할 새 메시지 수
+SUMMARY_WINDOW = int(os.getenv("SUMMARY_WINDOW", "12"))
+# 프롬프트에 원문 그대로 넣을 최근 라운드 요약 수 (그 이전은 장기 기억으로 합침)
+RECENT_ROUND_SUMMARIES = int(os.getenv("RECENT_ROUND_SUMMARIES", "1"))
+# 라운드 요약 / 장기 기억 최대 토큰 수
+ROUND_SUMMARY_TOKENS = int(os.getenv("ROUND_SUMMARY_TOKENS", "500"))
+LONG_TERM_MEMORY_TOKENS = int(os.getenv("LONG_TERM_MEMORY_TOKENS", "400"))
+
+# 롤링 요약 호출은 토론 노드 안에서 발언과 함께 실행되므로, 토큰 스트리밍에 섞이지 않고
+# 계측에서도 따로 집계되도록 태그와 노드 이름을 지정한다.
+FOLD_CONFIG = {"tags": ["nostream"], "metadata": {"langgraph_node": "summary_fold"}}
+
+
+def fit_tokens(text: str, budget: int) -> str:
+    """추정 토큰 수가 budget을 넘으면 뒤를 잘라냄"""
+    text = text.strip()
+    if estimate_tokens(text) <= budget:
+        return text
+    low, high = 0, len(text)
+    while low < high:
+        mid = (low + high + 1) // 2
+        if estimate_tokens(text[:mid]) + 1 <= budget:
+            low = mid
+        else:
+            high = mid - 1
+    return text[:low].rstrip() + "…"
+
+
+def pending_messages(state: Dict[str, Any]) -> List[BaseMessage]:
+    """롤링 요약에 아직 합쳐지지 않은 메시지"""
+    messages = state.get("messages", [])
+    start = state.get("summary_cursor", 0) - state.get("message_offset", 0)
+    return messages[max(0, start):]
+
+
+def should_fold(state: Dict[str, Any]) -> bool:
+    """합치지 않은 메시지가 한 창(SUMMARY_WINDOW)만큼 쌓였는지"""
+    return len(pending_messages(state)) >= SUMMARY_WINDOW
+
+
+def summary_messages(state: Dict[str, Any], night: bool = True) -> List[BaseMessage]:
+    """
+    라운드 요약 프롬프트 (롤링 요약 + 새 메시지)
+    night=False면 낮 동안의 중간 갱신으로, 밤 로그와 의심 수치는 넣지 않는다.
+    """
+    round_number = state.get("round_number", 1)
+    rolling_summary = state.get("rolling_summary", "")
+
+    prompt = f"""
+[Round {round_number} 요약 요청]
+
+다음은 이번 라운드(Day {round_number})의 대화 및 사건 기록입니다.
+이 내용을 바탕으로 다음 라운드에서 캐릭터들이 기억해야 할 핵심 내용을 요약해주세요.
+"""
+    if rolling_summary:
+        prompt += f"""
+[지금까지의 요약]
+{rolling_summary}
+
+위 요약 이후의 새 대화만 아래에 있습니다. 지금까지의 요약에 새 내용을 합쳐 하나의 요약으로 다시 작성하세요.
+"""
+    prompt += "\n[대화 기록]\n"
+    for msg in pending_messages(state):
+        sender = msg.name if hasattr(msg, 'name') else "System"
+        prompt += f"- {sender}: {msg.content}\n"
+
+    if night:
+        prompt += f"""
+[밤 행동 로그]
+{json.dumps(state.get("night_logs", []), ensure_ascii=False)}
+
+[현재 의심 수치]
+{json.dumps(state.get("suspicion_counts", {}), ensure_ascii=False)}
+"""
+    prompt += f"""
+**요약 가이드라인:**
+1. 누가 누구를 의심했는지, 주요 대립 구도는 무엇이었는지 요약하세요.
+2. 사망자가 발생했다면 누구인지 명시하세요.
+3. 캐릭터들이 다음 날 아침에 기억해야 할 중요한 단서나 발언을 포함하세요.
+4. 전체 길이는 {ROUND_SUMMARY_TOKENS}자 이내로 핵심만 간결하게 작성하세요.
+"""
+    return [HumanMessage(content=prompt)]
+
+
+def extractive_summary(state: Dict[str, Any]) -> str:
+    """
+    LLM 없이 만든 라운드 요약 (백엔드 장애 때 대체용)
+    롤링 요약과 밤 로그에, 예산이 남는 만큼 가장 최근 대화를 원문 그대로 붙인다.
+    """
+    head = [state["rolling_summary"]] if state.get("rolling_summary") else []
+    head += state.get("night_logs", [])
+    budget = ROUND_SUMMARY_TOKENS - sum(estimate_tokens(line) for line in head)
+
+    recent: List[str] = []
+    for msg in reversed(pending_messages(state)):
+        line = f"{msg.name if hasattr(msg, 'name') else 'System'}: {msg.content}"
+        budget -= estimate_tokens(line)
+        if budget < 0:
+            break
+        recent.append(line)
+    return "\n".join(head + recent[::-1])
+
+
+def rounds_to_compress(state: Dict[str, Any]) -> List[int]:
+    """
+    장기 기억으로 합칠 라운드 (밤 기준)
+    오늘 밤 요약될 라운드까지 최근 RECENT_ROUND_SUMMARIES개는 남긴다.
+    """
+    round_number = state.get("round_number", 1)
+    memory_round = state.get("memory_round", 0)
+    return sorted(
+        r for r in state.get("round_summaries", {})
+        if memory_round < r <= round_number - RECENT_ROUND_SUMMARIES
+    )
+
+
+def compress_messages(state: Dict[str, Any], rounds: List[int]) -> List[BaseMessage]:
+    """기존 장기 기억과 오래된 라운드 요약들을 하나로 합치는 프롬프트"""
+    round_summaries = state.get("round_summaries", {})
+    long_term_memory = state.get("long_term_memory", "")
+
+    prompt = """
+[장기 기억 압축]
+
+'팬텀 로그' 게임의 지난 라운드 기록을 캐릭터들이 계속 기억할 수 있도록 하나의 장기 기억으로 합쳐주세요.
+"""
+    if long_term_memory:
+        prompt += f"\n[기존 장기 기억]\n{long_term_memory}\n"
+    prompt += "\n[새로 합칠 라운드 요약]\n"
+    prompt += "\n".join(f"[Round {r} 요약]: {round_summaries[r]}" for r in rounds) + "\n"
+    prompt += f"""
+**작성 가이드라인:**
+1. 사망자, 공개된 단서, 반복해서 의심받은 사람처럼 이후 추리에 필요한 사실만 남기세요.
+2. 라운드 순서가 드러나도록 쓰되, 오래된 세부 발언은 과감히 생략하세요.
+3. 전체 길이는 {LONG_TERM_MEMORY_TOKENS}자 이내로 작성하세요.
+"""
+    return [HumanMessage(content=prompt)]
+
+
+def memory_text(state: Dict[str, Any]) -> Optional[str]:
+    """발언 프롬프트에 넣을 기억 (장기 기억 + 아직 합치지 않은 최근 라운드 요약), 없으면 None"""
+    memory_round = state.get("memory_round", 0)
+    lines = []
+    if state.get("long_term_memory"):
+        lines.append(f"[장기 기억 (Round 1~{memory_round})]: {state['long_term_memory']}")
+    round_summaries = state.get("round_summaries", {})
+    lines += [f"[Round {r} 요약]: {round_summaries[r]}" for r in sorted(round_summaries) if r > memory_round]
+    return "\n".join(lines) or None
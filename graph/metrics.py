@@ -0,0 +1,448 @@
+"""
+노드/LLM 계측
+create_game_graph()에 등록된 모든 노드의 실행 시간과 에러, 노드 안에서 일어난 LLM 호출의
+시간·토큰·예상 비용·재시도·에러를 노드별, 스레드(게임 세션)별로 집계한다.
+
+- render_prometheus(): Prometheus 텍스트 형식 (/metrics)
+- collect_timings(): 한 요청 동안 실행된 노드/LLM 시간 (Server-Timing 헤더)
+- thread_summary(): 세션별 누적 집계
+
+LLM 응답 캐시(graph/response_cache.py)를 켜면 노드별 캐시 적중/실패와 아낀 시간·토큰도 함께 집계한다.
+LLM 호출 스케줄러(graph/limiter.py)를 켜면 호출마다 차례를 기다린 시간을 따로 집계한다. (LLM 시간에는 포함하지 않음)
+복원력 계층(graph/resilience.py)의 시간 초과·복제 요청·대체 응답 수와 회로 차단기 상태도 함께 내보낸다.
+"""
+
+from collections import OrderedDict, defaultdict
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+from uuid import UUID
+import inspect
+import os
+import threading
+import time
+
+from langchain_core.callbacks import BaseCallbackHandler
+from langchain_core.outputs import LLMResult
+from langchain_core.runnables import RunnableConfig, RunnableLambda
+from langchain_core.runnables.config import var_child_runnable_config
+from langgraph.errors import GraphBubbleUp
+
+# 히스토그램 버킷 (초)
+BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+# 100만 토큰당 가격 (USD, 기본값은 gemini-2.5-flash)
+PRICE_INPUT_PER_1M = float(os.getenv("LLM_PRICE_INPUT_PER_1M", "0.30"))
+PRICE_OUTPUT_PER_1M = float(os.getenv("LLM_PRICE_OUTPUT_PER_1M", "2.50"))
+
+# 세션별 집계를 보관할 최대 스레드 수 (오래된 것부터 삭제)
+MAX_TRACKED_THREADS = int(os.getenv("METRICS_MAX_THREADS", "1000"))
+
+_COUNTERS = (
+    "node_calls", "node_errors", "llm_calls", "llm_errors", "llm_retries", "prompt_tokens", "completion_tokens",
+    "cache_hits", "cache_misses", "cache_saved_tokens", "llm_timeouts", "llm_hedges", "llm_fallbacks",
+)
+
+
+class _Histogram:
+    def __init__(self) -> None:
+        self.counts = [0] * len(BUCKETS)
+        self.total = 0.0
+        self.n = 0
+
+    def observe(self, value: float) -> None:
+        for i, bound in enumerate(BUCKETS):
+            if value <= bound:
+                self.counts[i] += 1
+        self.total += value
+        self.n += 1
+
+
+class _Stats:
+    """노드 하나(또는 세션 하나)의 누적 값"""
+
+    def __init__(self) -> None:
+        self.counters: Dict[str, int] = defaultdict(int)
+        self.node_time = _Histogram()
+        self.llm_time = _Histogram()
+        self.llm_wait = _Histogram()
+        self.cost = 0.0
+        self.cache_saved_seconds = 0.0
+
+    def as_dict(self) -> Dict[str, Any]:
+        return {
+            **{name: self.counters[name] for name in _COUNTERS},
+            "node_seconds": round(self.node_time.total, 4),
+            "llm_seconds": round(self.llm_time.total, 4),
+            "llm_wait_seconds": round(self.llm_wait.total, 4),
+            "cost_usd": round(self.cost, 6),
+            "cache_saved_seconds": round(self.cache_saved_seconds, 4),
+        }
+
+
+class _Timings:
+    """한 요청 동안의 노드/LLM 실행 시간 (Server-Timing 헤더용)"""
+
+    def __init__(self) -> None:
+        self.start = time.perf_counter()
+        self.entries: "OrderedDict[str, List[float]]" = OrderedDict()
+
+    def add(self, name: str, seconds: float) -> None:
+        self.entries.setdefault(name, []).append(seconds)
+
+    def header(self) -> str:
+        parts = []
+        for name, values in self.entries.items():
+            desc = f';desc="x{len(values)}"' if len(values) > 1 else ""
+            parts.append(f"{name}{desc};dur={sum(values) * 1000:.1f}")
+        parts.append(f"total;dur={(time.perf_counter() - self.start) * 1000:.1f}")
+        return ", ".join(parts)
+
+
+_lock = threading.Lock()
+_nodes: Dict[str, _Stats] = defaultdict(_Stats)
+_threads: "OrderedDict[str, _Stats]" = OrderedDict()
+_current_timings: ContextVar[Optional[_Timings]] = ContextVar("current_timings", default=None)
+# 진행 중인 LLM 호출이 스케줄러에서 기다린 시간 (LLM 시간에서 뺄 몫)
+_queue_wait: ContextVar[float] = ContextVar("queue_wait", default=0.0)
+# 백엔드별 회로 차단기 상태 (closed | open | half_open)
+_breakers: Dict[str, str] = {}
+
+
+def _thread_stats(thread_id: Optional[str]) -> Optional[_Stats]:
+    """세션별 집계 (호출 시 _lock을 잡고 있어야 함)"""
+    if not thread_id:
+        return None
+    stats = _threads.get(thread_id)
+    if stats is None:
+        stats = _threads[thread_id] = _Stats()
+        while len(_threads) > MAX_TRACKED_THREADS:
+            _threads.popitem(last=False)
+    else:
+        _threads.move_to_end(thread_id)
+    return stats
+
+
+def _targets(node: str, thread_id: Optional[str]) -> List[_Stats]:
+    return [s for s in (_nodes[node], _thread_stats(thread_id)) if s is not None]
+
+
+def _record_timing(name: str, seconds: float) -> None:
+    timings = _current_timings.get()
+    if timings is not None:
+        timings.add(name, seconds)
+
+
+def record_node(node: str, thread_id: Optional[str], seconds: float, error: bool = False) -> None:
+    with _lock:
+        for stats in _targets(node, thread_id):
+            stats.counters["node_calls"] += 1
+            stats.counters["node_errors"] += int(error)
+            stats.node_time.observe(seconds)
+    _record_timing(node, seconds)
+
+
+def record_node_error(node: str, thread_id: Optional[str]) -> None:
+    """노드가 실패를 처리하고 계속 진행한 경우(대체 응답 등)의 에러 수"""
+    with _lock:
+        for stats in _targets(node, thread_id):
+            stats.counters["node_errors"] += 1
+
+
+def record_llm(
+    node: str,
+    thread_id: Optional[str],
+    seconds: float,
+    prompt_tokens: int = 0,
+    completion_tokens: int = 0,
+    error: bool = False,
+) -> None:
+    cost = (prompt_tokens * PRICE_INPUT_PER_1M + completion_tokens * PRICE_OUTPUT_PER_1M) / 1_000_000
+    with _lock:
+        for stats in _targets(node, thread_id):
+            stats.counters["llm_calls"] += 1
+            stats.counters["llm_errors"] += int(error)
+            stats.counters["prompt_tokens"] += prompt_tokens
+            stats.counters["completion_tokens"] += completion_tokens
+            stats.llm_time.observe(seconds)
+            stats.cost += cost
+    _record_timing(f"llm.{node}", seconds)
+
+
+def record_llm_wait(node: str, thread_id: Optional[str], seconds: float, run_id: Optional[UUID] = None) -> None:
+    """
+    LLM 호출이 스케줄러에서 차례를 기다린 시간
+    호출이 끝날 때 LLMMetricsHandler가 LLM 시간에서 이만큼 뺀다.
+    run_id를 모르면(스트리밍) 같은 실행 컨텍스트의 다음 호출 종료에서 뺀다.
+    """
+    if run_id is None or not llm_metrics_handler.exclude_wait(run_id, seconds):
+        _queue_wait.set(_queue_wait.get() + seconds)
+    with _lock:
+        for stats in _targets(node, thread_id):
+            stats.llm_wait.observe(seconds)
+    _record_timing(f"llmwait.{node}", seconds)
+
+
+def record_retry(node: str, thread_id: Optional[str]) -> None:
+    record_llm_event(node, thread_id, "retries")
+
+
+def record_llm_event(node: str, thread_id: Optional[str], event: str) -> None:
+    """복원력 계층 이벤트 수 (retries | timeouts | hedges | fallbacks)"""
+    with _lock:
+        for stats in _targets(node, thread_id):
+            stats.counters[f"llm_{event}"] += 1
+
+
+def record_breaker(backend: str, state: str) -> None:
+    with _lock:
+        _breakers[backend] = state
+
+
+def record_cache(
+    node: str, thread_id: Optional[str], hit: bool, saved_seconds: float = 0.0, saved_tokens: int = 0
+) -> None:
+    with _lock:
+        for stats in _targets(node, thread_id):
+            stats.counters["cache_hits" if hit else "cache_misses"] += 1
+            stats.counters["cache_saved_tokens"] += saved_tokens
+            stats.cache_saved_seconds += saved_seconds
+
+
+@contextmanager
+def collect_timings() -> Iterator[_Timings]:
+    """with 블록 안에서 실행된 노드/LLM 시간을 모음 (timings.header()로 Server-Timing 값 생성)"""
+    timings = _Timings()
+    token = _current_timings.set(timings)
+    try:
+        yield timings
+    finally:
+        _current_timings.reset(token)
+
+
+def thread_summary(thread_id: str) -> Optional[Dict[str, Any]]:
+    with _lock:
+        stats = _threads.get(thread_id)
+        return stats.as_dict() if stats else None
+
+
+def reset_metrics() -> None:
+    with _lock:
+        _nodes.clear()
+        _threads.clear()
+
+
+# --- 노드 계측 ---
+
+def _thread_id(config: Optional[RunnableConfig]) -> Optional[str]:
+    return (config or {}).get("configurable", {}).get("thread_id")
+
+
+def _accepts_config(func: Callable) -> bool:
+    return "config" in inspect.signature(func).parameters
+
+
+def _wrap_sync(name: str, func: Callable) -> Callable:
+    pass_config = _accepts_config(func)
+
+    def node(state: Dict[str, Any], config: RunnableConfig) -> Dict[str, Any]:
+        start = time.perf_counter()
+        error = False
+        try:
+            return func(state, config) if pass_config else func(state)
+        except GraphBubbleUp:  # interrupt 등 그래프 제어 흐름은 에러가 아님
+            raise
+        except Exception:
+            error = True
+            raise
+        finally:
+            record_node(name, _thread_id(config), time.perf_counter() - start, error)
+
+    node.__name__ = func.__name__
+    return node
+
+
+def _wrap_async(name: str, afunc: Callable) -> Callable:
+    pass_config = _accepts_config(afunc)
+
+    async def node(state: Dict[str, Any], config: RunnableConfig) -> Dict[str, Any]:
+        start = time.perf_counter()
+        error = False
+        try:
+            return await (afunc(state, config) if pass_config else afunc(state))
+        except GraphBubbleUp:
+            raise
+        except Exception:
+            error = True
+            raise
+        finally:
+            record_node(name, _thread_id(config), time.perf_counter() - start, error)
+
+    node.__name__ = afunc.__name__
+    return node
+
+
+def instrument_node(name: str, func: Callable, afunc: Optional[Callable] = None):
+    """
+    노드 함수를 계측 래퍼로 감싸 그래프에 등록할 수 있는 형태로 반환
+    afunc가 있으면 invoke()는 func, ainvoke()/astream()은 afunc를 사용하는 Runnable이 된다.
+    """
+    wrapped = _wrap_sync(name, func)
+    if afunc is None:
+        return wrapped
+    return RunnableLambda(wrapped, afunc=_wrap_async(name, afunc), name=func.__name__)
+
+
+# --- LLM 계측 ---
+
+def current_caller(run_manager: Any = None) -> Tuple[str, Optional[str]]:
+    """
+    지금 LLM을 호출한 노드와 세션
+    콜백 밖(응답 캐시, 호출 스케줄러)에서 LangGraph가 실행 컨텍스트에 넣어 준 메타데이터로 알아낸다.
+    챗 모델 구현 안이면 run_manager의 메타데이터를 먼저 본다.
+    """
+    config = var_child_runnable_config.get() or {}
+    metadata = {**(config.get("metadata") or {}), **(getattr(run_manager, "metadata", None) or {})}
+    thread_id = metadata.get("thread_id") or (config.get("configurable") or {}).get("thread_id")
+    return metadata.get("langgraph_node", "unknown"), thread_id
+
+
+def _llm_seconds(start: float) -> float:
+    """호출 시작부터 지금까지에서 스케줄러 대기 시간을 뺀 LLM 시간"""
+    waited = _queue_wait.get()
+    if waited:
+        _queue_wait.set(0.0)
+    return max(0.0, time.perf_counter() - start - waited)
+
+
+class LLMMetricsHandler(BaseCallbackHandler):
+    """
+    LLM 호출 콜백
+    LangGraph가 넣어 주는 메타데이터(langgraph_node, thread_id)로 호출을 노드/세션에 귀속시킨다.
+    """
+
+    run_inline = True  # 호출한 코루틴의 컨텍스트에서 실행 (요청별 Server-Timing 수집)
+
+    def __init__(self) -> None:
+        self._runs: Dict[UUID, Tuple[str, Optional[str], float]] = {}
+
+    def on_chat_model_start(self, serialized, messages, *, run_id: UUID, metadata=None, **kwargs: Any) -> None:
+        metadata = metadata or {}
+        self._runs[run_id] = (metadata.get("langgraph_node", "unknown"), metadata.get("thread_id"), time.perf_counter())
+
+    def exclude_wait(self, run_id: UUID, seconds: float) -> bool:
+        """진행 중인 호출의 시작 시각을 기다린 시간만큼 늦춤 (그런 호출이 없으면 False)"""
+        run = self._runs.get(run_id)
+        if run is None:
+            return False
+        self._runs[run_id] = (run[0], run[1], run[2] + seconds)
+        return True
+
+    def on_llm_end(self, response: LLMResult, *, run_id: UUID, **kwargs: Any) -> None:
+        run = self._runs.pop(run_id, None)
+        if run is None:
+            return
+        node, thread_id, start = run
+        seconds = _llm_seconds(start)
+        prompt_tokens = completion_tokens = 0
+        for generations in response.generations:
+            for generation in generations:
+                usage = getattr(getattr(generation, "message", None), "usage_metadata", None) or {}
+                prompt_tokens += usage.get("input_tokens", 0)
+                completion_tokens += usage.get("output_tokens", 0)
+        record_llm(node, thread_id, seconds, prompt_tokens, completion_tokens)
+
+    def on_llm_error(self, error: BaseException, *, run_id: UUID, **kwargs: Any) -> None:
+        run = self._runs.pop(run_id, None)
+        if run is None:
+            return
+        node, thread_id, start = run
+        record_llm(node, thread_id, _llm_seconds(start), error=True)
+
+    def on_retry(self, retry_state: Any, *, run_id: UUID, parent_run_id: Optional[UUID] = None, **kwargs: Any) -> None:
+        run = self._runs.get(run_id) or self._runs.get(parent_run_id)
+        if run is not None:
+            record_retry(run[0], run[1])
+
+
+llm_metrics_handler = LLMMetricsHandler()
+
+
+# --- Prometheus 출력 ---
+
+def _histogram_lines(metric: str, node: str, hist: _Histogram) -> List[str]:
+    lines = []
+    for bound, count in zip(BUCKETS, hist.counts):
+        lines.append(f'{metric}_bucket{{node="{node}",le="{bound}"}} {count}')
+    lines.append(f'{metric}_bucket{{node="{node}",le="+Inf"}} {hist.n}')
+    lines.append(f'{metric}_sum{{node="{node}"}} {hist.total:.6f}')
+    lines.append(f'{metric}_count{{node="{node}"}} {hist.n}')
+    return lines
+
+
+def render_prometheus() -> str:
+    """Prometheus 텍스트 노출 형식 (노드 라벨별)"""
+    with _lock:
+        nodes = sorted(_nodes.items())
+        lines = [
+            "# HELP phantom_node_duration_seconds Graph node wall time.",
+            "# TYPE phantom_node_duration_seconds histogram",
+        ]
+        for node, stats in nodes:
+            lines += _histogram_lines("phantom_node_duration_seconds", node, stats.node_time)
+
+        lines += [
+            "# HELP phantom_llm_duration_seconds LLM call time inside a node.",
+            "# TYPE phantom_llm_duration_seconds histogram",
+        ]
+        for node, stats in nodes:
+            if stats.llm_time.n:
+                lines += _histogram_lines("phantom_llm_duration_seconds", node, stats.llm_time)
+
+        lines += [
+            "# HELP phantom_llm_queue_wait_seconds Time an LLM call waited in the process-wide scheduler.",
+            "# TYPE phantom_llm_queue_wait_seconds histogram",
+        ]
+        for node, stats in nodes:
+            if stats.llm_wait.n:
+                lines += _histogram_lines("phantom_llm_queue_wait_seconds", node, stats.llm_wait)
+
+        counters = [
+            ("phantom_node_errors_total", "node_errors", "Node executions that raised."),
+            ("phantom_llm_calls_total", "llm_calls", "LLM calls."),
+            ("phantom_llm_errors_total", "llm_errors", "LLM calls that failed."),
+            ("phantom_llm_retries_total", "llm_retries", "LLM call retries."),
+            ("phantom_llm_timeouts_total", "llm_timeouts", "LLM call attempts that hit their deadline."),
+            ("phantom_llm_hedges_total", "llm_hedges", "Hedged duplicate LLM requests."),
+            ("phantom_llm_fallbacks_total", "llm_fallbacks", "Degraded local responses served instead of the LLM."),
+        ]
+        for metric, key, help_text in counters:
+            lines += [f"# HELP {metric} {help_text}", f"# TYPE {metric} counter"]
+            lines += [f'{metric}{{node="{node}"}} {stats.counters[key]}' for node, stats in nodes]
+
+        lines += ["# HELP phantom_llm_tokens_total LLM tokens.", "# TYPE phantom_llm_tokens_total counter"]
+        for node, stats in nodes:
+            lines.append(f'phantom_llm_tokens_total{{node="{node}",type="prompt"}} {stats.counters["prompt_tokens"]}')
+            lines.append(f'phantom_llm_tokens_total{{node="{node}",type="completion"}} {stats.counters["completion_tokens"]}')
+
+        lines += ["# HELP phantom_llm_cost_usd_total Estimated LLM cost.", "# TYPE phantom_llm_cost_usd_total counter"]
+        lines += [f'phantom_llm_cost_usd_total{{node="{node}"}} {stats.cost:.6f}' for node, stats in nodes]
+
+        cached = [(node, stats) for node, stats in nodes if stats.counters["cache_hits"] or stats.counters["cache_misses"]]
+        lines += ["# HELP phantom_llm_cache_requests_total LLM response cache lookups.", "# TYPE phantom_llm_cache_requests_total counter"]
+        for node, stats in cached:
+            lines.append(f'phantom_llm_cache_requests_total{{node="{node}",result="hit"}} {stats.counters["cache_hits"]}')
+            lines.append(f'phantom_llm_cache_requests_total{{node="{node}",result="miss"}} {stats.counters["cache_misses"]}')
+        lines += ["# HELP phantom_llm_cache_saved_seconds_total LLM latency avoided by cache hits.", "# TYPE phantom_llm_cache_saved_seconds_total counter"]
+        lines += [f'phantom_llm_cache_saved_seconds_total{{node="{node}"}} {stats.cache_saved_seconds:.6f}' for node, stats in cached]
+        lines += ["# HELP phantom_llm_cache_saved_tokens_total LLM tokens avoided by cache hits.", "# TYPE phantom_llm_cache_saved_tokens_total counter"]
+        lines += [f'phantom_llm_cache_saved_tokens_total{{node="{node}"}} {stats.counters["cache_saved_tokens"]}' for node, stats in cached]
+
+        lines += ["# HELP phantom_llm_breaker_state LLM provider circuit breaker state.", "# TYPE phantom_llm_breaker_state gauge"]
+        for backend, current in sorted(_breakers.items()):
+            for state in ("closed", "open", "half_open"):
+                lines.append(f'phantom_llm_breaker_state{{backend="{backend}",state="{state}"}} {int(state == current)}')
+
+        lines += ["# HELP phantom_tracked_threads Sessions with per-thread metrics.", "# TYPE phantom_tracked_threads gauge"]
+        lines.append(f"phantom_tracked_threads {len(_threads)}")
+    return "\n".join(lines) + "\n"
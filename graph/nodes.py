@@ -3,17 +3,49 @@ LangGraph Nodes
 각 기능을 Node로 정의
 """
 
-from typing import Dict, Any, List
-from langchain_google_genai import ChatGoogleGenerativeAI
-from langchain_core.messages import HumanMessage, SystemMessage, AIMessage
-from langgraph.types import interrupt
-import os
+from typing import Dict, Any, List, Optional
+from langchain_core.messages import BaseMessage, HumanMessage, SystemMessage, AIMessage, RemoveMessage
+from langchain_core.runnables import RunnableConfig
+from langgraph.types import Overwrite, Send, interrupt
+from pydantic import BaseModel, Field
 from dotenv import load_dotenv
+from graph.archive import get_archive
+from graph.auto_advance import consume_stop
+from graph.clue_bank import get_clue_bank, used_clues
+from graph.context import build_context
+from graph.llm import get_llm, get_structured_llm
+from graph.metrics import current_caller, record_node_error
+from graph.persona import speaker_system_prompt
+from graph.memory import (
+    FOLD_CONFIG,
+    LONG_TERM_MEMORY_TOKENS,
+    ROUND_SUMMARY_TOKENS,
+    compress_messages,
+    extractive_summary,
+    fit_tokens,
+    memory_text,
+    pending_messages,
+    rounds_to_compress,
+    should_fold,
+    summary_messages,
+)
+from graph.scheduler import schedule_speaker
+from graph.prefetch import cancel_prefetch, ensure_prefetch, prefetched_victim, take_prefetched
+from graph.resilience import fallback_reply
+import asyncio
+import logging
 import random
 import json
 
 load_dotenv()
 
+logger = logging.getLogger(__name__)
+
+
+def _thread_id(config: Optional[RunnableConfig]) -> Optional[str]:
+    """실행 중인 게임 세션(thread_id)"""
+    return (config or {}).get("configurable", {}).get("thread_id")
+
 
 def setup_game_node(state: Dict[str, Any]) -> Dict[str, Any]:
     """
@@ -45,6 +77,8 @@ def setup_game_node(state: Dict[str, Any]) -> Dict[str, Any]:
         "phase": "discussion",
         "day_night": "day",
         "turn_count": 0,
+        "auto_turns": 0,
+        "message_offset": 0,
         "messages": [SystemMessage(content="👻 팬텀 로그 시작! 참가자 5명 중 1명이 인간으로 둔갑한 유령 '팬텀'입니다. 밤마다 팬텀은 한 명씩 제거합니다. 팬텀을 찾아내지 못하면 모두가 위험합니다. 지금부터 서로를 관찰하고, 대화하며, 의심스러운 행동을 찾아내세요.")],
         "votes": {},
         "current_speaker": characters[0]["name"],
@@ -54,63 +88,51 @@ def setup_game_node(state: Dict[str, Any]) -> Dict[str, Any]:
         "accused": None,
         "game_result": None,
         "alive_status": alive_status,
-        "suspicion_counts": suspicion_counts,
+        # 리듀서가 있는 필드는 같은 thread에서 새 게임을 시작해도 이전 값과 합쳐지지 않도록 덮어쓴다
+        "suspicion_counts": Overwrite(suspicion_counts),
+        "suspicion_votes": Overwrite([]),
         "night_logs": [],
-        "clues": [],
+        "night_victim": None,
+        "clues": Overwrite([]),
         "round_summary": "",
-        "round_summaries": {},
+        "round_summaries": Overwrite({}),
+        "rolling_summary": "",
+        "summary_cursor": 0,
+        "long_term_memory": "",
+        "memory_round": 0,
         "death_log": []
     }
 
 
-def night_phase_node(state: Dict[str, Any]) -> Dict[str, Any]:
-    """
-    밤 페이즈 처리 노드
-    - 라운드 증가
-    - 희생자 선정 (팬텀 제외, 생존자 중 랜덤)
-    - 생존 상태 업데이트
-    - 밤 행동 로그 생성
-    """
+def _pick_victim(state: Dict[str, Any]) -> Optional[str]:
+    """팬텀을 제외한 생존자 중 희생자를 무작위로 선정 (없으면 None)"""
     characters = state.get("characters", [])
     phantom_name = state.get("phantom_name")
     alive_status = state.get("alive_status", {})
-    round_number = state.get("round_number", 1)
-    
+
     # 생존자 목록 (팬텀 제외)
     targets = [
         char for char in characters 
         if char["name"] != phantom_name and alive_status.get(char["name"], True)
     ]
-    
-    night_log_entry = ""
-    victim_name = None
-    
-    if targets:
-        # 희생자 선정
-        victim = random.choice(targets)
-        victim_name = victim["name"]
-        
-        # 사망 처리
-        alive_status[victim_name] = False
-        
-        # 로그 생성
-        night_log_entry = f"Round {round_number} Night: {victim_name}이(가) 습격당해 사망했습니다."
-        
-        # 시스템 메시지 추가
-        message = f"🌙 밤이 지났습니다.\n안타깝게도 {victim_name}이(가) 살해당한 채 발견되었습니다."
-        
-        # --- 단서 생성 로직 (LLM) ---
-        try:
-            # 팬텀 정보 가져오기
-            phantom_char = next((c for c in characters if c["name"] == phantom_name), None)
-            
-            if phantom_char:
-                llm = ChatGoogleGenerativeAI(
-                    model="gemini-2.5-flash",
-                    google_api_key=os.getenv("GOOGLE_API_KEY")
-                )
-                
-                clue_prompt = f"""
+
+    if not targets:
+        return None
+    return random.choice(targets)["name"]
+
+
+def _clue_messages(state: Dict[str, Any], victim_name: str) -> Optional[List[BaseMessage]]:
+    """팬텀의 특징을 암시하는 단서 생성 프롬프트 (팬텀 정보가 없으면 None)"""
+    characters = state.get("characters", [])
+    phantom_name = state.get("phantom_name")
+
+    # 팬텀 정보 가져오기
+    phantom_char = next((c for c in characters if c["name"] == phantom_name), None)
+
+    if not phantom_char:
+        return None
+
+    clue_prompt = f"""
 당신은 추리 소설의 작가입니다.
 '팬텀 로그'라는 게임에서 밤사이 살인 사건이 발생했습니다.
 팬텀(범인)의 특징을 암시하는 '현장 증거(단서)'를 하나 생성해주세요.
@@ -135,134 +157,132 @@ def night_phase_node(state: Dict[str, Any]) -> Dict[str, Any]:
 - (화가가 범인일 때): "피해자의 옷깃에서 희미하게 테레빈유 냄새가 난다."
 - (학생이 범인일 때): "현장에 찢어진 전공 서적의 한 페이지가 떨어져 있다."
 """
-                response = llm.invoke([HumanMessage(content=clue_prompt)])
-                clue_text = response.content.strip()
-                
-                # 단서 저장
-                clues = state.get("clues", [])
-                clues.append(f"[Day {round_number+1} 아침 발견] {clue_text}")
-                state["clues"] = clues
-                
-        except Exception as e:
-            print(f"Clue Generation Error: {e}")
+    return [HumanMessage(content=clue_prompt)]
 
-    else:
-        message = "🌙 밤이 지났습니다. 아무 일도 일어나지 않았습니다."
 
-    return {
-        "round_number": round_number + 1,
-        "phase": "discussion", # 다시 낮 토론으로
-        "day_night": "day",
-        "alive_status": alive_status,
-        "night_logs": [night_log_entry] if night_log_entry else [],
-        "clues": state.get("clues", []),
-        "messages": [SystemMessage(content=message)],
-        "turn_count": 0
-    }
+def _bank_clue(state: Dict[str, Any], victim_name: str) -> Optional[str]:
+    """미리 생성해 둔 단서 뱅크에서 이번 게임에 아직 안 쓴 단서를 꺼냄 (없으면 None)"""
+    bank = get_clue_bank()
+    if bank is None:
+        return None
+    return bank.draw(state.get("phantom_name"), victim_name, state.get("round_number", 1), used_clues(state))
 
 
-def character_speak_node(state: Dict[str, Any]) -> Dict[str, Any]:
+def _clue_entry(state: Dict[str, Any], clue_text: str) -> str:
+    """다음 날 아침에 공개되는 단서 표기"""
+    return f"[Day {state.get('round_number', 1) + 1} 아침 발견] {clue_text}"
+
+
+def _night_start_update(state: Dict[str, Any], victim_name: Optional[str]) -> Dict[str, Any]:
+    """희생자와 밤 행동 로그 (사망 처리는 night_end에서)"""
+    night_logs = []
+    if victim_name:
+        night_logs.append(f"Round {state.get('round_number', 1)} Night: {victim_name}이(가) 습격당해 사망했습니다.")
+    return {"day_night": "night", "night_victim": victim_name, "night_logs": night_logs}
+
+
+def night_start_node(state: Dict[str, Any]) -> Dict[str, Any]:
     """
-    캐릭터가 말하는 노드
-    current_speaker에 해당하는 캐릭터가 발언
+    밤 페이즈 시작 노드
+    - 희생자 선정 (팬텀 제외, 생존자 중 랜덤)
+    - 밤 행동 로그 생성
+    이후 AI 의심, 단서 생성, 라운드 요약이 병렬로 실행되고 night_end에서 합쳐진다.
+    """
+    return _night_start_update(state, _pick_victim(state))
+
+
+async def anight_start_node(state: Dict[str, Any], config: Optional[RunnableConfig] = None) -> Dict[str, Any]:
+    """night_start_node의 비동기 그래프용 버전 (낮 동안 미리 정해 둔 희생자가 있으면 사용)"""
+    victim_name = prefetched_victim(_thread_id(config), state) or _pick_victim(state)
+    return _night_start_update(state, victim_name)
+
+
+def _clue_failed(clue_messages: List[BaseMessage], error: Exception) -> Optional[str]:
+    """단서 생성 실패: 로그와 노드 에러 지표에 남기고 복원력 계층의 대체 단서를 씀"""
+    _, thread_id = current_caller()
+    logger.warning("Clue generation failed (thread=%s): %s", thread_id, error, exc_info=error)
+    record_node_error("night_clue", thread_id)
+    return fallback_reply("night_clue", thread_id, clue_messages)
+
+
+def night_clue_node(state: Dict[str, Any]) -> Dict[str, Any]:
     """
+    단서 생성 노드 (밤 병렬 분기)
+    단서 뱅크를 우선 사용하고, 없으면 LLM으로 생성한다.
+    """
+    victim_name = state.get("night_victim")
+    if not victim_name:
+        return {}
+
+    clue_text = _bank_clue(state, victim_name)
+    if clue_text is None:
+        # --- 단서 생성 로직 (LLM, 단서 뱅크에 없을 때만) ---
+        clue_messages = _clue_messages(state, victim_name)
+        if clue_messages:
+            try:
+                response = get_llm().invoke(clue_messages)
+                clue_text = response.content.strip()
+            except Exception as e:
+                clue_text = _clue_failed(clue_messages, e)
+
+    return {"clues": [_clue_entry(state, clue_text)]} if clue_text else {}
+
+
+async def anight_clue_node(state: Dict[str, Any], config: Optional[RunnableConfig] = None) -> Dict[str, Any]:
+    """night_clue_node의 비동기 버전 (낮 동안 미리 생성한 단서가 있으면 사용)"""
+    victim_name = state.get("night_victim")
+    if not victim_name:
+        return {}
+
+    prefetched = await take_prefetched(_thread_id(config), state)
+    if prefetched and prefetched[0] == victim_name:
+        clue_text = prefetched[1]
+    else:
+        clue_text = _bank_clue(state, victim_name)
+
+    if clue_text is None:
+        clue_messages = _clue_messages(state, victim_name)
+        if clue_messages:
+            try:
+                response = await get_llm().ainvoke(clue_messages)
+                clue_text = response.content.strip()
+            except Exception as e:
+                clue_text = _clue_failed(clue_messages, e)
+
+    return {"clues": [_clue_entry(state, clue_text)]} if clue_text else {}
+
+
+def _find_speaker(state: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+    """current_speaker에 해당하는 캐릭터 정보 (없으면 None)"""
     speaker_name = state.get("current_speaker")
 
     if not speaker_name:
-        return state
+        return None
 
     # 해당 캐릭터 찾기
-    character = None
     for char in state["characters"]:
         if char["name"] == speaker_name:
-            character = char
-            break
-
-    if not character:
-        return state
+            return char
 
-    # LLM 초기화
-    llm = ChatGoogleGenerativeAI(
-        model="gemini-2.5-flash",
-        google_api_key=os.getenv("GOOGLE_API_KEY")
-    )
-
-    # 시스템 프롬프트 구성
-    system_prompt = character["prompt"]
-
-    # 의심 수치 반영
-    suspicion_counts = state.get("suspicion_counts", {})
-    my_suspicion = suspicion_counts.get(speaker_name, 0)
-    
-    # 라운드 요약 반영 (기억)
-    round_summaries = state.get("round_summaries", {})
-    if round_summaries:
-        summary_text = "\n".join([f"[Round {r} 요약]: {s}" for r, s in round_summaries.items()])
-        system_prompt += f"\n\n[지난 라운드 기억]\n{summary_text}\n"
-    
-    system_prompt += f"\n\n[상태 정보]\n현재 당신의 의심 수치: {my_suspicion}\n"
-    
-    # 의심 수치별 감정선 단계화
-    if 1 <= my_suspicion <= 2:
-        system_prompt += """
-[심리 상태: 약간의 신경 쓰임]
-누군가 나를 의심하고 있다는 것을 인지했습니다.
-- 평소보다 조금 더 신중하게 말하세요.
-- "저를 의심하시는 건가요?" 정도로 가볍게 반응하거나, 상황을 살피세요.
-"""
-    elif 3 <= my_suspicion <= 4:
-        system_prompt += """
-[심리 상태: 불쾌함 및 방어적]
-의심이 커지고 있어 기분이 나쁘고 긴장됩니다.
-- 다소 날카롭거나 방어적인 태도를 보이세요.
-- "왜 자꾸 저를 몰아가시죠?", "근거 없는 의심은 하지 마세요."라며 불쾌해하세요.
-"""
-    elif my_suspicion >= 5:
-        system_prompt += """
-[심리 상태: 극도의 불안 및 패닉]
-사람들이 나를 팬텀으로 확신하는 것 같아 매우 불안합니다.
-- 목소리가 떨리거나, 감정적으로 격해지세요.
-- 억울함을 호소하거나, 강하게 화를 내며 상황을 모면하려 하세요.
-"""
+    return None
 
-    # 범인이라면 특별 지시 추가
-    if character["name"] == state["phantom_name"]:
-        system_prompt += """
 
-=== 중요: 당신의 역할 ===
-🔴 당신은 이번 게임의 **팬텀(살인마)**입니다.
+def _speak_messages(state: Dict[str, Any], character: Dict[str, Any]) -> List[BaseMessage]:
+    """캐릭터 발언 생성용 대화 맥락 (시스템 프롬프트 + 최근 대화 + 지시)"""
+    speaker_name = character["name"]
 
-팬텀으로서의 임무:
-1. 다른 사람들에게 들키지 않기
-2. 평소 성격대로 행동하되, 의심받지 않도록 조심
-3. 필요하면 거짓 알리바이를 만들어내기
-4. 자연스럽게 다른 사람을 의심하기
-========================
-"""
-        # 팬텀 전용 반응 (의심 수치 3 이상부터)
-        if my_suspicion >= 3:
-            system_prompt += """
-🚨 [위기 상황] 의심 수치가 위험 수준입니다! (3 이상)
-당신은 정체가 들킬까 봐 매우 당황하고 있습니다.
-- 말이 빨라지거나, 횡설수설하거나, 앞뒤가 안 맞는 말을 하세요.
-- "아니, 그게 아니라...", "잠깐만요, 제 말 좀 들어보세요!" 같은 표현을 쓰며 필사적으로 변명하세요.
-- 말실수를 하거나 과도하게 화를 내는 것도 좋습니다.
-"""
-    else:
-        # 시민인데 의심받는 경우 (5 이상일 때 더 강력한 반응)
-        if my_suspicion >= 5:
-            system_prompt += """
-🚨 [위기 상황] 억울하게 팬텀으로 몰리고 있습니다! (의심 수치 5 이상)
-당신은 결백한데 아무도 믿어주지 않아 답답해 미칠 지경입니다.
-- "진짜 아니라니까요!!", "증거를 대보세요!"라며 소리치거나 강하게 호소하세요.
-"""
+    # 시스템 프롬프트 구성 (페르소나 → 팬텀 역할 → 의심 수치별 심리 상태 → 라운드 기억 → 상태 정보)
+    # 앞쪽 고정 부분은 (캐릭터, 의심 단계, 팬텀 여부)별로 메모이즈된 것을 재사용 (graph/persona.py)
+    my_suspicion = state.get("suspicion_counts", {}).get(speaker_name, 0)
+    system_prompt = speaker_system_prompt(
+        character, my_suspicion, speaker_name == state["phantom_name"], memory_text(state)
+    )
 
     # 대화 맥락 구성
     conversation = [SystemMessage(content=system_prompt)]
 
-    # 최근 대화 기록 추가 (마지막 5개)
-    recent_messages = state.get("messages", [])[-5:]
-    conversation.extend(recent_messages)
+    # 대화 기록 추가 (토큰 예산 안에서 나에게 한 말, 나에 대한 말, 최근 대화, 단서 순으로 선택)
+    conversation.extend(build_context(state, "character_speak", speaker=speaker_name, clues=True))
 
     # 프롬프트: 짧고 간결하게 발언하기
     prompt = """지금까지의 대화 흐름을 보고, 당신의 성격에 맞게 자연스럽게 한마디 하세요.
@@ -274,13 +294,14 @@ def character_speak_node(state: Dict[str, Any]) -> Dict[str, Any]:
 - 불필요한 설명은 생략하세요
 """
     conversation.append(HumanMessage(content=prompt))
+    return conversation
 
-    # AI 응답 생성
-    response = llm.invoke(conversation)
 
+def _speak_update(state: Dict[str, Any], character: Dict[str, Any], content: str) -> Dict[str, Any]:
+    """생성된 발언을 메시지로 추가하고 턴 카운트 증가"""
     # 메시지 추가
     new_message = AIMessage(
-        content=response.content,
+        content=content,
         name=character["name"]
     )
 
@@ -293,31 +314,74 @@ def character_speak_node(state: Dict[str, Any]) -> Dict[str, Any]:
     }
 
 
-def select_next_speaker_node(state: Dict[str, Any]) -> Dict[str, Any]:
+def _fold_update(state: Dict[str, Any], summary_text: str) -> Dict[str, Any]:
+    """롤링 요약 갱신 (지금 상태의 메시지까지 합쳐진 것으로 표시)"""
+    return {
+        "rolling_summary": fit_tokens(summary_text, ROUND_SUMMARY_TOKENS),
+        "summary_cursor": state.get("message_offset", 0) + len(state.get("messages", [])),
+    }
+
+
+async def _afold_summary(state: Dict[str, Any]) -> Dict[str, Any]:
+    """합치지 않은 메시지가 한 창만큼 쌓였으면 롤링 요약 갱신 (실패하면 다음 턴이나 밤에 다시 합침)"""
+    if not should_fold(state):
+        return {}
+    try:
+        response = await get_llm().ainvoke(summary_messages(state, night=False), config=FOLD_CONFIG)
+    except Exception as e:
+        print(f"Summary Fold Error: {e}")
+        return {}
+    return _fold_update(state, response.content)
+
+
+def character_speak_node(state: Dict[str, Any]) -> Dict[str, Any]:
     """
-    다음 발언자를 결정하는 노드 (LLM 기반)
-    대화 맥락을 분석하여 가장 적절한 캐릭터를 선정함
+    캐릭터가 말하는 노드
+    current_speaker에 해당하는 캐릭터가 발언
     """
-    messages = state.get("messages", [])
+    character = _find_speaker(state)
+
+    if not character:
+        return {}
+
+    # AI 응답 생성
+    response = get_llm().invoke(_speak_messages(state, character))
+
+    return _speak_update(state, character, response.content)
+
+
+async def acharacter_speak_node(state: Dict[str, Any], config: Optional[RunnableConfig] = None) -> Dict[str, Any]:
+    """
+    character_speak_node의 비동기 버전
+    토론 중에 오늘 밤 단서를 미리 생성해 두고, 새 메시지가 쌓였으면 발언과 동시에 롤링 요약을 갱신한다.
+    """
+    ensure_prefetch(_thread_id(config), state)
+    character = _find_speaker(state)
+
+    if not character:
+        return {}
+
+    response, fold = await asyncio.gather(
+        get_llm().ainvoke(_speak_messages(state, character)), _afold_summary(state)
+    )
+
+    return {**_speak_update(state, character, response.content), **fold}
+
+
+def _alive_names(state: Dict[str, Any]) -> List[str]:
+    """생존한 캐릭터 이름 목록"""
     characters = state.get("characters", [])
     alive_status = state.get("alive_status", {})
+    return [char["name"] for char in characters if alive_status.get(char["name"], True)]
+
+
+def _next_speaker_messages(state: Dict[str, Any], alive_names: List[str]) -> List[BaseMessage]:
+    """다음 화자 선정 프롬프트"""
     current_speaker = state.get("current_speaker")
     suspicion_counts = state.get("suspicion_counts", {})
     
-    # 생존한 캐릭터 이름 목록
-    alive_names = [char["name"] for char in characters if alive_status.get(char["name"], True)]
-    
-    if not alive_names:
-        return {}
-        
-    # LLM 초기화
-    llm = ChatGoogleGenerativeAI(
-        model="gemini-2.5-flash",
-        google_api_key=os.getenv("GOOGLE_API_KEY")
-    )
-    
-    # 최근 대화 (마지막 5개)
-    recent_messages = messages[-5:]
+    # 최근 대화 (토큰 예산 내)
+    recent_messages = build_context(state, "select_next_speaker")
     
     # 프롬프트 구성
     prompt = f"""
@@ -346,10 +410,12 @@ def select_next_speaker_node(state: Dict[str, Any]) -> Dict[str, Any]:
 **출력 형식:**
 캐릭터 이름만 딱 하나 출력하세요. (예: "김철수")
 """
+    return [HumanMessage(content=prompt)]
 
-    # LLM 호출
-    response = llm.invoke([HumanMessage(content=prompt)])
-    next_speaker = response.content.strip()
+
+def _next_speaker_update(state: Dict[str, Any], alive_names: List[str], content: str) -> Dict[str, Any]:
+    """LLM 응답에서 화자 이름을 골라내고, 실패하면 로컬 스케줄러로 선정"""
+    next_speaker = content.strip()
     
     # 유효성 검사 (생존자 목록에 있는지)
     found = False
@@ -360,15 +426,158 @@ def select_next_speaker_node(state: Dict[str, Any]) -> Dict[str, Any]:
             break
             
     if not found:
-        # 실패 시 랜덤 선정 (직전 발언자 제외 노력)
-        candidates = [n for n in alive_names if n != current_speaker]
-        if not candidates:
-            candidates = alive_names
-        next_speaker = random.choice(candidates)
+        # 실패 시 로컬 스케줄러로 선정
+        next_speaker = schedule_speaker(state, alive_names)
         
     return {"current_speaker": next_speaker}
 
 
+def select_next_speaker_node(state: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    다음 발언자를 결정하는 노드 (LLM 기반)
+    대화 맥락을 분석하여 가장 적절한 캐릭터를 선정함
+    """
+    alive_names = _alive_names(state)
+    
+    if not alive_names:
+        return {}
+
+    # LLM 호출
+    response = get_llm().invoke(_next_speaker_messages(state, alive_names))
+
+    return _next_speaker_update(state, alive_names, response.content)
+
+
+async def aselect_next_speaker_node(state: Dict[str, Any]) -> Dict[str, Any]:
+    """select_next_speaker_node의 비동기 버전"""
+    alive_names = _alive_names(state)
+
+    if not alive_names:
+        return {}
+
+    response = await get_llm().ainvoke(_next_speaker_messages(state, alive_names))
+
+    return _next_speaker_update(state, alive_names, response.content)
+
+
+def heuristic_select_speaker_node(state: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    다음 발언자를 결정하는 노드 (로컬 스케줄러, graph/scheduler.py)
+    select_next_speaker_node 대신 사용하면 토론 턴마다 LLM 호출이 하나 줄어든다.
+    """
+    alive_names = _alive_names(state)
+
+    if not alive_names:
+        return {}
+
+    return {"current_speaker": schedule_speaker(state, alive_names)}
+
+
+def _fused_turn_messages(state: Dict[str, Any], alive_names: List[str]) -> List[BaseMessage]:
+    """화자 선정과 발언 생성을 한 번에 요청하는 프롬프트"""
+    characters = state.get("characters", [])
+    current_speaker = state.get("current_speaker")
+    suspicion_counts = state.get("suspicion_counts", {})
+    phantom_name = state.get("phantom_name")
+
+    prompt = """당신은 '팬텀 로그' 게임의 진행자입니다. 등장인물들의 자유 토론을 이어가세요.
+다음에 말할 캐릭터 한 명을 고르고, 그 캐릭터의 성격과 말투로 한마디를 작성하세요.
+
+[등장인물]
+"""
+    for char in characters:
+        if char["name"] not in alive_names:
+            continue
+        role = " (비밀: 팬텀. 들키지 않게 거짓 알리바이를 대거나 자연스럽게 다른 사람을 의심함)" if char["name"] == phantom_name else ""
+        prompt += f"- {char['name']}: {char['job']}, {char['personality']}, 의심 수치 {suspicion_counts.get(char['name'], 0)}{role}\n"
+
+    summary_text = memory_text(state)
+    if summary_text:
+        prompt += f"\n[지난 라운드 기억]\n{summary_text}\n"
+
+    prompt += f"\n직전 발언자: {current_speaker}\n\n최근 대화:\n"
+    for msg in build_context(state, "fused_turn", clues=True):
+        sender = msg.name if hasattr(msg, 'name') else "System"
+        prompt += f"- {sender}: {msg.content}\n"
+
+    prompt += """
+**선정 기준:**
+1. 직전 발언이 특정인에게 질문했다면, 그 사람이 대답해야 합니다.
+2. 최근에 말을 적게 한 캐릭터를 우선하고, 직전 발언자는 가급적 제외하세요.
+
+**발언 규칙:**
+- 반드시 100자 이내로 짧게, 일상 대화처럼 자연스럽게
+- 의심 수치가 높을수록 방어적이거나 불안한 감정을 드러내세요
+- 팬텀의 정체를 절대 드러내지 마세요
+
+**출력 형식 (JSON):**
+{"speaker": "캐릭터 이름", "content": "발언 내용"}
+"""
+    return [HumanMessage(content=prompt)]
+
+
+def _fused_turn_update(state: Dict[str, Any], alive_names: List[str], content: str) -> Dict[str, Any]:
+    """화자 + 발언 JSON을 파싱해 select_next_speaker → character_speak와 같은 상태 업데이트 생성"""
+    speaker, line = None, content.strip()
+
+    try:
+        text = line
+        if "```json" in text:
+            text = text.split("```json")[1].split("```")[0]
+        elif "```" in text:
+            text = text.split("```")[1].split("```")[0]
+        result = json.loads(text)
+        speaker = result.get("speaker")
+        line = str(result.get("content", "")).strip()
+    except Exception as e:
+        print(f"Fused Turn Parse Error: {e}")
+
+    # 이름이 틀렸거나 파싱에 실패하면 로컬 스케줄러로 화자만 정함
+    if speaker not in alive_names:
+        speaker = next((name for name in alive_names if speaker and name in speaker), None)
+        if speaker is None:
+            speaker = schedule_speaker(state, alive_names)
+
+    return {
+        "current_speaker": speaker,
+        "messages": [AIMessage(content=line, name=speaker)],
+        "turn_count": state.get("turn_count", 0) + 1
+    }
+
+
+def fused_turn_node(state: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    자유 토론 한 턴을 LLM 한 번으로 처리하는 노드
+    다음 화자 선정과 발언 생성을 하나의 구조화된 응답으로 받는다.
+    """
+    alive_names = _alive_names(state)
+
+    if not alive_names:
+        return {}
+
+    response = get_llm().invoke(_fused_turn_messages(state, alive_names))
+
+    return _fused_turn_update(state, alive_names, response.content)
+
+
+async def afused_turn_node(state: Dict[str, Any], config: Optional[RunnableConfig] = None) -> Dict[str, Any]:
+    """
+    fused_turn_node의 비동기 버전
+    토론 중에 오늘 밤 단서를 미리 생성해 두고, 새 메시지가 쌓였으면 발언과 동시에 롤링 요약을 갱신한다.
+    """
+    ensure_prefetch(_thread_id(config), state)
+    alive_names = _alive_names(state)
+
+    if not alive_names:
+        return {}
+
+    response, fold = await asyncio.gather(
+        get_llm().ainvoke(_fused_turn_messages(state, alive_names)), _afold_summary(state)
+    )
+
+    return {**_fused_turn_update(state, alive_names, response.content), **fold}
+
+
 def user_input_node(state: Dict[str, Any]) -> Dict[str, Any]:
     """
     유저 입력 처리 노드
@@ -377,7 +586,7 @@ def user_input_node(state: Dict[str, Any]) -> Dict[str, Any]:
     user_input = state.get("user_input", "")
 
     if not user_input:
-        return state
+        return {}
 
     # 종료 명령어 처리 (1:1 모드에서 복귀)
     if user_input.lower() in ["q", "exit", "quit"]:
@@ -429,7 +638,7 @@ def user_input_node(state: Dict[str, Any]) -> Dict[str, Any]:
     return updates
 
 
-def vote_node(state: Dict[str, Any]) -> Dict[str, Any]:
+def vote_node(state: Dict[str, Any], config: Optional[RunnableConfig] = None) -> Dict[str, Any]:
     """
     투표 처리 노드
     """
@@ -437,7 +646,10 @@ def vote_node(state: Dict[str, Any]) -> Dict[str, Any]:
     phantom_name = state.get("phantom_name")
 
     if not user_target:
-        return state
+        return {}
+
+    # 게임이 끝나므로 다음 밤을 위해 준비하던 단서 생성은 취소
+    cancel_prefetch(_thread_id(config))
 
     # 결과 판정
     if user_target == phantom_name:
@@ -455,13 +667,21 @@ def vote_node(state: Dict[str, Any]) -> Dict[str, Any]:
     }
 
 
-def next_turn_node(state: Dict[str, Any]) -> Dict[str, Any]:
+def next_turn_node(state: Dict[str, Any], config: Optional[RunnableConfig] = None) -> Dict[str, Any]:
     """
     다음 턴으로 진행
     (사실상 discussion 모드에서는 select_next_speaker가 역할을 대신하지만,
      기존 로직 호환성을 위해 유지)
+    자동 진행 중이면 남은 턴 수를 줄이고, 유저가 끼어들었으면 자동 진행을 멈춘다.
     """
-    return {}
+    auto_turns = state.get("auto_turns", 0)
+    if not auto_turns:
+        return {}
+
+    if consume_stop(_thread_id(config)):
+        return {"auto_turns": 0}
+
+    return {"auto_turns": auto_turns - 1}
 
 
 def wait_for_user_node(state: Dict[str, Any]) -> Dict[str, Any]:
@@ -472,9 +692,10 @@ def wait_for_user_node(state: Dict[str, Any]) -> Dict[str, Any]:
     resume_data = interrupt("wait_user")
     
     if resume_data is not None:
-        return resume_data
+        # 자동 진행은 명시적으로 요청한 경우에만 (이전 자동 진행의 남은 턴은 버림)
+        return {"auto_turns": 0, **resume_data}
         
-    return state
+    return {}
 
 
 def suspicion_node(state: Dict[str, Any]) -> Dict[str, Any]:
@@ -484,43 +705,26 @@ def suspicion_node(state: Dict[str, Any]) -> Dict[str, Any]:
     target_name = state.get("user_target")
     suspicion_counts = state.get("suspicion_counts", {})
     
+    # suspicion_counts 리듀서가 증가분을 더하므로 +1만 반환
+    increments = {}
     if target_name and target_name in suspicion_counts:
-        suspicion_counts[target_name] += 1
-        message = f"👁️ 유저가 {target_name}을(를) 의심합니다. (의심 수치: {suspicion_counts[target_name]})"
+        increments[target_name] = 1
+        message = f"👁️ 유저가 {target_name}을(를) 의심합니다. (의심 수치: {suspicion_counts[target_name] + 1})"
     else:
         message = "⚠️ 의심 대상을 찾을 수 없습니다."
         
     return {
-        "suspicion_counts": suspicion_counts,
+        "suspicion_counts": increments,
         "messages": [SystemMessage(content=message)],
         "user_target": None, # 타겟 초기화
         "user_input": None   # 입력 초기화
     }
 
 
-def ai_suspicion_node(state: Dict[str, Any]) -> Dict[str, Any]:
-    """
-    라운드 종료 시 AI들이 서로를 의심하는 노드
-    """
-    messages = state.get("messages", [])
-    characters = state.get("characters", [])
-    alive_status = state.get("alive_status", {})
-    suspicion_counts = state.get("suspicion_counts", {})
-    
-    # 생존자 목록
-    alive_names = [char["name"] for char in characters if alive_status.get(char["name"], True)]
-    
-    if len(alive_names) < 2:
-        return {}
-
-    # LLM 초기화
-    llm = ChatGoogleGenerativeAI(
-        model="gemini-2.5-flash",
-        google_api_key=os.getenv("GOOGLE_API_KEY")
-    )
-    
-    # 최근 대화 분석 (최대 20개)
-    recent_messages = messages[-20:]
+def _ai_suspicion_messages(state: Dict[str, Any], alive_names: List[str]) -> List[BaseMessage]:
+    """AI 상호 의심 분석 프롬프트"""
+    # 최근 대화 분석 (토큰 예산 내)
+    recent_messages = build_context(state, "ai_suspicion", clues=True)
     
     prompt = f"""
 현재 생존자: {', '.join(alive_names)}
@@ -545,12 +749,17 @@ def ai_suspicion_node(state: Dict[str, Any]) -> Dict[str, Any]:
     for msg in recent_messages:
         sender = msg.name if hasattr(msg, 'name') else "System"
         prompt += f"- {sender}: {msg.content}\n"
-        
-    response = llm.invoke([HumanMessage(content=prompt)])
-    
+
+    return [HumanMessage(content=prompt)]
+
+
+def _ai_suspicion_update(state: Dict[str, Any], alive_names: List[str], content: str) -> Dict[str, Any]:
+    """LLM이 반환한 JSON을 파싱해 의심 수치 증가분으로 반환"""
+    increments: Dict[str, int] = {}
+
     try:
         # JSON 파싱 시도
-        content = response.content.strip()
+        content = content.strip()
         if "```json" in content:
             content = content.split("```json")[1].split("```")[0]
         elif "```" in content:
@@ -564,13 +773,13 @@ def ai_suspicion_node(state: Dict[str, Any]) -> Dict[str, Any]:
             target = item.get("target")
             
             if suspect in alive_names and target in alive_names and suspect != target:
-                suspicion_counts[target] += 1
+                increments[target] = increments.get(target, 0) + 1
                 suspicion_updates.append(f"{suspect} -> {target} 의심 (+1)")
                 
         if suspicion_updates:
             summary = "🕵️ [AI 의심 현황]\n" + "\n".join(suspicion_updates)
             return {
-                "suspicion_counts": suspicion_counts,
+                "suspicion_counts": increments,
                 "messages": [SystemMessage(content=summary)]
             }
             
@@ -580,68 +789,306 @@ def ai_suspicion_node(state: Dict[str, Any]) -> Dict[str, Any]:
     return {}
 
 
-def summarize_round_node(state: Dict[str, Any]) -> Dict[str, Any]:
+def ai_suspicion_node(state: Dict[str, Any]) -> Dict[str, Any]:
     """
-    라운드 요약 및 메모리 관리 노드
-    - 현재 라운드의 주요 사건 요약
-    - 요약본 저장
-    - 메시지 히스토리 초기화 (토큰 관리)
+    라운드 종료 시 AI들이 서로를 의심하는 노드
     """
-    messages = state.get("messages", [])
-    round_number = state.get("round_number", 1)
-    round_summaries = state.get("round_summaries", {})
-    night_logs = state.get("night_logs", [])
-    suspicion_counts = state.get("suspicion_counts", {})
-    
-    # LLM 초기화
-    llm = ChatGoogleGenerativeAI(
-        model="gemini-2.5-flash",
-        google_api_key=os.getenv("GOOGLE_API_KEY")
-    )
+    # 생존자 목록
+    alive_names = _alive_names(state)
     
-    # 요약 프롬프트 구성
+    if len(alive_names) < 2:
+        return {}
+
+    try:
+        response = get_llm().invoke(_ai_suspicion_messages(state, alive_names))
+    except Exception as e:
+        print(f"AI Suspicion Error: {e}")
+        return {}
+
+    return _ai_suspicion_update(state, alive_names, response.content)
+
+
+async def aai_suspicion_node(state: Dict[str, Any]) -> Dict[str, Any]:
+    """ai_suspicion_node의 비동기 버전"""
+    alive_names = _alive_names(state)
+
+    if len(alive_names) < 2:
+        return {}
+
+    try:
+        response = await get_llm().ainvoke(_ai_suspicion_messages(state, alive_names))
+    except Exception as e:
+        print(f"AI Suspicion Error: {e}")
+        return {}
+
+    return _ai_suspicion_update(state, alive_names, response.content)
+
+
+class SuspicionVote(BaseModel):
+    """캐릭터 한 명의 의심 지목 결과 (구조화 출력)"""
+    target: Optional[str] = Field(None, description="가장 의심스러운 생존자 이름, 없으면 null")
+    reason: str = Field("", description="의심하는 이유 한 문장")
+
+
+def suspicion_fan_out(state: Dict[str, Any]) -> List[Send]:
+    """
+    생존자마다 의심 평가를 병렬로 보내는 Send 목록
+    (생존자가 2명 미만이면 빈 목록)
+    """
+    alive_names = _alive_names(state)
+
+    if len(alive_names) < 2:
+        return []
+
+    payload = {
+        "alive_names": alive_names,
+        "characters": state.get("characters", []),
+        "phantom_name": state.get("phantom_name"),
+    }
+    # 캐릭터마다 자신에게 한 말 / 자신에 대한 말을 우선해 대화를 고른다
+    return [
+        Send("ai_suspect", {
+            **payload,
+            "suspect": name,
+            "messages": build_context(state, "ai_suspect", speaker=name, clues=True),
+        })
+        for name in alive_names
+    ]
+
+
+def _ai_suspect_messages(payload: Dict[str, Any]) -> List[BaseMessage]:
+    """한 캐릭터 입장에서의 의심 평가 프롬프트"""
+    suspect = payload["suspect"]
+    character = next((c for c in payload["characters"] if c["name"] == suspect), {})
+
     prompt = f"""
-[Round {round_number} 요약 요청]
+당신은 {suspect}입니다. ({character.get('job', '')}, {character.get('personality', '')})
+"""
+    if suspect == payload.get("phantom_name"):
+        prompt += "당신은 팬텀(범인)입니다. 들키지 않도록 그럴듯한 다른 사람을 의심하세요.\n"
 
-다음은 이번 라운드(Day {round_number})의 전체 대화 및 사건 기록입니다.
-이 내용을 바탕으로 다음 라운드에서 캐릭터들이 기억해야 할 핵심 내용을 요약해주세요.
+    prompt += f"""현재 생존자: {', '.join(payload['alive_names'])}
 
-[대화 기록]
+최근 대화:
 """
-    for msg in messages:
+    for msg in payload["messages"]:
         sender = msg.name if hasattr(msg, 'name') else "System"
         prompt += f"- {sender}: {msg.content}\n"
-        
-    prompt += f"""
-[밤 행동 로그]
-{json.dumps(night_logs, ensure_ascii=False)}
 
-[현재 의심 수치]
-{json.dumps(suspicion_counts, ensure_ascii=False)}
+    prompt += f"""
+대화 내용을 바탕으로 당신({suspect}) 입장에서 가장 의심스러운 생존자를 1명 지목하세요.
+말이 앞뒤가 안 맞거나, 지나치게 방어적/공격적이거나, 팬텀 같은 행동을 보인 사람을 고르세요.
+자기 자신은 지목할 수 없으며, 의심스러운 사람이 없으면 target을 null로 두세요.
 
-**요약 가이드라인:**
-1. 누가 누구를 의심했는지, 주요 대립 구도는 무엇이었는지 요약하세요.
-2. 사망자가 발생했다면 누구인지 명시하세요.
-3. 캐릭터들이 다음 날 아침에 기억해야 할 중요한 단서나 발언을 포함하세요.
-4. 전체 길이는 500자 이내로 핵심만 간결하게 작성하세요.
+**출력 형식 (JSON):**
+{{"target": "생존자 이름 또는 null", "reason": "이유"}}
 """
+    return [HumanMessage(content=prompt)]
 
-    # 요약 생성
-    response = llm.invoke([HumanMessage(content=prompt)])
-    summary_text = response.content.strip()
-    
-    # 요약 저장
-    round_summaries[round_number] = summary_text
-    
-    # 메시지 초기화 (요약본만 남기고 리셋)
+
+def _ai_suspect_update(payload: Dict[str, Any], vote: Optional[SuspicionVote]) -> Dict[str, Any]:
+    """유효한 지목만 suspicion_votes에 추가"""
+    suspect = payload["suspect"]
+    if vote is None or vote.target not in payload["alive_names"] or vote.target == suspect:
+        return {"suspicion_votes": []}
+    return {"suspicion_votes": [{"suspect": suspect, "target": vote.target, "reason": vote.reason}]}
+
+
+def ai_suspect_node(payload: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    캐릭터 한 명의 의심 평가 노드 (Send로 생존자 수만큼 병렬 실행)
+    """
+    try:
+        vote = get_structured_llm(SuspicionVote).invoke(_ai_suspect_messages(payload))
+    except Exception as e:
+        print(f"AI Suspicion Error ({payload['suspect']}): {e}")
+        vote = None
+
+    return _ai_suspect_update(payload, vote)
+
+
+async def aai_suspect_node(payload: Dict[str, Any]) -> Dict[str, Any]:
+    """ai_suspect_node의 비동기 버전"""
+    try:
+        vote = await get_structured_llm(SuspicionVote).ainvoke(_ai_suspect_messages(payload))
+    except Exception as e:
+        print(f"AI Suspicion Error ({payload['suspect']}): {e}")
+        vote = None
+
+    return _ai_suspect_update(payload, vote)
+
+
+def ai_suspicion_reduce_node(state: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    병렬 의심 평가 결과를 의심 수치에 반영
+    """
+    increments: Dict[str, int] = {}
+    suspicion_updates = []
+
+    for vote in state.get("suspicion_votes", []):
+        increments[vote["target"]] = increments.get(vote["target"], 0) + 1
+        suspicion_updates.append(f"{vote['suspect']} -> {vote['target']} 의심 (+1)")
+
+    updates = {"suspicion_votes": Overwrite([])}  # 다음 라운드를 위해 비움
+    if suspicion_updates:
+        updates["suspicion_counts"] = increments
+        updates["messages"] = [SystemMessage(content="🕵️ [AI 의심 현황]\n" + "\n".join(suspicion_updates))]
+    return updates
+
+
+def _compacted_messages(state: Dict[str, Any]) -> List[BaseMessage]:
+    """
+    밤이 끝날 때 상태에서 제거할 메시지
+    밤 사이에 추가된 마지막 시스템 메시지들(AI 의심 현황)만 남기고 모두 제거한다.
+    """
+    messages = state.get("messages", [])
+    keep_from = len(messages)
+    while keep_from > 0 and isinstance(messages[keep_from - 1], SystemMessage):
+        keep_from -= 1
+    return messages[:keep_from]
+
+
+def _archive_messages(config: Optional[RunnableConfig], state: Dict[str, Any], messages: List[BaseMessage]) -> None:
+    """제거될 메시지 원문을 체크포인트 밖의 아카이브에 보관"""
+    archive = get_archive()
+    thread_id = _thread_id(config)
+    if archive is None or not thread_id:
+        return
+    try:
+        archive.append(thread_id, state.get("round_number", 1), messages)
+    except Exception as e:
+        print(f"Transcript Archive Error: {e}")
+
+
+def _round_summary_update(state: Dict[str, Any], summary_text: str) -> Dict[str, Any]:
+    return {"round_summaries": {state.get("round_number", 1): fit_tokens(summary_text, ROUND_SUMMARY_TOKENS)}}
+
+
+def summarize_round_node(state: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    라운드 요약 노드 (밤 병렬 분기)
+    - 낮 동안의 롤링 요약에 아직 합치지 않은 메시지만 더해 라운드 요약 생성
+    - 요약본 저장 (메시지 정리는 night_end에서)
+    """
+    if state.get("rolling_summary") and not pending_messages(state):
+        return _round_summary_update(state, state["rolling_summary"])
+
+    try:
+        response = get_llm().invoke(summary_messages(state))
+    except Exception as e:
+        # 대화 원문은 밤이 끝나면 상태에서 빠지므로 요약 없이 넘어가지 않고 최근 대화를 그대로 남김
+        print(f"Round Summary Error: {e}")
+        return _round_summary_update(state, extractive_summary(state))
+    return _round_summary_update(state, response.content)
+
+
+async def asummarize_round_node(state: Dict[str, Any]) -> Dict[str, Any]:
+    """summarize_round_node의 비동기 버전"""
+    if state.get("rolling_summary") and not pending_messages(state):
+        return _round_summary_update(state, state["rolling_summary"])
+
+    try:
+        response = await get_llm().ainvoke(summary_messages(state))
+    except Exception as e:
+        print(f"Round Summary Error: {e}")
+        return _round_summary_update(state, extractive_summary(state))
+    return _round_summary_update(state, response.content)
+
+
+def _compress_update(state: Dict[str, Any], rounds: List[int], memory: str) -> Dict[str, Any]:
+    return {"long_term_memory": fit_tokens(memory, LONG_TERM_MEMORY_TOKENS), "memory_round": rounds[-1]}
+
+
+def compress_memory_node(state: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    장기 기억 압축 노드 (밤 병렬 분기)
+    최근 라운드 요약만 남기고 그 이전 요약들을 토큰 예산 안의 장기 기억으로 합친다.
+    """
+    rounds = rounds_to_compress(state)
+    if not rounds:
+        return {}
+
+    try:
+        response = get_llm().invoke(compress_messages(state, rounds))
+    except Exception as e:
+        # 라운드 요약은 그대로 남아 있으므로 다음 밤에 다시 압축
+        print(f"Memory Compression Error: {e}")
+        return {}
+    return _compress_update(state, rounds, response.content)
+
+
+async def acompress_memory_node(state: Dict[str, Any]) -> Dict[str, Any]:
+    """compress_memory_node의 비동기 버전"""
+    rounds = rounds_to_compress(state)
+    if not rounds:
+        return {}
+
+    try:
+        response = await get_llm().ainvoke(compress_messages(state, rounds))
+    except Exception as e:
+        print(f"Memory Compression Error: {e}")
+        return {}
+    return _compress_update(state, rounds, response.content)
+
+
+def _night_end_update(state: Dict[str, Any], compacted: List[BaseMessage]) -> Dict[str, Any]:
+    """사망 처리, 라운드 증가, 메시지 초기화 (요약본만 남기고 리셋)"""
+    round_number = state.get("round_number", 1)
+    victim_name = state.get("night_victim")
+    alive_status = dict(state.get("alive_status", {}))
+
+    if victim_name:
+        # 사망 처리
+        alive_status[victim_name] = False
+        message = f"🌙 밤이 지났습니다.\n안타깝게도 {victim_name}이(가) 살해당한 채 발견되었습니다."
+    else:
+        message = "🌙 밤이 지났습니다. 아무 일도 일어나지 않았습니다."
+
+    # add_messages 리듀서는 추가만 하므로 RemoveMessage로 지난 메시지를 실제로 제거한다.
     # 다음 라운드 시작 시 시스템 메시지로 요약본을 제공하는 방식
-    new_messages = [
-        SystemMessage(content=f"=== Round {round_number-1} 요약 ===\n{summary_text}\n=================="),
-        SystemMessage(content=f"Day {round_number} 아침이 밝았습니다.")
-    ]
-    
+    new_messages = [RemoveMessage(id=msg.id) for msg in compacted if msg.id] + [SystemMessage(content=message)]
+    summary_text = state.get("round_summaries", {}).get(round_number)
+    if summary_text:
+        new_messages.append(
+            SystemMessage(content=f"=== Round {round_number} 요약 ===\n{summary_text}\n==================")
+        )
+    new_messages.append(SystemMessage(content=f"Day {round_number + 1} 아침이 밝았습니다."))
+
+    # 지금까지의 메시지는 라운드 요약에 반영됐으므로 다음 날 롤링 요약은 이후 새 메시지부터 시작
+    added = sum(1 for msg in new_messages if not isinstance(msg, RemoveMessage))
+    message_count = state.get("message_offset", 0) + len(state.get("messages", [])) + added
     return {
-        "round_summaries": round_summaries,
+        "round_number": round_number + 1,
+        "phase": "discussion", # 다시 낮 토론으로
+        "day_night": "day",
+        "alive_status": alive_status,
+        "night_victim": None,
         "messages": new_messages,
+        "message_offset": state.get("message_offset", 0) + len(compacted),
+        "rolling_summary": "",
+        "summary_cursor": message_count,
         "turn_count": 0
-    }
\ No newline at end of file
+    }
+
+
+def night_end_node(state: Dict[str, Any], config: Optional[RunnableConfig] = None) -> Dict[str, Any]:
+    """
+    밤 페이즈 종료 노드 (AI 의심, 단서 생성, 라운드 요약 분기가 모두 끝나면 실행)
+    - 생존 상태 업데이트
+    - 라운드 증가
+    - 메시지 히스토리 초기화 (토큰 관리, 원문은 아카이브로 이동)
+    """
+    compacted = _compacted_messages(state)
+    _archive_messages(config, state, compacted)
+
+    return _night_end_update(state, compacted)
+
+
+async def anight_end_node(state: Dict[str, Any], config: Optional[RunnableConfig] = None) -> Dict[str, Any]:
+    """night_end_node의 비동기 버전 (새 날이 시작되므로 오늘 밤 단서를 미리 생성 시작)"""
+    compacted = _compacted_messages(state)
+    await asyncio.to_thread(_archive_messages, config, state, compacted)
+
+    updates = _night_end_update(state, compacted)
+    ensure_prefetch(_thread_id(config), {**state, **updates})
+    return updates
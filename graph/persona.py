@@ -0,0 +1,129 @@
+"""
+캐릭터 페르소나 프롬프트 컴파일
+발언 시스템 프롬프트를 바뀌는 빈도 순서(페르소나 → 역할 → 심리 상태 → 라운드 기억 → 상태 정보)로 쌓는다.
+앞쪽의 고정 부분은 (캐릭터, 의심 단계, 팬텀 여부)별로 한 번만 만들어 재사용하고,
+턴마다 같은 접두어가 유지되므로 LLM 제공자의 프롬프트 캐싱도 적중한다.
+"""
+
+from functools import lru_cache
+from typing import Dict, Optional
+
+# 의심 수치별 심리 상태 (단계 0은 없음)
+SUSPICION_TIERS = {
+    1: """
+[심리 상태: 약간의 신경 쓰임]
+누군가 나를 의심하고 있다는 것을 인지했습니다.
+- 평소보다 조금 더 신중하게 말하세요.
+- "저를 의심하시는 건가요?" 정도로 가볍게 반응하거나, 상황을 살피세요.
+""",
+    2: """
+[심리 상태: 불쾌함 및 방어적]
+의심이 커지고 있어 기분이 나쁘고 긴장됩니다.
+- 다소 날카롭거나 방어적인 태도를 보이세요.
+- "왜 자꾸 저를 몰아가시죠?", "근거 없는 의심은 하지 마세요."라며 불쾌해하세요.
+""",
+    3: """
+[심리 상태: 극도의 불안 및 패닉]
+사람들이 나를 팬텀으로 확신하는 것 같아 매우 불안합니다.
+- 목소리가 떨리거나, 감정적으로 격해지세요.
+- 억울함을 호소하거나, 강하게 화를 내며 상황을 모면하려 하세요.
+""",
+}
+
+PHANTOM_ROLE = """
+
+=== 중요: 당신의 역할 ===
+🔴 당신은 이번 게임의 **팬텀(살인마)**입니다.
+
+팬텀으로서의 임무:
+1. 다른 사람들에게 들키지 않기
+2. 평소 성격대로 행동하되, 의심받지 않도록 조심
+3. 필요하면 거짓 알리바이를 만들어내기
+4. 자연스럽게 다른 사람을 의심하기
+========================
+"""
+
+# 팬텀 전용 반응 (의심 수치 3 이상부터)
+PHANTOM_CRISIS = """
+🚨 [위기 상황] 의심 수치가 위험 수준입니다! (3 이상)
+당신은 정체가 들킬까 봐 매우 당황하고 있습니다.
+- 말이 빨라지거나, 횡설수설하거나, 앞뒤가 안 맞는 말을 하세요.
+- "아니, 그게 아니라...", "잠깐만요, 제 말 좀 들어보세요!" 같은 표현을 쓰며 필사적으로 변명하세요.
+- 말실수를 하거나 과도하게 화를 내는 것도 좋습니다.
+"""
+
+# 시민인데 의심받는 경우 (5 이상일 때 더 강력한 반응)
+CITIZEN_CRISIS = """
+🚨 [위기 상황] 억울하게 팬텀으로 몰리고 있습니다! (의심 수치 5 이상)
+당신은 결백한데 아무도 믿어주지 않아 답답해 미칠 지경입니다.
+- "진짜 아니라니까요!!", "증거를 대보세요!"라며 소리치거나 강하게 호소하세요.
+"""
+
+
+def suspicion_tier(count: int) -> int:
+    """의심 수치 → 심리 상태 단계 (0: 없음, 1: 1~2, 2: 3~4, 3: 5 이상)"""
+    if count >= 5:
+        return 3
+    if count >= 3:
+        return 2
+    if count >= 1:
+        return 1
+    return 0
+
+
+@lru_cache(maxsize=1)
+def _personas() -> Dict[str, str]:
+    """characters/*.py의 페르소나 {이름: 프롬프트} (처음 쓸 때 한 번 로드)"""
+    from characters import student, office_worker, artist, chef, teacher
+
+    infos = [module.get_character_info() for module in (student, office_worker, artist, chef, teacher)]
+    return {info["name"]: info["prompt"] for info in infos}
+
+
+@lru_cache(maxsize=None)
+def _compile(persona: str, tier: int, is_phantom: bool) -> str:
+    prefix = persona
+    if is_phantom:
+        prefix += PHANTOM_ROLE
+    prefix += SUSPICION_TIERS.get(tier, "")
+    if is_phantom and tier >= 2:
+        prefix += PHANTOM_CRISIS
+    elif not is_phantom and tier >= 3:
+        prefix += CITIZEN_CRISIS
+    return prefix
+
+
+def compile_persona(name: str, tier: int, is_phantom: bool, prompt: Optional[str] = None) -> str:
+    """
+    (캐릭터, 의심 단계, 팬텀 여부)별 고정 시스템 프롬프트 접두어 (메모이즈)
+    characters/*.py에 없는 캐릭터는 prompt로 받은 페르소나를 사용한다.
+    """
+    persona = _personas().get(name, prompt)
+    if persona is None:
+        raise KeyError(f"알 수 없는 캐릭터: {name}")
+    return _compile(persona, tier, is_phantom)
+
+
+def precompile_personas() -> int:
+    """모든 캐릭터의 가능한 변형을 미리 컴파일 (컴파일한 변형 수 반환)"""
+    count = 0
+    for name in _personas():
+        for tier in range(len(SUSPICION_TIERS) + 1):
+            for is_phantom in (False, True):
+                compile_persona(name, tier, is_phantom)
+                count += 1
+    return count
+
+
+def speaker_system_prompt(
+    character: Dict[str, str], suspicion: int, is_phantom: bool, memory: Optional[str] = None
+) -> str:
+    """
+    발언 시스템 프롬프트
+    고정 접두어 뒤에 라운드 기억(라운드마다 바뀜)과 현재 의심 수치(턴마다 바뀜)를 붙인다.
+    """
+    prompt = compile_persona(character["name"], suspicion_tier(suspicion), is_phantom, character.get("prompt"))
+    if memory:
+        prompt += f"\n\n[지난 라운드 기억]\n{memory}\n"
+    prompt += f"\n\n[상태 정보]\n현재 당신의 의심 수치: {suspicion}\n"
+    return prompt
@@ -0,0 +1,155 @@
+"""
+밤 단서 미리 생성 (prefetch)
+희생자는 팬텀을 제외한 생존자 중 무작위이므로, 낮 토론이 진행되는 동안 오늘 밤의 희생자를 미리 정하고
+단서 생성을 백그라운드로 시작해 둔다. 밤 페이즈는 준비된 결과를 받아 바로 진행한다.
+생존 상태나 라운드가 바뀌어 미리 만든 결과가 맞지 않게 되면 해당 작업을 취소한다.
+
+비동기 실행(ainvoke/astream)에서만 동작하며, 동기 invoke()에서는 기존대로 밤에 생성한다.
+"""
+
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, Dict, FrozenSet, Optional, Tuple
+import asyncio
+import contextvars
+import logging
+import os
+import threading
+
+from langchain_core.runnables.config import var_child_runnable_config
+
+from graph.metrics import record_node_error
+
+logger = logging.getLogger(__name__)
+
+ENABLED = os.getenv("CLUE_PREFETCH", "1") == "1"
+MAX_THREADS = int(os.getenv("CLUE_PREFETCH_MAX_THREADS", "1000"))
+
+
+@dataclass
+class _Prefetch:
+    round_number: int
+    alive: FrozenSet[str]
+    victim: str
+    task: Optional["asyncio.Task[Optional[str]]"]  # 단서 뱅크에서 꺼냈으면 None
+    clue: Optional[str] = None
+
+
+_prefetches: "OrderedDict[str, _Prefetch]" = OrderedDict()
+_lock = threading.Lock()
+
+
+def _alive(state: Dict[str, Any]) -> FrozenSet[str]:
+    return frozenset(name for name, alive in state.get("alive_status", {}).items() if alive)
+
+
+def _cancel(entry: _Prefetch) -> None:
+    """다른 스레드에서 불려도 안전하게 작업 취소"""
+    if entry.task is not None and not entry.task.done():
+        entry.task.get_loop().call_soon_threadsafe(entry.task.cancel)
+
+
+def _matches(entry: _Prefetch, state: Dict[str, Any]) -> bool:
+    return entry.round_number == state.get("round_number", 1) and entry.alive == _alive(state)
+
+
+async def _generate(thread_id: str, state: Dict[str, Any], victim: str) -> Optional[str]:
+    from graph.llm import get_llm
+    from graph.nodes import _clue_messages
+
+    messages = _clue_messages(state, victim)
+    if not messages:
+        return None
+    try:
+        # 계측과 응답 캐시 정책에서 토론 노드가 아니라 밤 단서 생성으로 집계되도록 노드 이름을 지정
+        # (빈 컨텍스트에서 실행 중이므로 실행 컨텍스트의 config를 바꿔도 요청에 영향이 없다)
+        config = {"metadata": {"langgraph_node": "night_prefetch", "thread_id": thread_id}}
+        var_child_runnable_config.set(config)
+        response = await get_llm().ainvoke(messages, config=config)
+        return response.content.strip()
+    except Exception as e:
+        # 밤에 night_clue가 다시 생성하므로 게임은 이어지지만 LLM 호출이 두 번이 되므로 로그/지표에 남김
+        logger.warning("Clue prefetch failed (thread=%s): %s", thread_id, e, exc_info=e)
+        record_node_error("night_prefetch", thread_id)
+        return None
+
+
+def ensure_prefetch(thread_id: Optional[str], state: Dict[str, Any]) -> None:
+    """
+    오늘 밤 희생자/단서 미리 준비 (이미 상태에 맞는 작업이 있으면 그대로 둠)
+    실행 중인 이벤트 루프 안에서 호출해야 한다.
+    """
+    if not ENABLED or not thread_id or state.get("day_night", "day") != "day":
+        return
+
+    from graph.nodes import _bank_clue, _pick_victim
+
+    with _lock:
+        entry = _prefetches.get(thread_id)
+        if entry is not None and _matches(entry, state):
+            _prefetches.move_to_end(thread_id)
+            return
+        if entry is not None:
+            _cancel(entry)
+
+        victim = _pick_victim(state)
+        if victim is None:
+            _prefetches.pop(thread_id, None)
+            return
+
+        clue = _bank_clue(state, victim)
+        task = None
+        if clue is None:
+            # 요청 컨텍스트(스트리밍 콜백, Server-Timing 수집)를 물려받지 않도록 빈 컨텍스트에서 실행
+            task = asyncio.get_running_loop().create_task(
+                _generate(thread_id, dict(state), victim), context=contextvars.Context()
+            )
+
+        _prefetches[thread_id] = _Prefetch(state.get("round_number", 1), _alive(state), victim, task, clue)
+        _prefetches.move_to_end(thread_id)
+        while len(_prefetches) > MAX_THREADS:
+            _, evicted = _prefetches.popitem(last=False)
+            _cancel(evicted)
+
+
+def prefetched_victim(thread_id: Optional[str], state: Dict[str, Any]) -> Optional[str]:
+    """미리 정해 둔 오늘 밤 희생자 (상태에 맞는 준비 작업이 없으면 None, 작업은 그대로 둔다)"""
+    if not thread_id:
+        return None
+    with _lock:
+        entry = _prefetches.get(thread_id)
+        if entry is None or not _matches(entry, state):
+            return None
+        return entry.victim
+
+
+async def take_prefetched(thread_id: Optional[str], state: Dict[str, Any]) -> Optional[Tuple[str, Optional[str]]]:
+    """
+    미리 준비된 (희생자, 단서)를 꺼냄
+    상태가 바뀌어 맞지 않으면 작업을 취소하고 None, 생성 중이면 끝날 때까지 기다린다.
+    """
+    if not thread_id:
+        return None
+    with _lock:
+        entry = _prefetches.pop(thread_id, None)
+    if entry is None:
+        return None
+    if not _matches(entry, state):
+        _cancel(entry)
+        return None
+    if entry.task is None:
+        return entry.victim, entry.clue
+    try:
+        return entry.victim, await entry.task
+    except asyncio.CancelledError:
+        if asyncio.current_task().cancelling():
+            raise
+        return None
+
+
+def cancel_prefetch(thread_id: Optional[str]) -> None:
+    """세션의 미리 생성 작업 취소 (게임 종료 등)"""
+    with _lock:
+        entry = _prefetches.pop(thread_id, None) if thread_id else None
+    if entry is not None:
+        _cancel(entry)
@@ -0,0 +1,595 @@
+"""
+LLM 호출 복원력 계층
+느린 응답 하나가 플레이어의 턴을 수십 초씩 붙잡지 않도록 모든 챗 모델 호출에 다음을 적용한다.
+
+- 노드별 마감 시간: 재시도를 포함한 호출 전체의 시간 상한 (시도마다 남은 시간을 남은 시도 수로 나눠 시간 초과)
+- 재시도: 일시적 에러(시간 초과, 429, 5xx, 연결 끊김)만 지수 백오프 + 지터 후 다시 시도
+- 재시도 예산: 재시도와 복제 요청은 전체 요청 수의 일정 비율까지만 (장애 때 재시도가 부하를 키우지 않도록)
+- 복제 요청(hedging, LLM_HEDGE=1): 노드의 최근 p95 지연이 지나도 응답이 없으면 같은 요청을 하나 더 보내
+  먼저 온 응답을 쓰고 나머지는 취소
+- 회로 차단기: 최근 시도의 실패율이 높으면 한동안 API를 부르지 않고 바로 실패한다.
+  화자 선정·발언·단서처럼 대신할 수 있는 노드는 로컬 대체 응답(무작위 화자, 준비된 단서 등)으로 게임을 이어간다.
+
+get_llm()이 백엔드 모델(과 호출 스케줄러)을 감싸므로 재시도와 복제 요청도 스케줄러를 거친다.
+스트리밍 호출은 첫 토큰 전까지만 재시도하고 복제 요청은 보내지 않으며,
+동기 호출(CLI)은 진행 중인 시도를 끊을 수 없어 마감 시간을 시도 사이에서만 확인한다.
+LLM_RESILIENCE=0이면 꺼진다.
+"""
+
+from collections import deque
+from contextlib import asynccontextmanager
+from dataclasses import dataclass
+from typing import Any, AsyncIterator, Awaitable, Callable, Deque, Dict, Iterator, List, Optional
+import asyncio
+import os
+import random
+import threading
+import time
+
+import httpx
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import AIMessage, AIMessageChunk, BaseMessage
+from langchain_core.outputs import ChatGeneration, ChatGenerationChunk, ChatResult
+from langchain_core.runnables import Runnable
+
+from graph.metrics import current_caller, record_breaker, record_llm_event, record_retry
+
+
+@dataclass(frozen=True)
+class NodePolicy:
+    deadline: float  # 재시도를 포함한 호출 전체의 마감 시간 (초)
+    retries: int = 2
+    hedge: bool = True  # 느린 시도에 복제 요청을 보낼지 (LLM_HEDGE=1일 때)
+
+
+# 노드별 정책 (LLM_DEADLINE_POLICY 환경 변수로 변경, 예: "character_speak=10:1,summary_fold=60")
+NODE_POLICIES: Dict[str, NodePolicy] = {
+    "character_speak": NodePolicy(20),
+    "fused_turn": NodePolicy(20),
+    "select_next_speaker": NodePolicy(8),
+    "night_clue": NodePolicy(15),
+    "ai_suspicion": NodePolicy(20),
+    "ai_suspect": NodePolicy(10),
+    "summarize_round": NodePolicy(30),
+    # 백그라운드 호출은 플레이어가 기다리지 않으므로 복제 요청을 보내지 않는다
+    "night_prefetch": NodePolicy(30, hedge=False),
+    "summary_fold": NodePolicy(30, hedge=False),
+    "compress_memory": NodePolicy(30, hedge=False),
+}
+DEFAULT_POLICY = NodePolicy(30)
+
+BACKOFF_BASE = float(os.getenv("LLM_BACKOFF_BASE_MS", "250")) / 1000
+BACKOFF_MAX = float(os.getenv("LLM_BACKOFF_MAX_MS", "4000")) / 1000
+# 요청 하나당 쌓이는 재시도 예산, 요청이 없어도 초당 보장하는 재시도 수
+RETRY_BUDGET_RATIO = float(os.getenv("LLM_RETRY_BUDGET", "0.2"))
+RETRY_BUDGET_MIN_PER_SECOND = float(os.getenv("LLM_RETRY_MIN_PER_SECOND", "1"))
+
+HEDGE = os.getenv("LLM_HEDGE", "0") == "1"
+HEDGE_MIN_DELAY = float(os.getenv("LLM_HEDGE_MIN_MS", "200")) / 1000
+HEDGE_MIN_SAMPLES = 20  # p95를 믿을 수 있을 만큼 쌓이기 전에는 복제 요청을 보내지 않음
+
+BREAKER_WINDOW = int(os.getenv("LLM_BREAKER_WINDOW", "20"))
+BREAKER_FAILURE_RATE = float(os.getenv("LLM_BREAKER_FAILURE_RATE", "0.5"))
+BREAKER_COOLDOWN = float(os.getenv("LLM_BREAKER_COOLDOWN", "30"))
+
+_RETRYABLE_STATUS = {408, 429, 500, 502, 503, 504}
+
+
+def _parse_policies(spec: str) -> Dict[str, NodePolicy]:
+    """"node=deadline[:retries],..." 형식"""
+    policies = {}
+    for item in spec.split(","):
+        if item.strip():
+            node, _, value = item.partition("=")
+            node = node.strip()
+            deadline, _, retries = value.partition(":")
+            base = NODE_POLICIES.get(node, DEFAULT_POLICY)
+            policies[node] = NodePolicy(float(deadline), int(retries) if retries else base.retries, base.hedge)
+    return policies
+
+
+NODE_POLICIES.update(_parse_policies(os.getenv("LLM_DEADLINE_POLICY", "")))
+
+
+class DeadlineExceeded(TimeoutError):
+    """시도 또는 호출 전체가 마감 시간 안에 끝나지 않음"""
+
+
+class ProviderUnavailable(Exception):
+    """회로 차단기가 열려 있어 API를 부르지 않음"""
+
+
+def is_retryable(error: BaseException) -> bool:
+    """다시 시도하면 성공할 수 있는 일시적 에러인지 (시간 초과, 429, 5xx, 연결 끊김)"""
+    flag = getattr(error, "is_retryable", None)  # langchain_core.exceptions.ModelError 계열
+    if isinstance(flag, bool):
+        return flag
+    if isinstance(error, (TimeoutError, asyncio.TimeoutError, ConnectionError, httpx.TransportError)):
+        return True
+    code = getattr(error, "code", None) or getattr(error, "status_code", None)
+    return code in _RETRYABLE_STATUS
+
+
+def backoff_delay(attempt: int, rng: Any = random) -> float:
+    """attempt번째 재시도 전에 기다릴 시간 (지수 백오프 + full jitter)"""
+    return rng.uniform(0, min(BACKOFF_MAX, BACKOFF_BASE * 2 ** attempt))
+
+
+class RetryBudget:
+    """
+    재시도 예산 (토큰 버킷)
+    요청마다 ratio개씩 쌓이고 재시도/복제 요청 한 번에 1개씩 쓴다. 요청이 적을 때도 초당 min_per_second개는 채워진다.
+    """
+
+    def __init__(self, ratio: float = RETRY_BUDGET_RATIO, min_per_second: float = RETRY_BUDGET_MIN_PER_SECOND) -> None:
+        self.ratio = ratio
+        self.min_per_second = min_per_second
+        self.capacity = max(10.0, min_per_second * 10)
+        self._tokens = self.capacity
+        self._at = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        self._tokens = min(self.capacity, self._tokens + (now - self._at) * self.min_per_second)
+        self._at = now
+
+    def deposit(self) -> None:
+        with self._lock:
+            self._refill()
+            self._tokens = min(self.capacity, self._tokens + self.ratio)
+
+    def withdraw(self) -> bool:
+        with self._lock:
+            self._refill()
+            if self._tokens < 1:
+                return False
+            self._tokens -= 1
+            return True
+
+
+class CircuitBreaker:
+    """
+    백엔드별 회로 차단기
+    - closed: 최근 BREAKER_WINDOW번의 시도 중 실패 비율이 BREAKER_FAILURE_RATE 이상이면 open
+    - open: BREAKER_COOLDOWN초 동안 모든 호출을 바로 거절
+    - half_open: 쿨다운마다 시험 호출 하나만 보내 성공하면 closed, 실패하면 다시 open
+    일시적 에러(is_retryable)만 실패로 센다. (잘못된 요청은 백엔드 상태와 무관)
+    """
+
+    def __init__(
+        self,
+        name: str,
+        window: int = BREAKER_WINDOW,
+        failure_rate: float = BREAKER_FAILURE_RATE,
+        cooldown: float = BREAKER_COOLDOWN,
+    ) -> None:
+        self.name = name
+        self.failure_rate = failure_rate
+        self.cooldown = cooldown
+        self.min_calls = max(1, window // 2)
+        self.state = "closed"
+        self._results: Deque[bool] = deque(maxlen=window)
+        self._changed_at = 0.0
+        self._lock = threading.Lock()
+        record_breaker(name, self.state)
+
+    @property
+    def closed(self) -> bool:
+        return self.state == "closed"
+
+    def _set(self, state: str) -> None:
+        """호출 시 _lock을 잡고 있어야 함"""
+        self._changed_at = time.monotonic()
+        if state != self.state:
+            self.state = state
+            record_breaker(self.name, state)
+            print(f"LLM Circuit Breaker ({self.name}): {state}")
+
+    def allow(self) -> bool:
+        with self._lock:
+            if self.state == "closed":
+                return True
+            if time.monotonic() - self._changed_at < self.cooldown:
+                return False
+            self._set("half_open")  # 쿨다운마다 시험 호출 하나만 통과
+            return True
+
+    def record(self, ok: bool) -> None:
+        with self._lock:
+            if self.state == "half_open":
+                if ok:
+                    self._results.clear()
+                self._set("closed" if ok else "open")
+                return
+            if self.state == "open":  # 차단 전에 보낸 시도의 늦은 결과
+                return
+            self._results.append(ok)
+            failures = self._results.count(False)
+            if len(self._results) >= self.min_calls and failures / len(self._results) >= self.failure_rate:
+                self._set("open")
+
+
+class _Latencies:
+    """노드별 최근 성공한 시도의 지연 (복제 요청 시점 계산용)"""
+
+    def __init__(self, size: int = 200) -> None:
+        self.size = size
+        self._samples: Dict[str, Deque[float]] = {}
+
+    def observe(self, node: str, seconds: float) -> None:
+        samples = self._samples.get(node)
+        if samples is None:
+            samples = self._samples.setdefault(node, deque(maxlen=self.size))
+        samples.append(seconds)
+
+    def hedge_delay(self, node: str) -> Optional[float]:
+        """복제 요청을 보낼 시점 (p95, 표본이 부족하면 None)"""
+        samples = sorted(self._samples.get(node, ()))
+        if len(samples) < HEDGE_MIN_SAMPLES:
+            return None
+        return max(HEDGE_MIN_DELAY, samples[int(0.95 * (len(samples) - 1))])
+
+
+_latencies = _Latencies()
+
+
+def _scripted_fallback(messages: List[BaseMessage]) -> str:
+    # graph.fake_llm이 graph.llm을 import하므로 여기서 import
+    from graph.fake_llm import scripted_reply
+
+    return scripted_reply(messages, random.Random())
+
+
+# 백엔드가 응답하지 못할 때 로컬 대체 응답을 쓸 노드 (프롬프트 → 응답 텍스트)
+# 화자 선정은 무작위 생존자, 단서는 준비된 단서, 발언은 일반적인 한마디
+FALLBACKS: Dict[str, Callable[[List[BaseMessage]], str]] = {
+    node: _scripted_fallback for node in ("select_next_speaker", "character_speak", "fused_turn", "night_clue")
+}
+
+
+def fallback_reply(node: str, thread_id: Optional[str], messages: List[BaseMessage]) -> Optional[str]:
+    """
+    LLM 호출이 에러로 끝난 노드가 쓸 로컬 대체 응답 (대체 응답이 없는 노드면 None)
+    재시도할 수 없는 에러나 복원력 계층을 끈 경우처럼 _degraded가 처리하지 못한 실패용
+    """
+    fallback = FALLBACKS.get(node)
+    if fallback is None:
+        return None
+    record_llm_event(node, thread_id, "fallbacks")
+    return fallback(messages)
+
+
+def register_fallback(node: str, fallback: Callable[[List[BaseMessage]], str]) -> None:
+    """
+    노드의 대체 응답 추가/교체
+    fallback(messages)는 LLM 대신 쓸 응답 텍스트를 반환해야 한다.
+    """
+    FALLBACKS[node] = fallback
+
+
+@asynccontextmanager
+async def _deadline(seconds: float) -> AsyncIterator[None]:
+    """
+    with 블록이 seconds 안에 끝나지 않으면 DeadlineExceeded
+    asyncio.wait_for와 달리 같은 태스크에서 실행하므로 컨텍스트 변수(스케줄러 대기 시간 등)가 그대로 이어진다.
+    """
+    task = asyncio.current_task()
+    expired = False
+
+    def expire() -> None:
+        nonlocal expired
+        expired = True
+        task.cancel()
+
+    handle = asyncio.get_running_loop().call_later(max(0.0, seconds), expire)
+    try:
+        yield
+    except asyncio.CancelledError:
+        if expired:
+            raise DeadlineExceeded(f"{seconds:.1f}초 안에 응답 없음") from None
+        raise
+    finally:
+        handle.cancel()
+
+
+class _Call:
+    """노드가 부른 LLM 호출 하나 (재시도와 복제 요청을 모두 포함)"""
+
+    def __init__(self, node: str, thread_id: Optional[str], run_manager: Any) -> None:
+        self.node = node
+        self.thread_id = thread_id
+        self.policy = NODE_POLICIES.get(node, DEFAULT_POLICY)
+        self.started = time.monotonic()
+        # 감싼 모델 호출에는 콜백을 넘기지 않고(토큰 스트리밍과 계측은 바깥 실행에서 한 번만),
+        # 스케줄러가 기다린 시간을 뺄 수 있도록 바깥 실행 id를 메타데이터로 넘긴다
+        metadata = dict(getattr(run_manager, "metadata", None) or {})
+        if run_manager is not None:
+            metadata["llm_run_id"] = run_manager.run_id
+        self.config = {"callbacks": [], "metadata": metadata}
+
+    def remaining(self) -> float:
+        return self.policy.deadline - (time.monotonic() - self.started)
+
+    def attempt_timeout(self, attempt: int) -> float:
+        """남은 시간을 남은 시도 수로 나눈 이번 시도의 시간 상한"""
+        return max(0.0, self.remaining()) / max(1, self.policy.retries - attempt + 1)
+
+
+class ResilientChatModel(BaseChatModel):
+    """
+    다른 챗 모델의 호출에 마감 시간, 재시도, 복제 요청, 회로 차단기를 적용하는 래퍼
+    호출한 노드는 콜백 메타데이터(langgraph_node)로 알아내 노드별 정책과 대체 응답을 고른다.
+    """
+
+    inner: Runnable
+    breaker: CircuitBreaker
+    budget: RetryBudget
+
+    model_config = {"arbitrary_types_allowed": True}
+
+    @property
+    def _llm_type(self) -> str:
+        return getattr(self.inner, "_llm_type", "resilient")
+
+    @property
+    def _identifying_params(self) -> Dict[str, Any]:
+        # 응답 캐시 키와 정책(temperature)이 감싼 모델의 설정을 따르도록
+        return dict(getattr(self.inner, "_identifying_params", {}))
+
+    def bind_tools(self, tools: Any, **kwargs: Any) -> Runnable:
+        """구조화 출력(tool calling)도 감싼 모델의 구현을 그대로 쓰되 같은 정책을 적용한다"""
+        return self.model_copy(update={"inner": self.inner.bind_tools(tools, **kwargs)})
+
+    def _begin(self, run_manager: Any) -> _Call:
+        node, thread_id = current_caller(run_manager)
+        self.budget.deposit()
+        return _Call(node, thread_id, run_manager)
+
+    def _admit(self) -> None:
+        if not self.breaker.allow():
+            raise ProviderUnavailable(f"LLM 백엔드 {self.breaker.name} 회로 차단 중")
+
+    def _succeeded(self, call: _Call, start: float) -> None:
+        self.breaker.record(True)
+        _latencies.observe(call.node, time.perf_counter() - start)
+
+    def _failed(self, call: _Call, error: BaseException) -> None:
+        if isinstance(error, DeadlineExceeded):
+            record_llm_event(call.node, call.thread_id, "timeouts")
+        if is_retryable(error):
+            self.breaker.record(False)
+
+    def _retry_delay(self, call: _Call, attempt: int, error: BaseException) -> Optional[float]:
+        """다시 시도하기 전에 기다릴 시간 (다시 시도하지 않으면 None)"""
+        if not is_retryable(error) or attempt >= call.policy.retries:
+            return None
+        delay = backoff_delay(attempt)
+        if call.remaining() <= delay or not self.budget.withdraw():
+            return None
+        record_retry(call.node, call.thread_id)
+        print(f"LLM Retry ({call.node}, {attempt + 1}/{call.policy.retries}): {error}")
+        return delay
+
+    def _degraded(self, call: _Call, messages: List[BaseMessage], error: BaseException) -> AIMessage:
+        """로컬 대체 응답 (대신할 수 없는 노드이거나 백엔드 장애가 아니면 에러를 그대로 올림)"""
+        fallback = FALLBACKS.get(call.node)
+        if fallback is None or not (isinstance(error, ProviderUnavailable) or is_retryable(error)):
+            raise error
+        print(f"LLM Fallback ({call.node}): {error}")
+        record_llm_event(call.node, call.thread_id, "fallbacks")
+        return AIMessage(content=fallback(messages), response_metadata={"degraded": True})
+
+    # --- 동기 ---
+
+    def _generate(
+        self,
+        messages: List[BaseMessage],
+        stop: Optional[List[str]] = None,
+        run_manager: Any = None,
+        **kwargs: Any,
+    ) -> ChatResult:
+        call = self._begin(run_manager)
+        attempt = 0
+        while True:
+            start = time.perf_counter()
+            try:
+                self._admit()
+                message = self.inner.invoke(messages, config=call.config, stop=stop, **kwargs)
+                self._succeeded(call, start)
+                break
+            except Exception as e:
+                self._failed(call, e)
+                delay = self._retry_delay(call, attempt, e)
+                if delay is None:
+                    message = self._degraded(call, messages, e)
+                    break
+            time.sleep(delay)
+            attempt += 1
+        return ChatResult(generations=[ChatGeneration(message=message)])
+
+    def _stream(
+        self,
+        messages: List[BaseMessage],
+        stop: Optional[List[str]] = None,
+        run_manager: Any = None,
+        **kwargs: Any,
+    ) -> Iterator[ChatGenerationChunk]:
+        call = self._begin(run_manager)
+        attempt = 0
+        while True:
+            start = time.perf_counter()
+            try:
+                self._admit()
+                stream = iter(self.inner.stream(messages, config=call.config, stop=stop, **kwargs))
+                first = next(stream)
+                break
+            except StopIteration:
+                return
+            except Exception as e:
+                self._failed(call, e)
+                delay = self._retry_delay(call, attempt, e)
+                if delay is None:
+                    message = self._degraded(call, messages, e)
+                    yield ChatGenerationChunk(message=AIMessageChunk(content=message.content, response_metadata={"degraded": True}))
+                    return
+            time.sleep(delay)
+            attempt += 1
+
+        # 첫 토큰이 나온 뒤에는 재시도하지 않는다 (이미 내보낸 토큰을 되돌릴 수 없음)
+        yield ChatGenerationChunk(message=first)
+        for chunk in stream:
+            yield ChatGenerationChunk(message=chunk)
+        self._succeeded(call, start)
+
+    # --- 비동기 ---
+
+    async def _attempt(self, call: _Call, factory: Callable[[], Awaitable[BaseMessage]]) -> BaseMessage:
+        start = time.perf_counter()
+        try:
+            message = await factory()
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            self._failed(call, e)
+            raise
+        self._succeeded(call, start)
+        return message
+
+    async def _hedged(self, call: _Call, factory: Callable[[], Awaitable[BaseMessage]], timeout: float) -> BaseMessage:
+        """
+        시도 하나 (timeout초 제한)
+        복제 요청을 켰고 노드의 p95 지연이 지나도 응답이 없으면 같은 요청을 하나 더 보내 먼저 성공한 응답을 쓴다.
+        """
+        loop = asyncio.get_running_loop()
+        ends_at = loop.time() + timeout
+        hedge_at = None
+        if HEDGE and call.policy.hedge and self.breaker.closed:
+            delay = _latencies.hedge_delay(call.node)
+            if delay is not None and delay < timeout:
+                hedge_at = loop.time() + delay
+
+        pending = {asyncio.ensure_future(self._attempt(call, factory))}
+        try:
+            while True:
+                until = ends_at if hedge_at is None else min(ends_at, hedge_at)
+                done, pending = await asyncio.wait(
+                    pending, timeout=max(0.0, until - loop.time()), return_when=asyncio.FIRST_COMPLETED
+                )
+                errors = [task.exception() for task in done]
+                for task, error in zip(done, errors):
+                    if error is None:
+                        return task.result()
+                if errors and not pending:
+                    raise errors[0]
+                if hedge_at is not None and loop.time() >= hedge_at:
+                    hedge_at = None
+                    if self.budget.withdraw():
+                        record_llm_event(call.node, call.thread_id, "hedges")
+                        pending.add(asyncio.ensure_future(self._attempt(call, factory)))
+                elif loop.time() >= ends_at:
+                    error = DeadlineExceeded(f"{call.node}: {timeout:.1f}초 안에 응답 없음")
+                    self._failed(call, error)
+                    raise error
+        finally:
+            for task in pending:
+                task.cancel()
+
+    async def _agenerate(
+        self,
+        messages: List[BaseMessage],
+        stop: Optional[List[str]] = None,
+        run_manager: Any = None,
+        **kwargs: Any,
+    ) -> ChatResult:
+        call = self._begin(run_manager)
+
+        def factory() -> Awaitable[BaseMessage]:
+            return self.inner.ainvoke(messages, config=call.config, stop=stop, **kwargs)
+
+        attempt = 0
+        while True:
+            try:
+                self._admit()
+                message = await self._hedged(call, factory, call.attempt_timeout(attempt))
+                break
+            except Exception as e:
+                delay = self._retry_delay(call, attempt, e)
+                if delay is None:
+                    message = self._degraded(call, messages, e)
+                    break
+            await asyncio.sleep(delay)
+            attempt += 1
+        return ChatResult(generations=[ChatGeneration(message=message)])
+
+    async def _astream(
+        self,
+        messages: List[BaseMessage],
+        stop: Optional[List[str]] = None,
+        run_manager: Any = None,
+        **kwargs: Any,
+    ) -> AsyncIterator[ChatGenerationChunk]:
+        call = self._begin(run_manager)
+        attempt = 0
+        while True:
+            start = time.perf_counter()
+            try:
+                self._admit()
+                stream = self.inner.astream(messages, config=call.config, stop=stop, **kwargs).__aiter__()
+                async with _deadline(call.attempt_timeout(attempt)):
+                    first = await stream.__anext__()
+                break
+            except StopAsyncIteration:
+                return
+            except Exception as e:
+                self._failed(call, e)
+                delay = self._retry_delay(call, attempt, e)
+                if delay is None:
+                    message = self._degraded(call, messages, e)
+                    yield ChatGenerationChunk(message=AIMessageChunk(content=message.content, response_metadata={"degraded": True}))
+                    return
+            await asyncio.sleep(delay)
+            attempt += 1
+
+        # 첫 토큰이 나온 뒤에는 재시도하지 않고, 마감 시간이 지나면 그때까지 나온 발언으로 끝낸다
+        yield ChatGenerationChunk(message=first)
+        while True:
+            try:
+                async with _deadline(call.remaining()):
+                    chunk = await stream.__anext__()
+            except StopAsyncIteration:
+                break
+            except DeadlineExceeded as e:
+                print(f"LLM Stream Deadline ({call.node}): {e}")
+                self._failed(call, e)
+                return
+            except Exception as e:
+                self._failed(call, e)
+                raise
+            yield ChatGenerationChunk(message=chunk)
+        self._succeeded(call, start)
+
+
+_breakers: Dict[str, CircuitBreaker] = {}
+_budgets: Dict[str, RetryBudget] = {}
+_registry_lock = threading.Lock()
+
+
+def resilience_enabled() -> bool:
+    """복원력 계층 사용 여부 (LLM_RESILIENCE, 기본 켜짐)"""
+    return os.getenv("LLM_RESILIENCE", "1") != "0"
+
+
+def resilient(llm: Runnable, backend: str) -> ResilientChatModel:
+    """
+    llm을 복원력 계층으로 감쌈
+    회로 차단기와 재시도 예산은 같은 백엔드의 모든 모델(설정만 다른 클라이언트)이 함께 쓴다.
+    """
+    with _registry_lock:
+        breaker = _breakers.get(backend)
+        if breaker is None:
+            breaker = _breakers[backend] = CircuitBreaker(backend)
+        budget = _budgets.get(backend)
+        if budget is None:
+            budget = _budgets[backend] = RetryBudget()
+    return ResilientChatModel(inner=llm, breaker=breaker, budget=budget)
@@ -0,0 +1,257 @@
+"""
+LLM 응답 캐시 (디스크)
+세션이 달라도 거의 그대로 반복되는 프롬프트(같은 팬텀/희생자 쌍의 단서, 화자 선정, 1:1 대화 첫인사 등)의
+응답을 SQLite 파일에 저장해 두고 API 호출 없이 돌려준다.
+
+- 키: (모델, 생성 설정) + 공백을 정규화한 프롬프트의 해시
+- 노드별 정책: TTL(초, 0이면 캐시 안 함)과 최대 temperature (설정이 더 높으면 캐시하지 않음)
+- 파일 크기가 LLM_CACHE_MAX_MB를 넘으면 가장 오래 쓰지 않은 응답부터 삭제 (LRU)
+- 적중/실패 수와 아낀 시간·토큰은 graph/metrics.py로 노드별 집계 (/metrics)
+
+LangChain 챗 모델의 cache 필드로 연결되므로 스트리밍/구조화 출력 호출에도 똑같이 적용된다.
+LLM_CACHE_DB 환경 변수로 파일을 지정할 때만 켜진다. (기본 꺼짐)
+"""
+
+from dataclasses import dataclass
+from typing import Any, Dict, Optional, Sequence, Tuple
+import hashlib
+import json
+import os
+import re
+import sqlite3
+import threading
+import time
+
+from langchain_core.caches import BaseCache
+from langchain_core.messages import message_to_dict, messages_from_dict
+from langchain_core.outputs import ChatGeneration, Generation
+
+from graph.metrics import current_caller, record_cache
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS llm_cache (
+    key TEXT PRIMARY KEY,
+    node TEXT NOT NULL,
+    value TEXT NOT NULL,
+    size INTEGER NOT NULL,
+    latency_ms REAL NOT NULL,
+    tokens INTEGER NOT NULL,
+    expires_at REAL NOT NULL,
+    accessed_at REAL NOT NULL
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS llm_cache_accessed ON llm_cache (accessed_at);
+"""
+
+
+@dataclass(frozen=True)
+class CachePolicy:
+    ttl: float  # 초 (0이면 캐시하지 않음)
+    max_temperature: Optional[float] = None  # 이보다 높은 temperature 호출은 캐시하지 않음 (None: 제한 없음)
+
+
+# 노드별 기본 정책 (LLM_CACHE_POLICY 환경 변수로 변경, 예: "character_speak=0,night_clue=604800:1.0")
+DEFAULT_POLICIES: Dict[str, CachePolicy] = {
+    "select_next_speaker": CachePolicy(24 * 3600),
+    "night_clue": CachePolicy(7 * 24 * 3600),
+    "night_prefetch": CachePolicy(7 * 24 * 3600),
+    "ai_suspicion": CachePolicy(3600),
+    "ai_suspect": CachePolicy(3600),
+    "summarize_round": CachePolicy(24 * 3600),
+    "compress_memory": CachePolicy(24 * 3600),
+    "summary_fold": CachePolicy(24 * 3600),
+    # 발언은 같은 상황이 반복될 때(1:1 대화 첫인사 등)만 맞으므로 짧게, 창의성을 높인 호출은 제외
+    "character_speak": CachePolicy(600, max_temperature=1.0),
+    "fused_turn": CachePolicy(600, max_temperature=1.0),
+}
+DEFAULT_POLICY = CachePolicy(3600)
+
+_MAX_PENDING = 10000
+
+_WHITESPACE = re.compile(r"(?:\s|\\[nrt])+")
+# llm_string은 직렬화 가능한 모델이면 JSON("temperature": 0.7), 아니면 파라미터 튜플 목록('temperature', 0.7)
+_TEMPERATURE = re.compile(r"""["']temperature["'](?:,|:) ?([0-9.]+)""")
+
+
+def _parse_policies(spec: str) -> Dict[str, CachePolicy]:
+    """"node=ttl[:max_temperature],..." 형식"""
+    policies = {}
+    for item in spec.split(","):
+        if item.strip():
+            node, _, value = item.partition("=")
+            ttl, _, temperature = value.partition(":")
+            policies[node.strip()] = CachePolicy(float(ttl), float(temperature) if temperature else None)
+    return policies
+
+
+def normalize_prompt(prompt: str) -> str:
+    """공백/줄바꿈 차이만 있는 프롬프트가 같은 키가 되도록 연속 공백을 하나로"""
+    return _WHITESPACE.sub(" ", prompt).strip()
+
+
+def cache_key(prompt: str, llm_string: str) -> str:
+    """모델/생성 설정 + 정규화한 프롬프트의 해시"""
+    return hashlib.sha256(f"{llm_string}\0{normalize_prompt(prompt)}".encode()).hexdigest()
+
+
+def _temperature(llm_string: str) -> Optional[float]:
+    match = _TEMPERATURE.search(llm_string)
+    return float(match.group(1)) if match else None
+
+
+def _encode(generations: Sequence[Generation]) -> Tuple[str, int]:
+    """
+    저장할 응답과 그 응답에 든 토큰 수
+    재생한 응답이 토큰/비용으로 다시 집계되거나 메시지 id가 겹치지 않도록 usage와 id는 빼고 저장한다.
+    LLM 대신 만든 대체 응답(회로 차단기)은 저장하지 않는다.
+    """
+    items, tokens = [], 0
+    for generation in generations:
+        message = getattr(generation, "message", None)
+        if message is None or message.response_metadata.get("degraded"):
+            return "", 0
+        usage = getattr(message, "usage_metadata", None) or {}
+        tokens += usage.get("total_tokens", 0)
+        update = {"id": None}
+        if usage:
+            update["usage_metadata"] = None
+        items.append(message_to_dict(message.model_copy(update=update)))
+    return json.dumps(items, ensure_ascii=False), tokens
+
+
+def _decode(value: str) -> list:
+    return [ChatGeneration(message=message) for message in messages_from_dict(json.loads(value))]
+
+
+class ResponseCache(BaseCache):
+    """SQLite 응답 저장소 (크기 제한 LRU + 노드별 TTL)"""
+
+    def __init__(
+        self,
+        path: str,
+        max_bytes: int = 64 * 1024 * 1024,
+        policies: Optional[Dict[str, CachePolicy]] = None,
+    ) -> None:
+        self.path = path
+        self.max_bytes = max_bytes
+        self.policies = {**DEFAULT_POLICIES, **(policies or {})}
+        self._lock = threading.Lock()
+        self._pending: Dict[str, float] = {}  # 캐시 실패 키 → 조회 시각 (응답 지연 측정)
+        self.conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.execute("PRAGMA busy_timeout=5000")
+        self.conn.executescript(_SCHEMA)
+        self._size, = self.conn.execute("SELECT COALESCE(SUM(size), 0) FROM llm_cache").fetchone()
+
+    def policy(self, node: str, llm_string: str) -> Optional[CachePolicy]:
+        """이 호출에 적용할 정책 (캐시하지 않으면 None)"""
+        policy = self.policies.get(node, DEFAULT_POLICY)
+        if policy.ttl <= 0:
+            return None
+        temperature = _temperature(llm_string)
+        if policy.max_temperature is not None and temperature is not None and temperature > policy.max_temperature:
+            return None
+        return policy
+
+    def lookup(self, prompt: str, llm_string: str) -> Optional[list]:
+        node, thread_id = current_caller()
+        if self.policy(node, llm_string) is None:
+            return None
+
+        key = cache_key(prompt, llm_string)
+        now = time.time()
+        with self._lock:
+            row = self.conn.execute(
+                "SELECT value, latency_ms, tokens FROM llm_cache WHERE key = ? AND expires_at > ?", (key, now)
+            ).fetchone()
+            if row is None:
+                if len(self._pending) >= _MAX_PENDING:  # 실패한 호출로 남은 항목 정리
+                    self._pending.clear()
+                self._pending[key] = time.perf_counter()
+            else:
+                self.conn.execute("UPDATE llm_cache SET accessed_at = ? WHERE key = ?", (now, key))
+
+        if row is None:
+            record_cache(node, thread_id, hit=False)
+            return None
+        value, latency_ms, tokens = row
+        record_cache(node, thread_id, hit=True, saved_seconds=latency_ms / 1000, saved_tokens=tokens)
+        return _decode(value)
+
+    def update(self, prompt: str, llm_string: str, return_val: Sequence[Generation]) -> None:
+        node, _ = current_caller()
+        policy = self.policy(node, llm_string)
+        if policy is None:
+            return
+        value, tokens = _encode(return_val)
+        if not value:
+            return
+
+        key = cache_key(prompt, llm_string)
+        now = time.time()
+        size = len(key) + len(value.encode())
+        with self._lock:
+            started = self._pending.pop(key, None)
+            latency_ms = (time.perf_counter() - started) * 1000 if started is not None else 0.0
+            old = self.conn.execute("SELECT size FROM llm_cache WHERE key = ?", (key,)).fetchone()
+            self.conn.execute(
+                "INSERT OR REPLACE INTO llm_cache (key, node, value, size, latency_ms, tokens, expires_at, accessed_at) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (key, node, value, size, latency_ms, tokens, now + policy.ttl, now),
+            )
+            self._size += size - (old[0] if old else 0)
+            if self._size > self.max_bytes:
+                self._evict(now)
+
+    def _evict(self, now: float) -> None:
+        """만료된 응답을 지우고, 그래도 크기를 넘으면 오래 쓰지 않은 것부터 삭제 (호출 시 _lock을 잡고 있어야 함)"""
+        self.conn.execute("DELETE FROM llm_cache WHERE expires_at <= ?", (now,))
+        self._size, = self.conn.execute("SELECT COALESCE(SUM(size), 0) FROM llm_cache").fetchone()
+        # 매번 조금씩 지우지 않도록 최대 크기의 90%까지 줄임
+        target = self.max_bytes * 0.9
+        if self._size <= target:
+            return
+        freed, keys = 0, []
+        for key, size in self.conn.execute("SELECT key, size FROM llm_cache ORDER BY accessed_at"):
+            keys.append(key)
+            freed += size
+            if self._size - freed <= target:
+                break
+        self.conn.executemany("DELETE FROM llm_cache WHERE key = ?", [(key,) for key in keys])
+        self._size -= freed
+
+    def clear(self, **kwargs: Any) -> None:
+        with self._lock:
+            self.conn.execute("DELETE FROM llm_cache")
+            self._pending.clear()
+            self._size = 0
+
+    def stats(self) -> Dict[str, Any]:
+        """저장된 응답 수와 크기"""
+        with self._lock:
+            entries, = self.conn.execute("SELECT COUNT(*) FROM llm_cache").fetchone()
+        return {"entries": entries, "bytes": self._size, "max_bytes": self.max_bytes}
+
+
+_cache: Optional[ResponseCache] = None
+_cache_lock = threading.Lock()
+
+
+def get_response_cache() -> Optional[ResponseCache]:
+    """
+    프로세스 공용 응답 캐시 (LLM_CACHE_DB 환경 변수)
+    LLM_CACHE_DB가 비어 있으면(기본) 캐시하지 않는다.
+    """
+    global _cache
+    path = os.getenv("LLM_CACHE_DB", "")
+    if not path:
+        return None
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                _cache = ResponseCache(
+                    path,
+                    max_bytes=int(float(os.getenv("LLM_CACHE_MAX_MB", "64")) * 1024 * 1024),
+                    policies=_parse_policies(os.getenv("LLM_CACHE_POLICY", "")),
+                )
+    return _cache
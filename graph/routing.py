@@ -0,0 +1,51 @@
+"""
+세션 → 워커 일관 해시(consistent hashing)
+같은 게임 세션(thread_id)의 요청을 늘 같은 백엔드 워커로 보내
+그 워커의 체크포인트 핫 캐시, 백그라운드 작업, 멱등 결과를 그대로 쓰게 한다.
+
+- 워커마다 가상 노드 vnodes개를 해시 링에 올려 세션이 고르게 나뉘도록 한다.
+- 워커가 늘거나 줄면 그 워커 몫의 세션만 옮겨 가고 나머지는 그대로 남는다.
+- 체크포인트는 공유 DB에 있으므로 워커가 바뀌어도 게임은 이어진다. (캐시만 다시 채움)
+"""
+
+from bisect import bisect
+from typing import Iterable, Iterator, List, Tuple
+import hashlib
+
+DEFAULT_VNODES = 64
+
+
+def _hash(value: str) -> int:
+    return int.from_bytes(hashlib.blake2b(value.encode(), digest_size=8).digest(), "big")
+
+
+class HashRing:
+    """워커 이름(예: "10.0.0.5:8000") 목록으로 만든 해시 링"""
+
+    def __init__(self, nodes: Iterable[str] = (), vnodes: int = DEFAULT_VNODES) -> None:
+        self.vnodes = vnodes
+        self.nodes: Tuple[str, ...] = tuple(sorted(set(nodes)))
+        points = sorted((_hash(f"{node}#{i}"), node) for node in self.nodes for i in range(vnodes))
+        self._keys: List[int] = [point for point, _ in points]
+        self._owners: List[str] = [node for _, node in points]
+
+    def __len__(self) -> int:
+        return len(self.nodes)
+
+    def node_for(self, key: str) -> str:
+        """key를 맡을 워커 (워커가 없으면 LookupError)"""
+        return next(self.preference(key))
+
+    def preference(self, key: str) -> Iterator[str]:
+        """key를 맡을 워커부터 링을 따라 겹치지 않게 나열 (앞 워커가 죽었을 때의 대체 순서)"""
+        if not self._keys:
+            raise LookupError("해시 링에 워커가 없습니다")
+        start = bisect(self._keys, _hash(key))
+        seen = set()
+        for i in range(len(self._keys)):
+            node = self._owners[(start + i) % len(self._keys)]
+            if node not in seen:
+                seen.add(node)
+                yield node
+                if len(seen) == len(self.nodes):
+                    return
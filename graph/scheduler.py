@@ -0,0 +1,136 @@
+"""
+다음 화자 스케줄러 (LLM 없이 로컬에서 선정)
+정책마다 후보별 점수(0~1)를 매기고, 가중치를 곱해 더한 점수가 가장 높은 후보를 고른다. (동점이면 무작위)
+
+기본 정책
+- address: 직전 발언에서 이름이 불린 생존자 (직접 호명)
+- recency: 마지막으로 말한 지 오래된 생존자
+- fairness: 오늘 말한 횟수가 적은 생존자
+- suspicion: 의심 수치가 높은 생존자 (해명할 기회)
+
+가중치는 SPEAKER_POLICY_WEIGHTS 환경 변수로 바꿀 수 있고 (예: "address=10,recency=2,fairness=1,suspicion=0.5"),
+새 정책은 register_policy(name, policy, weight)로 추가한다.
+"""
+
+from typing import Any, Callable, Dict, List, Optional
+import os
+import random
+
+from graph.context import name_aliases
+
+# (state, 후보 목록, 대화 통계) → {후보: 점수}
+SpeakerPolicy = Callable[[Dict[str, Any], List[str], "SpeakerStats"], Dict[str, float]]
+
+
+class SpeakerStats:
+    """오늘 대화에서 캐릭터별 마지막 발언 위치와 발언 횟수 (메시지를 한 번만 훑음)"""
+
+    __slots__ = ("total", "last_spoken", "counts", "last_message")
+
+    def __init__(self, messages: List[Any]) -> None:
+        self.total = len(messages)
+        self.last_spoken: Dict[str, int] = {}
+        self.counts: Dict[str, int] = {}
+        for i, msg in enumerate(messages):
+            name = getattr(msg, "name", None)
+            if name:
+                self.last_spoken[name] = i
+                self.counts[name] = self.counts.get(name, 0) + 1
+        self.last_message = messages[-1] if messages else None
+
+
+def address_policy(state: Dict[str, Any], candidates: List[str], stats: SpeakerStats) -> Dict[str, float]:
+    """직전 발언에서 이름이 불렸으면 1"""
+    last = stats.last_message
+    if last is None:
+        return {}
+    content = str(last.content)
+    sender = getattr(last, "name", None)
+    return {
+        name: 1.0
+        for name in candidates
+        if name != sender and any(alias in content for alias in name_aliases(name))
+    }
+
+
+def recency_policy(state: Dict[str, Any], candidates: List[str], stats: SpeakerStats) -> Dict[str, float]:
+    """마지막 발언 이후 지난 메시지 비율 (한 번도 말하지 않았으면 1)"""
+    total = max(stats.total, 1)
+    scores = {}
+    for name in candidates:
+        last = stats.last_spoken.get(name)
+        scores[name] = 1.0 if last is None else (total - 1 - last) / total
+    return scores
+
+
+def fairness_policy(state: Dict[str, Any], candidates: List[str], stats: SpeakerStats) -> Dict[str, float]:
+    """가장 많이 말한 사람 대비 덜 말한 정도"""
+    most = max((stats.counts.get(name, 0) for name in candidates), default=0)
+    if not most:
+        return {name: 1.0 for name in candidates}
+    return {name: 1 - stats.counts.get(name, 0) / most for name in candidates}
+
+
+def suspicion_policy(state: Dict[str, Any], candidates: List[str], stats: SpeakerStats) -> Dict[str, float]:
+    """가장 의심받는 사람 대비 의심 수치"""
+    counts = state.get("suspicion_counts", {})
+    most = max((counts.get(name, 0) for name in candidates), default=0)
+    if not most:
+        return {}
+    return {name: counts.get(name, 0) / most for name in candidates}
+
+
+_POLICIES: Dict[str, SpeakerPolicy] = {
+    "address": address_policy,
+    "recency": recency_policy,
+    "fairness": fairness_policy,
+    "suspicion": suspicion_policy,
+}
+# 호명은 다른 점수를 모두 합친 것보다 우선하도록 큰 가중치
+_WEIGHTS: Dict[str, float] = {"address": 10.0, "recency": 2.0, "fairness": 1.0, "suspicion": 0.5}
+
+
+def _parse_weights(spec: str) -> Dict[str, float]:
+    weights = {}
+    for item in spec.split(","):
+        if item.strip():
+            name, _, value = item.partition("=")
+            weights[name.strip()] = float(value)
+    return weights
+
+
+_WEIGHTS.update(_parse_weights(os.getenv("SPEAKER_POLICY_WEIGHTS", "")))
+
+
+def register_policy(name: str, policy: SpeakerPolicy, weight: float = 1.0) -> None:
+    """화자 선정 정책 추가 (같은 이름이면 교체)"""
+    _POLICIES[name] = policy
+    _WEIGHTS[name] = weight
+
+
+def speaker_scores(state: Dict[str, Any], candidates: List[str]) -> Dict[str, float]:
+    """후보별 가중 합산 점수"""
+    stats = SpeakerStats(state.get("messages", []))
+    scores = dict.fromkeys(candidates, 0.0)
+    for name, policy in _POLICIES.items():
+        weight = _WEIGHTS.get(name, 1.0)
+        if not weight:
+            continue
+        for candidate, score in policy(state, candidates, stats).items():
+            if candidate in scores:
+                scores[candidate] += weight * score
+    return scores
+
+
+def schedule_speaker(
+    state: Dict[str, Any], alive_names: List[str], rng: Optional[random.Random] = None
+) -> str:
+    """
+    다음 화자 선정 (직전 발언자는 다른 후보가 없을 때만)
+    점수가 가장 높은 후보 중 무작위
+    """
+    current_speaker = state.get("current_speaker")
+    candidates = [name for name in alive_names if name != current_speaker] or alive_names
+    scores = speaker_scores(state, candidates)
+    best = max(scores.values())
+    return (rng or random).choice([name for name in candidates if scores[name] == best])
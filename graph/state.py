@@ -4,9 +4,26 @@ LangGraph용 게임 State 정의
 """
 
 from typing import Annotated, TypedDict, List, Optional, Dict
+import operator
 from langgraph.graph.message import add_messages
 
 
+def add_counts(left: Optional[Dict[str, int]], right: Optional[Dict[str, int]]) -> Dict[str, int]:
+    """
+    의심 수치 리듀서
+    노드는 이번에 늘어난 만큼만 반환하고, 병렬 노드들의 증가분은 이름별로 더해진다.
+    """
+    merged = dict(left or {})
+    for name, increment in (right or {}).items():
+        merged[name] = merged.get(name, 0) + increment
+    return merged
+
+
+def merge_dicts(left: Optional[dict], right: Optional[dict]) -> dict:
+    """새 키를 추가하는 리듀서 (같은 키는 나중 값이 우선)"""
+    return {**(left or {}), **(right or {})}
+
+
 class GameState(TypedDict):
     """
     마피아 게임의 전체 상태
@@ -16,24 +33,34 @@ class GameState(TypedDict):
 
     # 대화 기록 (자동으로 메시지 추가)
     messages: Annotated[List, add_messages]
+    message_offset: int  # 라운드 요약으로 정리(아카이브)된 메시지 수 (메시지 순번 = offset + index)
 
     # 게임 정보
     round_number: int  # 현재 라운드
     phase: str  # 게임 페이즈: "intro", "discussion", "voting", "end", "night", "one_on_one"
     day_night: str  # "day" or "night"
     turn_count: int  # 현재 라운드에서 몇 명이 말했는지
+    auto_turns: int  # 자유 토론 자동 진행으로 남은 턴 수
 
     # 캐릭터 정보
     characters: List[dict]  # 모든 캐릭터 정보
     phantom_name: Optional[str]  # 범인 이름 (비밀)
     alive_status: Dict[str, bool]  # 생존 여부 {이름: True/False}
-    suspicion_counts: Dict[str, int]  # 의심 횟수 {이름: count}
+    # 리듀서가 있는 필드는 밤의 병렬 분기들이 동시에 갱신할 수 있으며, 노드는 추가분만 반환한다
+    # (전체를 바꿀 때는 langgraph.types.Overwrite 사용)
+    suspicion_counts: Annotated[Dict[str, int], add_counts]  # 의심 횟수 {이름: count}
+    suspicion_votes: Annotated[List[dict], operator.add]  # 캐릭터별 병렬 의심 결과 (집계 전 임시) [{suspect, target, reason}]
 
     # 로그 및 요약
     night_logs: List[str]  # 밤 행동 로그
-    clues: List[str]  # 현장 증거 (단서) - New
+    night_victim: Optional[str]  # 오늘 밤 희생자 (night_start에서 정하고 night_end에서 사망 처리)
+    clues: Annotated[List[str], operator.add]  # 현장 증거 (단서) - New
     round_summary: Optional[str]  # 이전 라운드 요약 (Legacy)
-    round_summaries: Dict[int, str]  # 라운드별 요약 {라운드: 요약}
+    round_summaries: Annotated[Dict[int, str], merge_dicts]  # 라운드별 요약 {라운드: 요약}
+    rolling_summary: str  # 오늘 대화의 롤링 요약 (summary_cursor 이전 메시지까지 반영)
+    summary_cursor: int  # 롤링 요약에 아직 합치지 않은 첫 메시지 순번 (message_offset 기준 순번)
+    long_term_memory: str  # 오래된 라운드 요약들을 합친 장기 기억 (토큰 예산 내)
+    memory_round: int  # 장기 기억에 합쳐진 마지막 라운드
     death_log: List[str]  # 사망 로그
 
     # 현재 턴
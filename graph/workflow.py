@@ -3,24 +3,84 @@ LangGraph Workflow 정의
 게임의 전체 흐름을 그래프로 구성
 """
 
+from typing import Optional
+import os
 from langgraph.graph import StateGraph, END
-from langgraph.checkpoint.memory import MemorySaver
+from langgraph.checkpoint.base import BaseCheckpointSaver
+from graph.checkpoint import create_checkpointer
+from graph.metrics import instrument_node
+from graph.persona import precompile_personas
 from graph.state import GameState
 from graph.nodes import (
     setup_game_node,
     character_speak_node,
+    acharacter_speak_node,
     user_input_node,
     vote_node,
     next_turn_node,
     wait_for_user_node,
-    night_phase_node,
+    night_start_node,
+    anight_start_node,
+    night_clue_node,
+    anight_clue_node,
+    night_end_node,
+    anight_end_node,
     select_next_speaker_node,
+    aselect_next_speaker_node,
+    heuristic_select_speaker_node,
+    fused_turn_node,
+    afused_turn_node,
     suspicion_node,
     ai_suspicion_node,
-    summarize_round_node  # 추가
+    aai_suspicion_node,
+    suspicion_fan_out,
+    ai_suspect_node,
+    aai_suspect_node,
+    ai_suspicion_reduce_node,
+    summarize_round_node,  # 추가
+    asummarize_round_node,
+    compress_memory_node,
+    acompress_memory_node,
 )
 
 
+# 자유 토론 한 턴의 처리 방식 (DISCUSSION_TURN_MODE 환경 변수)
+# - heuristic: 로컬 스케줄러(graph/scheduler.py)로 화자 선정 → LLM으로 발언 (기본)
+# - two_call: LLM으로 화자 선정 → LLM으로 발언
+# - fused: 화자 선정과 발언을 LLM 한 번으로 생성
+TURN_MODES = ("two_call", "fused", "heuristic")
+
+
+def get_turn_mode() -> str:
+    mode = os.getenv("DISCUSSION_TURN_MODE", "heuristic")
+    if mode not in TURN_MODES:
+        raise ValueError(f"알 수 없는 토론 턴 모드: {mode}")
+    return mode
+
+
+# 밤 AI 상호 의심 평가 방식 (AI_SUSPICION_MODE 환경 변수)
+# - single: 전체 대화를 한 번의 LLM 호출로 평가 (기본)
+# - fanout: 생존자마다 작은 프롬프트로 병렬 평가 (Send) 후 집계
+SUSPICION_MODES = ("single", "fanout")
+
+
+def get_suspicion_mode() -> str:
+    mode = os.getenv("AI_SUSPICION_MODE", "single")
+    if mode not in SUSPICION_MODES:
+        raise ValueError(f"알 수 없는 AI 의심 모드: {mode}")
+    return mode
+
+
+# 밤에 희생자 선정(night_start) 후 병렬로 실행되는 분기들
+# 모두 끝나면 night_end에서 사망 처리, 라운드 증가, 메시지 정리를 한다.
+NIGHT_BRANCHES = ["night_clue", "summarize_round", "compress_memory"]
+
+
+def start_night_branches(state: GameState) -> list:
+    """fanout 모드의 밤 분기: 생존자별 의심 평가(Send) + 단서 생성 + 라운드 요약 + 장기 기억 압축"""
+    return (suspicion_fan_out(state) or ["ai_suspicion_reduce"]) + NIGHT_BRANCHES
+
+
 def should_continue_discussion(state: GameState) -> str:
     """
     대화를 계속할지 결정하는 조건부 엣지
@@ -43,9 +103,13 @@ def should_continue_discussion(state: GameState) -> str:
     elif phase == "one_on_one":
         return "wait_user"
         
-    # 밤 페이즈로 이동 (AI 의심 로직 실행 후 밤으로)
+    # 밤 페이즈로 이동 (AI 의심, 단서 생성, 라운드 요약을 병렬 실행)
     elif phase == "night":
-        return "ai_suspicion"
+        return "night_start"
+
+    # 자유 토론 자동 진행 중이면 유저 대기 없이 다음 화자 선정
+    elif phase == "free_discussion" and state.get("auto_turns", 0) > 0:
+        return "select_next_speaker"
 
     # AI 토론 계속 (수동 진행을 위해 wait_user로 보냄)
     elif phase == "discussion" or phase == "free_discussion":
@@ -70,7 +134,7 @@ def after_user_wait(state: GameState) -> str:
         
     # 밤 페이즈로 이동
     elif state.get("phase") == "night":
-        return "ai_suspicion"
+        return "night_start"
         
     # 사용자가 입력을 했으면 입력 처리
     elif state.get("user_input"):
@@ -102,25 +166,52 @@ def after_user_input(state: GameState) -> str:
         return "select_next_speaker"
 
 
-def create_game_graph():
+def create_game_graph(
+    checkpointer: Optional[BaseCheckpointSaver] = None,
+    turn_mode: Optional[str] = None,
+    suspicion_mode: Optional[str] = None,
+):
     """
     팬텀로그 게임 그래프 생성
+    checkpointer를 지정하지 않으면 환경 변수 설정에 맞는 체크포인터를 사용한다. (기본: SQLite)
+    turn_mode를 지정하지 않으면 DISCUSSION_TURN_MODE 환경 변수를 따른다. (기본: heuristic)
+    suspicion_mode를 지정하지 않으면 AI_SUSPICION_MODE 환경 변수를 따른다. (기본: single)
     """
+    turn_mode = turn_mode or get_turn_mode()
+    suspicion_mode = suspicion_mode or get_suspicion_mode()
+
+    # 발언 시스템 프롬프트의 고정 부분을 미리 만들어 둠 (캐릭터 × 의심 단계 × 팬텀 여부)
+    precompile_personas()
+
     # StateGraph 초기화
     workflow = StateGraph(GameState)
 
-    # 노드 추가
-    workflow.add_node("setup", setup_game_node)
-    workflow.add_node("character_speak", character_speak_node)
-    workflow.add_node("wait_user", wait_for_user_node)
-    workflow.add_node("user_input", user_input_node)
-    workflow.add_node("vote", vote_node)
-    workflow.add_node("next_turn", next_turn_node)
-    workflow.add_node("night_phase", night_phase_node)
-    workflow.add_node("select_next_speaker", select_next_speaker_node)
-    workflow.add_node("suspicion", suspicion_node)
-    workflow.add_node("ai_suspicion", ai_suspicion_node)
-    workflow.add_node("summarize_round", summarize_round_node)  # 추가
+    # 노드 추가 (모든 노드는 실행 시간/에러 계측 래퍼로 감싼다, graph/metrics.py)
+    workflow.add_node("setup", instrument_node("setup", setup_game_node))
+    workflow.add_node("character_speak", instrument_node("character_speak", character_speak_node, acharacter_speak_node))
+    workflow.add_node("wait_user", instrument_node("wait_user", wait_for_user_node))
+    workflow.add_node("user_input", instrument_node("user_input", user_input_node))
+    workflow.add_node("vote", instrument_node("vote", vote_node))
+    workflow.add_node("next_turn", instrument_node("next_turn", next_turn_node))
+    workflow.add_node("night_start", instrument_node("night_start", night_start_node, anight_start_node))
+    workflow.add_node("night_clue", instrument_node("night_clue", night_clue_node, anight_clue_node))
+    workflow.add_node("night_end", instrument_node("night_end", night_end_node, anight_end_node))
+    if turn_mode == "fused":
+        # 화자 선정 노드가 발언까지 생성하므로 character_speak를 거치지 않는다
+        workflow.add_node("select_next_speaker", instrument_node("select_next_speaker", fused_turn_node, afused_turn_node))
+    elif turn_mode == "heuristic":
+        workflow.add_node("select_next_speaker", instrument_node("select_next_speaker", heuristic_select_speaker_node))
+    else:
+        workflow.add_node("select_next_speaker", instrument_node("select_next_speaker", select_next_speaker_node, aselect_next_speaker_node))
+    workflow.add_node("suspicion", instrument_node("suspicion", suspicion_node))
+    if suspicion_mode == "fanout":
+        # 생존자별 ai_suspect를 병렬 실행한 뒤 ai_suspicion_reduce에서 집계
+        workflow.add_node("ai_suspect", instrument_node("ai_suspect", ai_suspect_node, aai_suspect_node))
+        workflow.add_node("ai_suspicion_reduce", instrument_node("ai_suspicion_reduce", ai_suspicion_reduce_node))
+    else:
+        workflow.add_node("ai_suspicion", instrument_node("ai_suspicion", ai_suspicion_node, aai_suspicion_node))
+    workflow.add_node("summarize_round", instrument_node("summarize_round", summarize_round_node, asummarize_round_node))  # 추가
+    workflow.add_node("compress_memory", instrument_node("compress_memory", compress_memory_node, acompress_memory_node))
 
     # 시작점: setup
     workflow.set_entry_point("setup")
@@ -128,23 +219,31 @@ def create_game_graph():
     # setup 후 바로 wait_user로 (사용자 명령 대기)
     workflow.add_edge("setup", "wait_user")
 
-    # select_next_speaker 후 character_speak
-    workflow.add_edge("select_next_speaker", "character_speak")
+    # select_next_speaker 후 character_speak (fused 모드는 바로 next_turn)
+    if turn_mode == "fused":
+        workflow.add_edge("select_next_speaker", "next_turn")
+    else:
+        workflow.add_edge("select_next_speaker", "character_speak")
 
     # character_speak 후 next_turn
     workflow.add_edge("character_speak", "next_turn")
     
-    # night_phase 후 summarize_round (요약 및 메모리 초기화)
-    workflow.add_edge("night_phase", "summarize_round")
-    
-    # summarize_round 후 wait_user (다음 날 아침 시작 대기)
-    workflow.add_edge("summarize_round", "wait_user")
-
     # suspicion 후 wait_user (의심만 하고 다시 대기)
     workflow.add_edge("suspicion", "wait_user")
 
-    # ai_suspicion 후 night_phase
-    workflow.add_edge("ai_suspicion", "night_phase")
+    # 밤: night_start 후 AI 의심 / 단서 생성 / 라운드 요약 / 장기 기억 압축을 병렬 실행하고,
+    # 모든 분기가 끝나면 night_end → wait_user (다음 날 아침 시작 대기)
+    if suspicion_mode == "fanout":
+        workflow.add_conditional_edges(
+            "night_start", start_night_branches, ["ai_suspect", "ai_suspicion_reduce", *NIGHT_BRANCHES]
+        )
+        workflow.add_edge("ai_suspect", "ai_suspicion_reduce")
+        workflow.add_edge(["ai_suspicion_reduce", *NIGHT_BRANCHES], "night_end")
+    else:
+        for branch in ["ai_suspicion", *NIGHT_BRANCHES]:
+            workflow.add_edge("night_start", branch)
+        workflow.add_edge(["ai_suspicion", *NIGHT_BRANCHES], "night_end")
+    workflow.add_edge("night_end", "wait_user")
 
     # next_turn 후 조건부 분기
     workflow.add_conditional_edges(
@@ -152,10 +251,11 @@ def create_game_graph():
         should_continue_discussion,
         {
             "character_speak": "character_speak",
+            "select_next_speaker": "select_next_speaker", # 자동 진행
             "wait_user": "wait_user",
             "vote": "vote",
             "end": END,
-            "ai_suspicion": "ai_suspicion" # New path for night
+            "night_start": "night_start" # New path for night
         }
     )
 
@@ -167,7 +267,7 @@ def create_game_graph():
             "user_input": "user_input",
             "vote": "vote",
             "wait_user": "wait_user",
-            "ai_suspicion": "ai_suspicion", # New path for night
+            "night_start": "night_start", # New path for night
             "select_next_speaker": "select_next_speaker",
             "character_speak": "character_speak",
             "suspicion": "suspicion" # New path for user suspicion
@@ -188,7 +288,8 @@ def create_game_graph():
     workflow.add_edge("vote", END)
 
     # 컴파일
-    memory = MemorySaver()
-    app = workflow.compile(checkpointer=memory)
+    if checkpointer is None:
+        checkpointer = create_checkpointer()
+    app = workflow.compile(checkpointer=checkpointer)
 
     return app
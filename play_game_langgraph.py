@@ -17,6 +17,24 @@ def print_message(message):
         print(f"\n📢 {message.content}")
 
 
+def last_id(messages):
+    """마지막 메시지의 ID (없으면 None)"""
+    return messages[-1].id if messages else None
+
+
+def messages_after(messages, message_id):
+    """
+    message_id 이후에 추가된 메시지
+    라운드 요약으로 이전 메시지가 정리되어 기준 메시지가 없으면 남은 메시지 전체를 반환
+    """
+    if message_id is None:
+        return messages
+    for i, msg in enumerate(messages):
+        if msg.id == message_id:
+            return messages[i + 1:]
+    return messages
+
+
 def print_characters(state: GameState):
     """캐릭터 목록 출력 (의심 수치 포함)"""
     print("\n" + "=" * 70)
@@ -105,8 +123,8 @@ def main():
     # 캐릭터 목록 보기
     print_characters(state)
 
-    # 현재 메시지 개수 추적 (새 메시지만 출력하기 위해)
-    last_message_count = len(state.get("messages", []))
+    # 마지막으로 출력한 메시지 추적 (새 메시지만 출력하기 위해)
+    last_message_id = last_id(state.get("messages", []))
 
     # 게임 루프
     game_over = False
@@ -127,10 +145,10 @@ def main():
             
             # 밤 결과 출력
             messages = state.get("messages", [])
-            new_messages = messages[last_message_count:]
+            new_messages = messages_after(messages, last_message_id)
             for msg in new_messages:
                 print_message(msg)
-            last_message_count = len(messages)
+            last_message_id = last_id(messages)
             
             print_characters(state)
             continue # 다시 메뉴 출력
@@ -161,13 +179,13 @@ def main():
             
             # 메시지 출력
             messages = state.get("messages", [])
-            new_messages = messages[last_message_count:]
+            new_messages = messages_after(messages, last_message_id)
             for msg in new_messages:
                 if hasattr(msg, 'name') and msg.name != "유저":
                     print_message(msg)
                 elif not hasattr(msg, 'name') and "[AI들끼리" not in msg.content:
                     print_message(msg)
-            last_message_count = len(messages)
+            last_message_id = last_id(messages)
 
             # 대화 루프
             while True:
@@ -194,13 +212,13 @@ def main():
                 
                 # 메시지 출력
                 messages = state.get("messages", [])
-                new_messages = messages[last_message_count:]
+                new_messages = messages_after(messages, last_message_id)
                 for msg in new_messages:
                     if hasattr(msg, 'name') and msg.name != "유저":
                         print_message(msg)
                     elif not hasattr(msg, 'name') and "[AI들끼리" not in msg.content:
                         print_message(msg)
-                last_message_count = len(messages)
+                last_message_id = last_id(messages)
 
             print("\n" + "=" * 70)
 
@@ -238,7 +256,7 @@ def main():
                         config
                     )
                     state = result
-                    last_message_count = len(state.get("messages", []))
+                    last_message_id = last_id(state.get("messages", []))
 
                     while True:
                         # 질문 입력
@@ -271,12 +289,12 @@ def main():
 
                             # 새로 추가된 메시지들만 출력
                             messages = state.get("messages", [])
-                            new_messages = messages[last_message_count:]
+                            new_messages = messages_after(messages, last_message_id)
 
                             for msg in new_messages:
                                 print_message(msg)
 
-                            last_message_count = len(messages)
+                            last_message_id = last_id(messages)
                         else:
                             print("❌ 질문을 입력하세요.")
                 else:
@@ -311,7 +329,7 @@ def main():
 
                     # 결과 메시지 출력
                     messages = state.get("messages", [])
-                    new_messages = messages[last_message_count:]
+                    new_messages = messages_after(messages, last_message_id)
 
                     for msg in new_messages:
                         print_message(msg)
@@ -379,7 +397,7 @@ def main():
             # 요약본과 아침 인사가 포함된 새 메시지 출력
             for msg in messages:
                 print_message(msg)
-            last_message_count = len(messages)
+            last_message_id = last_id(messages)
 
         elif choice == "9":
             # 특정 AI 의심하기
@@ -418,10 +436,10 @@ def main():
                     
                     # 결과 메시지 출력
                     messages = state.get("messages", [])
-                    new_messages = messages[last_message_count:]
+                    new_messages = messages_after(messages, last_message_id)
                     for msg in new_messages:
                         print_message(msg)
-                    last_message_count = len(messages)
+                    last_message_id = last_id(messages)
                     
                 else:
                     print("❌ 1-5 사이의 숫자를 입력하세요.")